@@ -1,8 +1,24 @@
-from flask import Flask, jsonify, request, make_response, send_from_directory
-import sqlite3, uuid, random
-from datetime import datetime
+from flask import Flask, jsonify, request, make_response, abort, g
+import uuid
 import os
-app = Flask(__name__)
+import time
+import db
+from timetable import DAY_SECONDS, NEXT_MATCH, time_index, format_index
+from conditions import CONDITIONS, InvalidEvent, compile_event
+from events import generate_event, generate_events, new_seed, now_index
+from sessions import SessionStore, derive_inputs
+import event_pool
+import compact
+import metrics
+import profiling
+import static_assets
+import fastjson
+import shared_cache
+import migrations
+import outcome_log
+import boards
+app = Flask(__name__, static_folder=None)  # /static 은 static_assets가 메모리에서 서빙
+app.json = fastjson.FastJSONProvider(app)  # orjson이 있으면 사용
 
 # ─── CORS ─────────────────────────────────────────────────────
 @app.after_request
@@ -12,426 +28,125 @@ def after_request(resp):
     resp.headers["Access-Control-Allow-Headers"] = "Content-Type"
     return resp
 
+# ─── METRICS ──────────────────────────────────────────────────
+# 라우트별 요청 수/지연 (워커 합산은 metrics.py)
+
+@app.before_request
+def start_timer():
+    g.request_t0 = time.perf_counter()
+
+
+@app.after_request
+def record_request(resp):
+    t0 = g.get("request_t0")
+    if t0 is not None and metrics.METRICS:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.inc("http_requests_total", metrics.labels(route=route, method=request.method, status=resp.status_code))
+        metrics.observe("http_request_duration_seconds", metrics.labels(route=route), time.perf_counter() - t0)
+    return resp
+
+
+def record_event(payload):
+    """생성한 이벤트 종류/함정 여부 (미뤄 둔 시각 기반 조건은 type="deferred")"""
+    evt = payload["event"]
+    etype = evt["type"] if evt else "deferred"
+    lbl = metrics.labels(type=etype, band=event_pool.band_of(payload["stage"]))
+    metrics.inc("events_generated_total", lbl)
+    if evt and evt.get("detail", {}).get("is_trap"):
+        metrics.inc("event_traps_total", lbl)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    if not metrics.METRICS:
+        return "", 404
+    resp = make_response(metrics.render(metrics.get_registry()))
+    resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return resp
+
+
 @app.route("/api/<path:path>", methods=["OPTIONS"])
 def options_handler(path):
     return "", 204
 
 # ─── DB ──────────────────────────────────────────────────────────
-DB_PATH = "/data"
-DB = os.path.join(DB_PATH, "game.db")
+# 요청마다 새로 연결하지 않고 워커별 연결 풀에서 빌려 쓴다 (db.py)
 
 def get_db():
-    # /data 폴더가 없으면 생성 (권한 오류 방지)
-    if not os.path.exists(DB_PATH):
-        os.makedirs(DB_PATH)
-    conn = sqlite3.connect(DB)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """요청 동안 쓸 연결 (teardown에서 풀에 반납)"""
+    if "db" not in g:
+        g.db = db.get_pool().acquire()
+    return g.db
+
 
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop("db", None)
+    if conn is not None:
+        db.get_pool().release(conn)
 
-def init_db():
+
+def run_write(fn):
+    """쓰기 작업 fn(conn) 실행 (fn이 콜러블을 반환하면 커밋 후 실행)
+
+    DB_WRITE_BEHIND=1 이면 write-behind 큐에 넣고 바로 반환한다.
+    """
+    if db.WRITE_BEHIND:
+        db.get_writer().submit(fn, durable=db.WRITE_ACK_DURABLE)
+        return
     conn = get_db()
-    conn.executescript("""
-        CREATE TABLE IF NOT EXISTS players (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-        CREATE TABLE IF NOT EXISTS records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            player_id TEXT,
-            max_stage INTEGER DEFAULT 0,
-            total_correct INTEGER DEFAULT 0,
-            total_wrong INTEGER DEFAULT 0,
-            played_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(player_id) REFERENCES players(id)
-        );
-    """)
+    after = fn(conn)
     conn.commit()
-    conn.close()
+    if callable(after):
+        after()
 
-init_db()
 
-# ─── CONSTANTS ───────────────────────────────────────────────────
-CLOCK_TYPES = ["digital", "analog", "binary", "flip", "neon"]
+# 워커별 상위 N 리더보드 (save_record가 갱신)
+LEADERBOARD = db.LeaderboardCache()
 
-# ─── 10초 안의 시각 기반 조건 생성 ──────────────────────────────────
+# new_event가 만든 이벤트 (verify는 event_id로 찾는다)
+SESSIONS = SessionStore()
 
-def get_possible_times():
-    """현재 시각 기준 2~10초 후의 모든 시각 반환"""
-    """ hi """
-    now = datetime.now()
-    h, m, s = now.hour, now.minute, now.second
-    
-    possible_times = []
-    for i in range(2, 11):  # 1~10초
-        future_s = s + i
-        future_m = m
-        future_h = h
-        if future_s >= 60:
-            future_s -= 60
-            future_m += 1
-            if future_m >= 60:
-                future_m -= 60
-                future_h = (future_h + 1) % 24
-        possible_times.append((future_h, future_m, future_s))
-    
-    return possible_times
 
+@app.before_request
+def check_schema():
+    """gunicorn 훅/CLI 없이 띄운 경우 첫 요청 때 밀린 마이그레이션 적용 (프로세스당 한 번 확인)"""
+    migrations.ensure_current(get_db)
 
-def create_time_based_event(possible_times, stage):
-    """10초 안의 실제 시각을 기반으로 조건 생성 (함정 로직 추가됨)"""
-    
-    # [기존 코드 1] 랜덤하게 시각 선택 및 조건 생성 (그대로 유지)
-    target_time = random.choice(possible_times)
-    h, m, s = target_time
-    time_str = f"{h:02d}{m:02d}{s:02d}"
-    digits = [int(d) for d in time_str]
-    
-    conditions = []
-    
-    # 1. 특정 숫자
-    conditions.append(("specific_second", s))
-    if random.random() < 0.2:
-        conditions.append(("specific_minute", m))
-    
-    # 2. 연속 숫자
-    max_run = 1
-    for i in range(len(digits)):
-        run = 1
-        for j in range(i+1, len(digits)):
-            if digits[i] == digits[j] and j == i + run:
-                run += 1
-            else:
-                break
-        max_run = max(max_run, run)
-    if max_run >= 2:
-        for i in range(len(digits) - max_run + 1):
-            if all(digits[i] == digits[i+k] for k in range(max_run)):
-                conditions.append(("matching", digits[i], max_run))
-                break
-    
-    # 3~12. 나머지 조건들 (회문, 포함, 미포함, 합, 배수, 소수 등... 기존 코드 그대로)
-    if time_str == time_str[::-1]: conditions.append(("palindrome",))
-    
-    unique_digits = list(set(digits))
-    if unique_digits:
-        digit = random.choice(unique_digits)
-        conditions.append(("digit_in", digit))
-        
-    all_digits = set(range(10))
-    absent = list(all_digits - set(digits))
-    if absent:
-        digit = random.choice(absent)
-        # 미포함 로직은 원본의 'never_appears' 체크가 이미 강력한 함정 역할이므로 그대로 둠
-        never_appears = all(digit not in [int(d) for d in f"{th:02d}{tm:02d}{ts:02d}"] for th, tm, ts in possible_times)
-        if never_appears: conditions.append(("no_click_impossible", digit))
-        else: conditions.append(("digit_not_in", digit))
-            
-    total = sum(digits)
-    conditions.append(("sum", total))
-    
-    if s == 0: conditions.append(("second_zero",))
-    
-    if stage >= 5:
-        if total % 2 == 0: conditions.append(("sum_even",))
-        else: conditions.append(("sum_odd",))
-        if s % 7 == 0 and s > 0: conditions.append(("multiple_7",))
-        if is_prime(s): conditions.append(("prime",))
-        if m == s: conditions.append(("sandwich",))
-        if is_sequence_asc(digits): conditions.append(("ascending",))
-        elif is_sequence_desc(digits): conditions.append(("descending",))
-
-    if not conditions: return None
-    
-    cond = random.choice(conditions)
-
-    # =========================================================================
-    # [추가된 로직] 여기서 결정을 뒤집습니다 (함정 생성)
-    # =========================================================================
-    is_trap = False
-    
-    # no_click_impossible은 이미 함정이므로 건드리지 않음
-    if cond[0] != "no_click_impossible":
-        # 30% 확률로 정답 조건을 오답으로 변조
-        if random.random() < 0.3:
-            
-            # 1) 초(Second) 변조
-            if cond[0] == "specific_second":
-                valid_secs = set(t[2] for t in possible_times)
-                invalid_secs = list(set(range(60)) - valid_secs)
-                if invalid_secs:
-                    cond = ("specific_second", random.choice(invalid_secs))
-                    is_trap = True
-                    
-            # 2) 분(Minute) 변조
-            elif cond[0] == "specific_minute":
-                valid_mins = set(t[1] for t in possible_times)
-                invalid_mins = list(set(range(60)) - valid_mins)
-                if invalid_mins:
-                    cond = ("specific_minute", random.choice(invalid_mins))
-                    is_trap = True
-            
-            # 3) 합(Sum) 변조
-            elif cond[0] == "sum":
-                valid_sums = set()
-                for ph, pm, ps in possible_times:
-                    valid_sums.add(sum([int(d) for d in f"{ph:02d}{pm:02d}{ps:02d}"]))
-                
-                # 가능한 합 범위 (0~54) 중 안 나오는 것 선택
-                invalid_sums = list(set(range(55)) - valid_sums)
-                if invalid_sums:
-                    cond = ("sum", random.choice(invalid_sums))
-                    is_trap = True
-                    
-            # 4) 숫자 포함(Digit In) 변조
-            elif cond[0] == "digit_in":
-                valid_digits = set()
-                for ph, pm, ps in possible_times:
-                    valid_digits.update([int(d) for d in f"{ph:02d}{pm:02d}{ps:02d}"])
-                
-                invalid_digits = list(set(range(10)) - valid_digits)
-                if invalid_digits:
-                    cond = ("digit_in", random.choice(invalid_digits))
-                    is_trap = True
-
-    # =========================================================================
-    # [수정된 반환] is_trap 정보를 detail에 추가하여 반환
-    # =========================================================================
-
-    if cond[0] == "specific_second":
-        return {
-            "type": "specific_number",
-            "description": f"시계에서 **{cond[1]}초**가 표시될 때 멈추세요!",
-            "detail": {"target": cond[1], "unit": "second", "is_trap": is_trap}
-        }
-    elif cond[0] == "specific_minute":
-        return {
-            "type": "specific_number",
-            "description": f"시계에서 **{cond[1]}분**이 표시될 때 멈추세요!",
-            "detail": {"target": cond[1], "unit": "minute", "is_trap": is_trap}
-        }
-    elif cond[0] == "matching":
-        # 연속 숫자는 변조가 복잡하므로 is_trap=False 고정 (혹은 위에서 처리 안함)
-        return {
-            "type": "matching_digits",
-            "description": f"숫자 **{cond[1]}**이 **{cond[2]}개** 연속으로 나타날 때 멈추세요!",
-            "detail": {"digit": cond[1], "count": cond[2], "is_trap": False}
-        }
-    elif cond[0] == "palindrome":
-        return {
-            "type": "palindrome",
-            "description": "시간 표시가 **회문(앞뒤로 읽어도 같은 숫자)**이 될 때 멈추세요!",
-            "detail": {"is_trap": False} # 회문은 변조 어려움
-        }
-    elif cond[0] == "digit_in":
-        return {
-            "type": "digit_appears",
-            "description": f"시간 표시에 숫자 **{cond[1]}**이 포함될 때 멈추세요!",
-            "detail": {"target_digit": cond[1], "is_trap": is_trap}
-        }
-    elif cond[0] == "digit_not_in":
-        return {
-            "type": "no_digit",
-            "description": f"시간 표시에 숫자 **{cond[1]}**이 없을 때 멈추세요!",
-            "detail": {"excluded_digit": cond[1], "is_trap": False}
-        }
-    elif cond[0] == "no_click_impossible":
-        return {
-            "type": "no_click",
-            "description": f"⚠️ 10초 동안 숫자 **{cond[1]}**이 나타나지 않습니다. **멈추지 마세요!**",
-            "detail": {"impossible_digit": cond[1], "is_trap": True} # 이건 원래 함정
-        }
-    elif cond[0] == "sum":
-        return {
-            "type": "sum_target",
-            "description": f"시간 숫자들의 **합이 {cond[1]}**이 될 때 멈추세요!",
-            "detail": {"target": cond[1], "is_trap": is_trap}
-        }
-    elif cond[0] == "second_zero":
-        return {
-            "type": "second_zero",
-            "description": "시계의 **초(秒)가 00**이 될 때 멈추세요!",
-            "detail": {"is_trap": False}
-        }
-    
-    # 고급 조건들은 변조 로직을 추가하지 않았으므로 is_trap=False로 반환
-    # (필요하다면 위쪽 is_trap 로직에 추가 가능)
-    elif cond[0] == "sum_even":
-        return {"type": "sum_even", "description": "합이 짝수일 때 멈추세요!", "detail": {"is_trap": False}}
-    elif cond[0] == "sum_odd":
-        return {"type": "sum_odd", "description": "합이 홀수일 때 멈추세요!", "detail": {"is_trap": False}}
-    elif cond[0] == "multiple_7":
-        return {"type": "multiple_7", "description": "초가 7의 배수일 때 멈추세요!", "detail": {"is_trap": False}}
-    elif cond[0] == "prime":
-        return {"type": "prime_second", "description": "초가 소수일 때 멈추세요!", "detail": {"is_trap": False}}
-    elif cond[0] == "sandwich":
-        return {"type": "sandwich", "description": "분과 초가 같을 때 멈추세요!", "detail": {"is_trap": False}}
-    elif cond[0] == "ascending":
-        return {"type": "ascending", "description": "숫자가 연속 증가할 때 멈추세요!", "detail": {"is_trap": False}}
-    elif cond[0] == "descending":
-        return {"type": "descending", "description": "숫자가 연속 감소할 때 멈추세요!", "detail": {"is_trap": False}}
-    
-    return None
-
-def is_prime(n):
-    """소수 판별"""
-    if n < 2:
-        return False
-    if n == 2:
-        return True
-    if n % 2 == 0:
-        return False
-    for i in range(3, int(n**0.5) + 1, 2):
-        if n % i == 0:
-            return False
-    return True
-
-
-def is_sequence_asc(digits):
-    """연속 증가 체크 (최소 3개)"""
-    count = 1
-    for i in range(1, len(digits)):
-        if digits[i] == digits[i-1] + 1:
-            count += 1
-            if count >= 3:
-                return True
-        else:
-            count = 1
-    return False
-
-
-def is_sequence_desc(digits):
-    """연속 감소 체크 (최소 3개)"""
-    count = 1
-    for i in range(1, len(digits)):
-        if digits[i] == digits[i-1] - 1:
-            count += 1
-            if count >= 3:
-                return True
-        else:
-            count = 1
-    return False
-
-
-def create_non_time_event(stage):
-    """시각과 무관한 조건 생성"""
-    event_types = ["bg_color", "icon", "clock_hl", "spacebar"]
-    
-    # 스테이지 10+ 에서 시계 색상 조건 추가
-    if stage >= 10:
-        event_types.append("clock_color")
-    
-    # 스테이지 15+ 에서 피지컬 조건 추가
-    if stage >= 15:
-        event_types.extend(["rapid_tap", "long_press", "dont_click", "rhythm"])
-    
-    etype = random.choice(event_types)
-    
-    if etype == "bg_color":
-        colors = {
-            "빨간색": "#e74c3c", "파란색": "#3498db", "초록색": "#2ecc71",
-            "노란색": "#f1c40f", "보라색": "#9b59b6", "주황색": "#e67e22"
-        }
-        name, hex_val = random.choice(list(colors.items()))
-        return {
-            "type": "bg_color_change",
-            "description": f"배경이 **{name}**으로 바뀌면 멈추세요!",
-            "detail": {"target_color_name": name, "target_color_hex": hex_val}
-        }
-    
-    elif etype == "icon":
-        icons = ["⭐", "🔥", "💎", "🌙", "❄️", "🍎", "🌈", "⚡", "🎯", "🦋"]
-        icon = random.choice(icons)
-        return {
-            "type": "icon_appears",
-            "description": f"화면에 **{icon}** 가 나타나면 멈추세요!",
-            "detail": {"target_icon": icon, "all_icons": icons}
-        }
-    
-    elif etype == "clock_hl":
-        clock = random.choice(CLOCK_TYPES)
-        labels = {"digital": "디지털", "analog": "아날로그", "binary": "바이너리", "flip": "플립", "neon": "네온"}
-        return {
-            "type": "clock_type_match",
-            "description": f"**{labels[clock]}** 시계가 빛나는 순간 멈추세요!",
-            "detail": {"target_clock": clock}
-        }
-    
-    elif etype == "clock_color":
-        colors = {
-            "빨간색": "#e74c3c", "파란색": "#3498db", "초록색": "#2ecc71",
-            "노란색": "#f1c40f", "보라색": "#9b59b6"
-        }
-        name, hex_val = random.choice(list(colors.items()))
-        return {
-            "type": "clock_color_match",
-            "description": f"시계가 **{name}**으로 빛날 때 멈추세요!",
-            "detail": {"target_color_name": name, "target_color_hex": hex_val}
-        }
-    
-    elif etype == "spacebar":
-        # 스테이지에 따라 횟수 증가
-        if stage < 5:
-            count = random.randint(3, 10)
-        elif stage < 10:
-            count = random.randint(10, 30)
-        elif stage < 15:
-            count = random.randint(20, 40)
-        else:
-            count = random.randint(40, 60)
-        
-        return {
-            "type": "spacebar_count",
-            "description": f"스페이스바를 정확히 **{count}번** 누르세요!",
-            "detail": {"target_count": count}
-        }
-    
-    # === 피지컬 조건들 ===
-    
-    elif etype == "rapid_tap":
-        # 초=00 순간부터 1초 안에 5번 연타
-        return {
-            "type": "rapid_tap",
-            "description": "**초가 00**이 되는 순간부터 **2초 안에 스페이스바 5번 연타**하세요!",
-            "detail": {"target_second": 0, "duration": 2.0, "tap_count": 5}
-        }
-    
-    elif etype == "long_press":
-        # 10의 배수일 때 1초 동안 길게 누르기
-        multiples = [10, 20, 30, 40, 50]
-        target = random.choice(multiples)
-        return {
-            "type": "long_press",
-            "description": f"**초가 {target}**일 때 스페이스바를 **1초 동안 꾹** 누르고 있으세요!",
-            "detail": {"target_second": target, "duration": 1.0}
-        }
-    
-    elif etype == "dont_click":
-        # 빨간색이 나오지 않으면 마지막에 누르기
-        return {
-            "type": "dont_click",
-            "description": "10초 동안 **빨간색 배경이 나오지 않으면** 마지막에 누르세요! (나오면 누르지 마세요)",
-            "detail": {"forbidden_color": "#e74c3c"}
-        }
-    
-    elif etype == "rhythm":
-        # 콜론 깜빡임에 맞춰 3번 연속
-        return {
-            "type": "rhythm_tap",
-            "description": "시계의 **콜론(:) 깜빡임에 맞춰** 스페이스바를 **3번 연속** 누르세요!",
-            "detail": {"tap_count": 3, "tolerance": 0.3}  # ±0.3초 허용
-        }
-    
-    return None
 
+# PROFILE=1 일 때만 요청 프로파일링 미들웨어 (profiling.py)
+profiling.install(app)
 
 # ─── ROUTES ──────────────────────────────────────────────────────
 
+# 시작할 때 읽어 둔 정적 파일 (압축본 + ETag, static_assets.py)
+ASSETS = static_assets.AssetStore()
+
+
 @app.route('/')
 def serve_index():
-    # 현재 실행 경로('.')에서 index.html 파일을 찾아 전송합니다.
-    return send_from_directory('.', 'index.html')
+    # index.html은 주소가 고정이므로 매번 ETag로 재검증 (바뀌지 않았으면 304)
+    asset = ASSETS.get("index.html")
+    if asset is None:
+        abort(404)
+    return static_assets.respond(app, asset, request, static_assets.REVALIDATE)
+
+
+@app.route("/<any('script.js', 'styles.css'):name>")
+def serve_asset(name):
+    asset = ASSETS.get(name)
+    if asset is None:
+        abort(404)
+    return static_assets.respond(app, asset, request, static_assets.REVALIDATE)
+
+
+@app.route("/static/<path:filename>")
+def serve_fingerprinted(filename):
+    """내용 해시가 붙은 주소 (내용이 바뀌면 주소가 바뀌므로 오래 캐시)"""
+    asset = ASSETS.by_fingerprint("/static/" + filename)
+    if asset is None:
+        abort(404)
+    return static_assets.respond(app, asset, request, static_assets.IMMUTABLE)
 
 
 @app.route("/api/register", methods=["POST"])
@@ -441,500 +156,334 @@ def register():
     if not name:
         return jsonify({"error": "이름을 입력해주세요"}), 400
     pid = str(uuid.uuid4())[:12]
-    conn = get_db()
-    conn.execute("INSERT INTO players (id, name) VALUES (?,?)", (pid, name))
-    conn.commit()
-    conn.close()
+    # id는 서버에서 만들므로 write-behind 모드에서도 바로 돌려줄 수 있다
+    run_write(lambda conn: conn.execute("INSERT INTO players (id, name) VALUES (?,?)", (pid, name)))
     return jsonify({"player_id": pid, "name": name})
 
 
 @app.route("/api/new_event", methods=["GET"])
 def new_event():
-    """스테이지마다 랜덤 이벤트 생성"""
+    """스테이지마다 랜덤 이벤트 생성
+
+    seed/t0를 주면 같은 이벤트를 그대로 다시 만든다 (리플레이/디버그용).
+    payload=seed 이면 이벤트 대신 재생성에 필요한 값(stage, seed, t0)만 돌려준다.
+    format=compact 이면 스케줄을 팔레트 인덱스 배열로 보낸다 (compact.py).
+    """
     stage = int(request.args.get("stage", 1))
-    
-    # 스테이지별 시계 개수
-    num_clocks = min(5, 1 + (stage - 1) // 5)
-    
-    # 바이너리 시계는 스테이지 10부터
-    available_clocks = CLOCK_TYPES.copy()
-    if stage < 10:
-        available_clocks = [c for c in available_clocks if c != "binary"]
-    
-    selected_clocks = random.sample(available_clocks, min(num_clocks, len(available_clocks)))
-    
-    # 숫자 표시 시계가 있는지 확인
-    has_digital = any(c in selected_clocks for c in ["digital", "binary", "flip", "neon"])
-    
-    # 이벤트 생성
-    if has_digital and random.random() < 0.7:  # 70% 확률로 시각 기반 조건
-        possible_times = get_possible_times()
-        evt = create_time_based_event(possible_times, stage)
-        if not evt:  # 생성 실패 시 fallback
-            evt = create_non_time_event(stage)
+    seed = request.args.get("seed", type=int)
+    t0 = request.args.get("t0", type=int)
+    if request.args.get("payload") == "seed":
+        return jsonify({"stage": stage, "seed": seed if seed is not None else new_seed(),
+                        "t0": t0 if t0 is not None else now_index()})
+    if seed is None and t0 is None and event_pool.EVENT_POOL:
+        # 미리 만들어 둔 이벤트 (시각 기반 조건만 지금 시각으로 확정)
+        payload = event_pool.get_event_pool().take(stage)
     else:
-        evt = create_non_time_event(stage)
-    
-    # 테마
-    themes = [
-        {"bg": "#0f0f1a", "accent": "#00fff5", "name": "dark_cyber"},
-        {"bg": "#1a0a2e", "accent": "#e94560", "name": "neon_night"},
-        {"bg": "#0d1117", "accent": "#58a6ff", "name": "github_dark"},
-        {"bg": "#1b1b2f", "accent": "#f0a500", "name": "amber_dark"},
-        {"bg": "#162447", "accent": "#e94560", "name": "deep_navy"},
-        {"bg": "#1e3a5f", "accent": "#00d2ff", "name": "ocean_deep"},
-    ]
-    theme = random.choice(themes)
-    
-    # 스케줄 생성
-    bg_schedule = []
-    icon_schedule = []
-    icons = ["⭐", "🔥", "💎", "🌙", "❄️", "🍎", "🌈", "⚡", "🎯", "🦋"]
-    
-    if evt["type"] == "bg_color_change":
-        target_color = evt["detail"]["target_color_hex"]
-        change_count = random.randint(3, 5) # 총 변경 횟수
-        min_dist = 1.2  # 각 색상 간의 최소 간격 (초 단위, 취향껏 조절하세요)
-        
-        # 1. 서로 겹치지 않는 시간대(슬롯)를 먼저 생성
-        scheduled_times = []
-        attempts = 0
-        while len(scheduled_times) < change_count and attempts < 100:
-            new_at = round(random.uniform(0.5, 9.0), 2)
-            # 기존에 선택된 시간들과 최소 간격(min_dist) 이상 떨어져 있는지 확인
-            if all(abs(new_at - t) >= min_dist for t in scheduled_times):
-                scheduled_times.append(new_at)
-            attempts += 1
-        
-        # 시간 순서대로 정렬
-        scheduled_times.sort()
-        
-        # 2. 생성된 시간 슬롯 중 하나를 랜덤하게 골라 정답 색상 위치로 지정
-        target_time_idx = random.randint(0, len(scheduled_times) - 1)
-        
-        # 3. 시간표(bg_schedule)에 색상 할당
-        for i, at in enumerate(scheduled_times):
-            if i == target_time_idx:
-                # 정답 색상 배치
-                bg_schedule.append({"at": at, "color": target_color})
-            else:
-                # 가짜 색상들 중 하나 골라 배치
-                other = [c for c in ["#e74c3c", "#3498db", "#2ecc71", "#f1c40f", "#9b59b6", "#e67e22"] if c != target_color]
-                bg_schedule.append({"at": at, "color": random.choice(other)})
-                
-        # 혹시 모를 순서 꼬임 방지를 위한 최종 정렬
-        bg_schedule.sort(key=lambda x: x["at"])
+        payload = generate_event(stage, seed, t0)
+    record_event(payload)
     
-    if evt["type"] == "icon_appears":
-        target_icon = evt["detail"]["target_icon"]
-        icon_count = random.randint(4, 8)
-        icon_schedule.append({"at": round(random.uniform(2.0, 8.0), 2), "icon": target_icon, "x": random.randint(5, 95), "y": random.randint(10, 85)})
-        for _ in range(icon_count - 1):
-            icon_schedule.append({"at": round(random.uniform(0.3, 9.7), 2), "icon": random.choice(icons), "x": random.randint(5, 95), "y": random.randint(10, 85)})
-        icon_schedule.sort(key=lambda x: x["at"])
-    
-    # 시계 강조 스케줄
-    clock_hl_schedule = []
-    clock_color_schedule = []  # 시계 색상 스케줄
-    hl_count = random.randint(3, 6)
-    
-    if evt["type"] == "clock_type_match":
-        target = evt["detail"]["target_clock"]
-        if target not in selected_clocks:
-            selected_clocks[random.randint(0, len(selected_clocks)-1)] = target
-        clock_hl_schedule.append({"at": round(random.uniform(2.0, 8.0), 2), "clock": target})
-        for _ in range(hl_count - 1):
-            clock_hl_schedule.append({"at": round(random.uniform(0.5, 9.5), 2), "clock": random.choice(selected_clocks)})
-    elif evt["type"] == "clock_color_match":
-        # 시계 색상 조건
-        target_color = evt["detail"]["target_color_hex"]
-        colors = ["#e74c3c", "#3498db", "#2ecc71", "#f1c40f", "#9b59b6"]
-        color_count = random.randint(3, 6)
-        clock_color_schedule.append({"at": round(random.uniform(2.0, 8.0), 2), "color": target_color})
-        for _ in range(color_count - 1):
-            other_colors = [c for c in colors if c != target_color]
-            clock_color_schedule.append({"at": round(random.uniform(0.5, 9.5), 2), "color": random.choice(other_colors)})
-        clock_color_schedule.sort(key=lambda x: x["at"])
-        # 일반 시계 강조도 진행
-        for _ in range(hl_count):
-            clock_hl_schedule.append({"at": round(random.uniform(0.5, 9.5), 2), "clock": random.choice(selected_clocks)})
+    # 서버에 저장해 두고 verify는 event_id만 받는다 (공유 테이블 기록은 뒤에서 모아서)
+    sid = SESSIONS.put(payload)
+    if request.args.get("format") == "compact":
+        return jsonify({"event_id": sid, **compact.encode(payload)})
+    return jsonify({"event_id": sid, **payload})
+
+
+# 한 번에 미리 받을 수 있는 스테이지 수
+MAX_BATCH_EVENTS = 20
+
+
+@app.route("/api/new_events", methods=["GET"])
+def new_events():
+    """stage부터 count개 스테이지 이벤트를 한 번에 생성 (미리 받기)
+
+    시각 기반 조건은 플레이 시작 시각에 맞춰야 하므로 event=None,
+    anchor="play_start"로 돌려준다. 해당 스테이지를 시작할 때
+    /api/new_event?stage=N&seed=S 를 부르면 같은 화면 구성에 조건만 확정된다.
+    seed/t0를 주면 i번째 스테이지는 seed + i, t0로 만든다 (재현/벤치마크용).
+    """
+    stage = int(request.args.get("stage", 1))
+    count = max(1, min(int(request.args.get("count", 1)), MAX_BATCH_EVENTS))
+    seed = request.args.get("seed", type=int)
+    t0 = request.args.get("t0", type=int)
+    encode = compact.encode if request.args.get("format") == "compact" else dict
+    items = []
+    for payload in generate_events(stage, count, t0, seed):
+        record_event(payload)
+        if payload["event"] is None:
+            items.append({"event_id": None, **encode(payload)})
+            continue
+        items.append({"event_id": SESSIONS.put(payload), **encode(payload)})
+    return jsonify({"stage": stage, "count": count, "events": items})
+
+
+@app.route("/api/palette", methods=["GET"])
+def palette():
+    """compact 응답용 정적 팔레트 (버전별로 바뀌지 않으므로 오래 캐시)"""
+    if request.if_none_match.contains(compact.PALETTE_ETAG.strip('"')):
+        resp = make_response("", 304)
     else:
-        for _ in range(hl_count):
-            clock_hl_schedule.append({"at": round(random.uniform(0.5, 9.5), 2), "clock": random.choice(selected_clocks)})
-    clock_hl_schedule.sort(key=lambda x: x["at"])
-    
-    # === 연출 효과 (스테이지별) ===
-    effects = []
-    
-    # 스테이지 7+ : 안개 효과
-    if stage >= 7 and random.random() < 0.3:  # 30% 확률
-        effects.append({"type": "fog", "opacity": 0.4})
-    
-    # 스테이지 12+ : 거울 모드
-    if stage >= 12 and random.random() < 0.2:  # 20% 확률
-        effects.append({"type": "mirror"})
-    
-    # 스테이지 18+ : 가짜 시계
-    if stage >= 18 and random.random() < 0.25:  # 25% 확률
-        effects.append({"type": "fake_clock", "offset": 1})  # 1초 빠른 시계
-    
-    # dont_click 조건일 때는 특별 배경 스케줄 생성
-    if evt["type"] == "dont_click":
-        # 빨간색이 나올지 말지 랜덤 결정
-        will_appear = random.random() < 0.5  # 50%
-        if will_appear:
-            # 빨간색 등장 (누르면 안 됨)
-            appear_at = round(random.uniform(2.0, 8.0), 2)
-            bg_schedule = [{"at": appear_at, "color": "#e74c3c"}]
-        else:
-            # 빨간색 안 나옴 (마지막에 눌러야 함)
-            bg_schedule = []
-        evt["detail"]["will_appear_red"] = will_appear
-    
-    return jsonify({
-        "stage": stage,
-        "event": evt,
-        "theme": theme,
-        "clocks": selected_clocks,
-        "bg_schedule": bg_schedule,
-        "icon_schedule": icon_schedule,
-        "clock_highlight_schedule": clock_hl_schedule,
-        "clock_color_schedule": clock_color_schedule,
-        "effects": effects,  # 연출 효과
-    })
+        resp = jsonify(compact.PALETTE_JSON)
+    resp.headers["ETag"] = compact.PALETTE_ETAG
+    resp.headers["Cache-Control"] = "public, max-age=86400"
+    return resp
+
+
+# 기록 값 상한 (공유 캐시 행이 32비트 정수, boards 커서 범위 안)
+RECORD_VALUE_MAX = 2 ** 31 - 1
+# seed 방식 verify의 seed 절댓값 상한 (SQLite/JSON 정수 범위 안)
+SEED_MAX = 2 ** 63 - 1
+
+
+def _int_field(data, name, default=0, lo=0, hi=RECORD_VALUE_MAX):
+    """JSON 본문의 정수 필드 (정수 또는 정수 문자열, 없거나 null이면 default). 아니거나 범위 밖이면 ValueError"""
+    value = data.get(name)
+    if value is None:
+        value = default
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{name}: 정수가 아닙니다")
+    value = int(value)
+    if not lo <= value <= hi:
+        raise ValueError(f"{name}: {lo}~{hi} 범위가 아닙니다")
+    return value
 
 
 @app.route("/api/verify", methods=["POST"])
 def verify():
     data = request.get_json()
-    event = data.get("event", {})
     current_time = data.get("current_time", {})
-    active_bg_color = data.get("active_bg_color")
-    active_icons = data.get("active_icons", [])
-    active_highlight = data.get("active_highlight")
-    active_clock_color = data.get("active_clock_color")
-    spacebar_count = data.get("spacebar_count", 0)
-    
-    etype = event.get("type")
-    detail = event.get("detail", {})
     h, m, s = current_time.get("h", 0), current_time.get("m", 0), current_time.get("s", 0)
-    
-    correct = False
-    digits = [int(d) for d in f"{h:02d}{m:02d}{s:02d}"]
-    expected_time = None  # 정답 시각
-    
-    if etype == "specific_number":
-        unit = detail["unit"]
-        target = detail["target"]
-        val = {"hour": h, "minute": m, "second": s}[unit]
-        correct = (val == target)
-        if not correct:
-            # 정답 시각 생성
-            if unit == "second":
-                expected_time = f"{h:02d}:{m:02d}:{target:02d}"
-            elif unit == "minute":
-                expected_time = f"{h:02d}:{target:02d}:{s:02d}"
-            elif unit == "hour":
-                expected_time = f"{target:02d}:{m:02d}:{s:02d}"
-    
-    elif etype == "matching_digits":
-        target_d = detail["digit"]
-        count = detail["count"]
-        run = 0
-        for d in digits:
-            if d == target_d:
-                run += 1
-                if run >= count:
-                    correct = True
-                    break
-            else:
-                run = 0
-        if not correct:
-            # 예시 시각 생성 - 명확하게 연속 표시
-            if count == 2:
-                # 초 자리에 연속 2개
-                ss = min(int(f"{target_d}{target_d}"), 59)
-                expected_time = f"{h:02d}:{m:02d}:{ss:02d} (예시)"
-            elif count == 3:
-                # 분초 자리에 연속 3개
-                mm = min(int(f"{target_d}{target_d}"), 59)
-                ss = min(int(f"{target_d}{(s % 10)}"), 59)
-                expected_time = f"{h:02d}:{mm:02d}:{ss:02d} (예시)"
-            else:
-                expected_time = f"연속 {count}개 필요 (예시)"
-    
-    elif etype == "palindrome":
-        s_str = f"{h:02d}{m:02d}{s:02d}"
-        correct = (s_str == s_str[::-1])
-        if not correct:
-            # 가장 가까운 회문 시각 예시
-            expected_time = "12:21:21 (예시)"
-    
-    elif etype == "digit_appears":
-        correct = (detail["target_digit"] in digits)
-        if not correct:
-            # 해당 숫자 포함 예시
-            td = detail["target_digit"]
-            # 초 자리에 타겟 숫자 (유효 범위 보장)
-            ss_str = f"{td}{(s % 10):01d}"
-            ss = min(int(ss_str), 59)
-            expected_time = f"{h:02d}:{m:02d}:{ss:02d} (예시)"
-    
-    elif etype == "no_digit":
-        correct = (detail["excluded_digit"] not in digits)
-        if not correct:
-            # 해당 숫자 없는 예시
-            excluded = detail["excluded_digit"]
-            # 제외된 숫자가 아닌 다른 숫자들로만 구성
-            safe_digits = [d for d in range(10) if d != excluded]
-            if safe_digits:
-                # 간단한 예시: 같은 숫자 반복
-                sample = safe_digits[0]
-                hh = min(sample * 10 + sample, 23)
-                mm = min(sample * 10 + sample, 59)
-                ss = min(sample * 10 + sample, 59)
-                expected_time = f"{hh:02d}:{mm:02d}:{ss:02d} (예시)"
-    
-    elif etype == "no_click":
-        # 불가능 조건 - 누르지 않았어야 함
-        clicked = data.get("clicked", True)
-        correct = not clicked
-    
-    elif etype == "sum_target":
-        correct = (sum(digits) == detail["target"])
-        if not correct:
-            expected_time = f"합={detail['target']} 예: 03:14:25 (3+1+4+2+5={detail['target']})"
-    
-    elif etype == "sum_even":
-        correct = (sum(digits) % 2 == 0)
-        if not correct:
-            expected_time = "합=짝수 예: 12:34:56 (1+2+3+4+5+6=21 홀수) → 12:34:52 (짝수)"
-    
-    elif etype == "sum_odd":
-        correct = (sum(digits) % 2 == 1)
-        if not correct:
-            expected_time = "합=홀수 예: 12:34:52 (짝수) → 12:34:56 (1+2+3+4+5+6=21 홀수)"
-    
-    elif etype == "multiple_7":
-        correct = (s % 7 == 0 and s > 0)
-        if not correct:
-            next_7 = ((s // 7) + 1) * 7
-            if next_7 < 60:
-                expected_time = f"{h:02d}:{m:02d}:{next_7:02d}"
-            else:
-                expected_time = f"{h:02d}:{(m+1)%60:02d}:07"
-    
-    elif etype == "prime_second":
-        correct = is_prime(s)
-        if not correct:
-            primes = [2,3,5,7,11,13,17,19,23,29,31,37,41,43,47,53,59]
-            next_prime = next((p for p in primes if p > s), primes[0])
-            if next_prime < 60:
-                expected_time = f"{h:02d}:{m:02d}:{next_prime:02d}"
-            else:
-                expected_time = f"{h:02d}:{(m+1)%60:02d}:02"
-    
-    elif etype == "sandwich":
-        correct = (m == s)
-        if not correct:
-            expected_time = f"{h:02d}:{s:02d}:{s:02d}"
-    
-    elif etype == "ascending":
-        correct = is_sequence_asc(digits)
-        if not correct:
-            expected_time = "예: 12:34:56 (연속 증가)"
-    
-    elif etype == "descending":
-        correct = is_sequence_desc(digits)
-        if not correct:
-            expected_time = "예: 10:09:08 (연속 감소)"
-    
-    elif etype == "bg_color_change":
-        correct = (active_bg_color == detail["target_color_hex"])
-    
-    elif etype == "icon_appears":
-        correct = (detail["target_icon"] in active_icons)
-    
-    elif etype == "clock_type_match":
-        correct = (active_highlight == detail["target_clock"])
-    
-    elif etype == "clock_color_match":
-        correct = (active_clock_color == detail["target_color_hex"])
-    
-    elif etype == "second_zero":
-        correct = (s == 0)
-    
-    elif etype == "spacebar_count":
-        correct = (spacebar_count == detail["target_count"])
-    
-    # === 피지컬 조건들 ===
-    
-    elif etype == "rapid_tap":
-        # 초=00 이후 1초 안에 5번 연타 확인
-        rapid_taps = data.get("rapid_taps", [])  # 탭 타임스탬프 리스트
-        target_s = detail["target_second"]
-        duration = detail["duration"]
-        required_count = detail["tap_count"]
-        
-        # 초=00이 된 시점 이후의 탭만 카운트
-        if s == target_s or (s == target_s + 1 and len(rapid_taps) > 0):
-            # 1초 이내에 5번 눌렀는지 확인
-            valid_taps = [t for t in rapid_taps if 0 <= t <= duration]
-            correct = (len(valid_taps) >= required_count)
-        else:
-            correct = False
-    
-    elif etype == "long_press":
-        # 특정 초에 1초 동안 길게 누르기
-        press_start = data.get("press_start")  # 누르기 시작 시각의 초
-        press_duration = data.get("press_duration", 0)  # 누른 시간
-        target_s = detail["target_second"]
-        required_duration = detail["duration"]
-        
-        correct = (press_start == target_s and press_duration >= required_duration)
-    
-    elif etype == "dont_click":
-        # 빨간색이 나왔는지 여부
-        red_appeared = data.get("red_appeared", False)
-        clicked = data.get("clicked", False)
-        
-        if red_appeared:
-            # 빨간색 나왔으면 누르면 안 됨
-            correct = not clicked
-        else:
-            # 빨간색 안 나왔으면 눌러야 함
-            correct = clicked
-    
-    elif etype == "rhythm_tap":
-        # 깜빡임에 맞춰 3번 연속
-        rhythm_taps = data.get("rhythm_taps", [])  # 탭 타임스탬프 리스트
-        blink_times = data.get("blink_times", [])  # 깜빡임 타이밍 리스트
-        required_count = detail["tap_count"]
-        tolerance = detail["tolerance"]
-        
-        # 각 탭이 깜빡임 타이밍과 ±0.3초 안에 있는지 확인
-        matched = 0
-        for tap in rhythm_taps:
-            for blink in blink_times:
-                if abs(tap - blink) <= tolerance:
-                    matched += 1
-                    break
-        
-        correct = (matched >= required_count)
-    
-    # 정답 정보 생성
-    answer_info = generate_answer_info(etype, detail)
+    t = time_index(h, m, s)
+    
+    event_id = data.get("event_id")
+    if event_id is not None and not isinstance(event_id, str):
+        return jsonify({"error": "event_id는 문자열"}), 400
+    if event_id:
+        # 서버에 저장된 이벤트 (검사기는 저장할 때 이미 준비됨)
+        sess = SESSIONS.get(event_id, get_db)
+        if sess is None:
+            return jsonify({"error": "이벤트가 만료되었거나 없습니다"}), 404
+        compiled = sess.compiled
+        stage, evt = sess.payload["stage"], sess.payload["event"]
+        try:
+            data = derive_inputs(sess.payload, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    elif data.get("seed") is not None:
+        # seed/stage/t0만 받은 경우: 같은 이벤트를 다시 만들어 검사
+        try:
+            stage = _int_field(data, "stage", 1, lo=1)
+            seed = _int_field(data, "seed", lo=-SEED_MAX, hi=SEED_MAX)
+            t0 = _int_field(data, "t0", lo=0, hi=DAY_SECONDS - 1)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        payload = generate_event(stage, seed, t0)
+        evt = payload["event"]
+        stage = payload["stage"]
+        compiled = compile_event(evt["type"], evt["detail"])
+        try:
+            data = derive_inputs(payload, data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        # 예전 클라이언트: event 전체를 보내는 방식 (stage는 보냈을 때만)
+        evt = data.get("event", {})
+        try:
+            stage = _int_field(data, "stage")
+            if not isinstance(evt, dict):
+                raise InvalidEvent("event가 객체가 아닙니다")
+            compiled = compile_event(evt.get("type"), evt.get("detail", {}))
+        except ValueError:  # InvalidEvent 포함
+            return jsonify({"error": "잘못된 이벤트입니다"}), 400
+    correct = compiled.check(t, data)
+    # etype은 예전 클라이언트가 보낸 문자열일 수 있으므로 등록된 것만 라벨로
+    etype_label = compiled.etype if compiled.etype in CONDITIONS else "unknown"
+    metrics.inc("verify_total", metrics.labels(etype=etype_label, correct="true" if correct else "false"))
+    t0 = g.get("request_t0")
+    outcome_log.record(stage, etype_label, correct, compiled.trap,
+                       time.perf_counter() - t0 if t0 is not None else 0.0, data.get("player_id"))
+    
+    # 정답 시각: 멈춘 시각 이후 조건을 만족하는 가장 가까운 시각
+    expected_time = None
+    if not correct and compiled.key is not None:
+        found = NEXT_MATCH.find(compiled.key, t + 1)
+        if found is not None:
+            expected_time = format_index(found)
     
     return jsonify({
         "correct": correct, 
-        "answer": answer_info,
+        "answer": compiled.answer,
         "expected_time": expected_time  # 정답 시각
     })
 
 
 def generate_answer_info(etype, detail):
-    if etype == "specific_number":
-        unit_label = {"hour": "시", "minute": "분", "second": "초"}[detail["unit"]]
-        return f"{detail['target']}{unit_label}이 표시될 때"
-    elif etype == "matching_digits":
-        return f"숫자 {detail['digit']}이 {detail['count']}개 연속으로 나타날 때"
-    elif etype == "palindrome":
-        return "시간이 회문(앞뒤 같은 숫자)일 때"
-    elif etype == "digit_appears":
-        return f"숫자 {detail['target_digit']}이 포함될 때"
-    elif etype == "no_digit":
-        return f"숫자 {detail['excluded_digit']}이 없을 때"
-    elif etype == "no_click":
-        return f"숫자 {detail.get('impossible_digit', '?')}이 나타나지 않으므로 누르지 않기"
-    elif etype == "sum_target":
-        return f"숫자 합이 {detail['target']}일 때"
-    elif etype == "sum_even":
-        return "숫자 합이 짝수일 때"
-    elif etype == "sum_odd":
-        return "숫자 합이 홀수일 때"
-    elif etype == "multiple_7":
-        return "초가 7의 배수일 때"
-    elif etype == "prime_second":
-        return "초가 소수일 때"
-    elif etype == "sandwich":
-        return "분과 초가 같을 때"
-    elif etype == "ascending":
-        return "숫자가 연속으로 증가할 때"
-    elif etype == "descending":
-        return "숫자가 연속으로 감소할 때"
-    elif etype == "bg_color_change":
-        return f"배경이 {detail.get('target_color_name', '특정 색')}일 때"
-    elif etype == "icon_appears":
-        return f"{detail['target_icon']} 아이콘이 나타날 때"
-    elif etype == "clock_type_match":
-        labels = {"digital": "디지털", "analog": "아날로그", "binary": "바이너리", "flip": "플립", "neon": "네온"}
-        return f"{labels[detail['target_clock']]} 시계가 빛날 때"
-    elif etype == "clock_color_match":
-        return f"시계가 {detail.get('target_color_name', '특정 색')}으로 빛날 때"
-    elif etype == "second_zero":
-        return "초가 00일 때"
-    elif etype == "spacebar_count":
-        return f"정확히 {detail['target_count']}번 눌렀을 때"
-    elif etype == "rapid_tap":
-        return f"초가 {detail['target_second']}이 된 후 {detail['duration']}초 안에 {detail['tap_count']}번 연타"
-    elif etype == "long_press":
-        return f"초가 {detail['target_second']}일 때 {detail['duration']}초 동안 꾹 누르기"
-    elif etype == "dont_click":
-        will_appear = detail.get("will_appear_red", False)
-        if will_appear:
-            return "빨간색이 나타났으므로 누르지 않기"
-        else:
-            return "빨간색이 나타나지 않았으므로 마지막에 누르기"
-    elif etype == "rhythm_tap":
-        return f"깜빡임에 맞춰 {detail['tap_count']}번 연속 누르기"
-    return "조건 충족 시"
+    cond = CONDITIONS.get(etype)
+    if cond is None:
+        return "조건 충족 시"
+    return cond.answer(detail)
 
 
 @app.route("/api/save_record", methods=["POST"])
 def save_record():
     data = request.get_json()
     pid = data.get("player_id")
-    max_stage = data.get("max_stage", 0)
-    total_correct = data.get("total_correct", 0)
-    total_wrong = data.get("total_wrong", 0)
-    conn = get_db()
-    conn.execute(
+    if pid is not None and not isinstance(pid, str):
+        return jsonify({"error": "player_id는 문자열"}), 400
+    try:
+        max_stage = _int_field(data, "max_stage")
+        total_correct = _int_field(data, "total_correct")
+        total_wrong = _int_field(data, "total_wrong")
+    except ValueError:
+        return jsonify({"error": f"max_stage / total_correct / total_wrong은 0~{RECORD_VALUE_MAX} 정수"}), 400
+    run_write(lambda conn: write_record(conn, pid, max_stage, total_correct, total_wrong))
+    return jsonify({"saved": True})
+
+
+def write_record(conn, pid, max_stage, total_correct, total_wrong):
+    """기록 INSERT + 개인 최고기록 / 일간·주간 집계 갱신 (커밋은 호출한 쪽에서)"""
+    cur = conn.execute(
         "INSERT INTO records (player_id, max_stage, total_correct, total_wrong) VALUES (?,?,?,?)",
         (pid, max_stage, total_correct, total_wrong)
     )
-    conn.commit()
-    conn.close()
-    return jsonify({"saved": True})
+    # 더 좋은 기록일 때만 덮어씀, 같은 트랜잭션 (boards.py)
+    # player_id 없는 기록은 NULL끼리 충돌하지 않아 매번 새 줄이 생기므로 건너뛴다
+    if pid is not None:
+        boards.record_best(conn, cur.lastrowid, pid, max_stage, total_correct)
+
+    # 공유 캐시(워커 간)와 N위 안에 드는 기록이면 리더보드 캐시 갱신 (커밋 후)
+    shared = shared_cache.get_shared_cache()
+    ranked = None
+    if (shared or LEADERBOARD).qualifies(max_stage, total_correct):
+        ranked = conn.execute("""
+            SELECT p.name, r.played_at FROM records r
+            JOIN players p ON p.id = r.player_id
+            WHERE r.id=?
+        """, (cur.lastrowid,)).fetchone()
+    if shared is None:
+        if ranked:
+            return lambda: LEADERBOARD.offer(cur.lastrowid, ranked["name"], max_stage, total_correct, ranked["played_at"])
+        return None
+
+    def publish():
+        shared.put_best(pid, max_stage, total_correct)
+        if ranked:
+            shared.offer(cur.lastrowid, ranked["name"], max_stage, total_correct, ranked["played_at"])
+    return publish
 
 
 @app.route("/api/leaderboard", methods=["GET"])
 def leaderboard():
-    conn = get_db()
-    rows = conn.execute("""
-        SELECT p.name, r.max_stage, r.total_correct, r.played_at
-        FROM records r
-        JOIN players p ON p.id = r.player_id
-        ORDER BY r.max_stage DESC, r.total_correct DESC
-        LIMIT 20
-    """).fetchall()
-    conn.close()
-    return jsonify([dict(row) for row in rows])
+    if PAGE_ARGS & request.args.keys():
+        return leaderboard_page()
+    shared = shared_cache.get_shared_cache()
+    if shared is not None and shared.leaderboard_gen() != LEADERBOARD.gen:
+        # 다른 워커가 바꿨으면 공유 캐시에서 다시 읽는다 (SQLite는 안 탄다)
+        snap = shared.leaderboard()
+        if snap is not None:
+            LEADERBOARD.replace(snap[1], snap[0])
+    if not LEADERBOARD.warm:
+        LEADERBOARD.load(get_db())
+    return jsonify(LEADERBOARD.body())
+
+
+# 이 중 하나라도 있으면 기간별/페이지 응답 (없으면 예전처럼 전체 상위 N개 목록)
+PAGE_ARGS = {"period", "bucket", "after", "limit"}
+
+
+def _board_args():
+    """(period, bucket) 또는 400 응답"""
+    period = request.args.get("period", "all")
+    if period not in boards.PERIODS:
+        return None, (jsonify({"error": f"period는 {'/'.join(boards.PERIODS)} 중 하나"}), 400)
+    try:
+        return (period, boards.parse_bucket(period, request.args.get("bucket"))), None
+    except ValueError:
+        return None, (jsonify({"error": "bucket은 YYYY-MM-DD"}), 400)
+
+
+def leaderboard_page():
+    """?period=all|day|week&bucket=YYYY-MM-DD&after=ms,tc,id&limit=N (키셋 페이지)"""
+    args, err = _board_args()
+    if err:
+        return err
+    period, bucket = args
+    try:
+        after = boards.parse_cursor(request.args.get("after"))
+        limit = min(max(int(request.args.get("limit", db.LEADERBOARD_SIZE)), 1), boards.PAGE_MAX)
+    except ValueError:
+        return jsonify({"error": f"after는 max_stage,total_correct,id (각 ±{boards.CURSOR_MAX} 안) / limit은 정수"}), 400
+    rows, nxt = boards.page(get_db(), period, bucket, after, limit)
+    return jsonify(fastjson.Raw.object(period=period, bucket=bucket, rows=rows, next=nxt))
+
+
+@app.route("/api/my_rank", methods=["GET"])
+def my_rank():
+    """?player_id=&period=all|day|week&bucket=YYYY-MM-DD (같은 점수는 같은 순위)"""
+    args, err = _board_args()
+    if err:
+        return err
+    period, bucket = args
+    pid = request.args.get("player_id")
+    return jsonify({"period": period, "bucket": bucket, **boards.rank(get_db(), pid, period, bucket)})
+
+
+@app.route("/api/write_queue", methods=["GET"])
+def write_queue_stats():
+    """write-behind 큐 지표 (큐 깊이, flush 지연)"""
+    if not db.WRITE_BEHIND:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, "durable_ack": db.WRITE_ACK_DURABLE, **db.get_writer().stats()})
+
+
+@app.route("/api/sessions", methods=["GET"])
+def session_stats():
+    """이벤트 세션 저장소 지표 (hit/miss/eviction)"""
+    return jsonify(SESSIONS.stats())
+
+
+@app.route("/api/event_pool", methods=["GET"])
+def event_pool_stats():
+    """이벤트 풀 지표 (구간별 hit rate, refill 지연, 메모리)"""
+    if not event_pool.EVENT_POOL:
+        return jsonify({"enabled": False})
+    return jsonify(event_pool.get_event_pool().stats())
+
+
+@app.route("/api/shared_cache", methods=["GET"])
+def shared_cache_stats():
+    """워커 간 공유 캐시 지표 (리더보드 세대, 최고기록 수, seqlock 재시도)"""
+    shared = shared_cache.get_shared_cache()
+    if shared is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **shared.stats()})
+
+
+@app.route("/api/outcome_log", methods=["GET"])
+def outcome_log_stats():
+    """verify 결과 로그 지표 (버퍼 크기, 버린 수, flush 지연)"""
+    if not outcome_log.OUTCOME_LOG:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **outcome_log.get_outcome_log().stats()})
 
 
 @app.route("/api/my_best", methods=["GET"])
 def my_best():
     pid = request.args.get("player_id")
+    shared = shared_cache.get_shared_cache()
+    best = shared.best(pid) if shared is not None else None
+    if best is not None:
+        return jsonify({"max_stage": best[0], "total_correct": best[1]})
     conn = get_db()
-    row = conn.execute("""
-        SELECT max_stage, total_correct FROM records
-        WHERE player_id=? ORDER BY max_stage DESC LIMIT 1
-    """, (pid,)).fetchone()
-    conn.close()
+    row = conn.execute(
+        "SELECT max_stage, total_correct FROM player_best WHERE player_id=?", (pid,)
+    ).fetchone()
     if row:
         return jsonify({"max_stage": row["max_stage"], "total_correct": row["total_correct"]})
     return jsonify({"max_stage": 0, "total_correct": 0})
 
 
 if __name__ == "__main__":
+    migrations.migrate_db()
     port = int(os.environ.get("PORT", 5000))
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""이벤트 생성 벤치마크: 스테이지마다 new_event vs new_events 한 번 (+ 시각 조건 확정)
+
+Flask test client로 K개 스테이지의 최종 이벤트를 받는 데 드는 시간을 비교한다.
+양쪽 다 같은 seed/t0를 쓰므로 끝에 손에 쥐는 이벤트가 같다 (실행마다 확인).
+
+- 단건: new_event?stage=i&seed=S+i&t0=T 를 K번
+- 배치: new_events?stage=1&count=K&seed=S&t0=T 한 번 + 시각 기반이라 미뤄진
+        스테이지(anchor=play_start)마다 new_event?stage=i&seed=S+i&t0=T 한 번
+
+시각 기반 조건은 플레이 시작 시각이 있어야 정해지므로, 배치로 줄어드는 것은
+나머지 스테이지의 요청/직렬화 비용이다. 요청 수도 함께 출력한다.
+
+    python bench/bench_batch_events.py [--count 10] [--rounds 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DB_PATH", tempfile.mkdtemp(prefix="bench_batch_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as game  # noqa: E402
+
+T0 = 12 * 3600
+
+# 비교에서 빼는 값 (세션 id는 요청마다 새로 만든다)
+VOLATILE = ("event_id",)
+
+
+def _final(payload):
+    return {k: v for k, v in payload.items() if k not in VOLATILE}
+
+
+def single(client, count, seed):
+    """(최종 이벤트 목록, 요청 수)"""
+    events = [client.get(f"/api/new_event?stage={1 + i}&seed={seed + i}&t0={T0}").get_json()
+              for i in range(count)]
+    return [_final(e) for e in events], count
+
+
+def batch(client, count, seed):
+    items = client.get(f"/api/new_events?stage=1&count={count}&seed={seed}&t0={T0}").get_json()["events"]
+    requests = 1
+    events = []
+    for item in items:
+        if item.get("anchor") == "play_start":
+            # 플레이 시작 때 조건 확정 (같은 seed → 같은 화면 구성)
+            item = client.get(f"/api/new_event?stage={item['stage']}&seed={item['seed']}&t0={T0}").get_json()
+            requests += 1
+        events.append(_final(item))
+    return events, requests
+
+
+def measure(fn, client, count, rounds):
+    fn(client, count, 0)  # 워밍업
+    requests = 0
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    for r in range(rounds):
+        requests += fn(client, count, r * count)[1]
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    n = rounds * count
+    return wall / n * 1e6, cpu / n * 1e6, requests / rounds
+
+
+def check_same(client, count, rounds):
+    """두 방식의 최종 이벤트가 같은지 (다르면 비교 자체가 의미 없다)"""
+    for r in range(rounds):
+        a, _ = single(client, count, r * count)
+        b, _ = batch(client, count, r * count)
+        if a != b:
+            raise SystemExit(f"round {r}: 단건/배치 결과가 다릅니다")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--count", type=int, default=10)
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    client = game.app.test_client()
+    check_same(client, args.count, min(args.rounds, 20))
+    s_wall, s_cpu, s_req = measure(single, client, args.count, args.rounds)
+    b_wall, b_cpu, b_req = measure(batch, client, args.count, args.rounds)
+
+    print(f"count={args.count} rounds={args.rounds} (이벤트 1개당, 결과 동일 확인)")
+    print(f"new_event x{args.count:<3}       : {s_wall:8.1f} us wall  {s_cpu:8.1f} us cpu  "
+          f"요청 {s_req:.1f}회")
+    print(f"new_events + 확정 : {b_wall:8.1f} us wall  {b_cpu:8.1f} us cpu  "
+          f"요청 {b_req:.1f}회  ({s_cpu / b_cpu:.2f}x cpu)")
+
+
+if __name__ == "__main__":
+    main()
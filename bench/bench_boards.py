@@ -0,0 +1,113 @@
+"""기간별 리더보드 벤치마크: 기록 수가 늘어도 p99가 그대로인지
+
+기록 N개짜리 임시 DB를 만들고 (마이그레이션 3의 records → 집계 채우기 포함)
+boards.py의 키셋 페이지 / 점수 분포 순위를 OFFSET 페이지 / COUNT(*) 순위와 비교한다.
+전체 페이지는 플레이어 단위(player_best)라 깊은 페이지는 플레이어 순위의 중간쯤을 고른다.
+
+    python bench/bench_boards.py [--sizes 10000,100000,1000000] [--players 5000] [--iters 300]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boards  # noqa: E402
+import db  # noqa: E402
+import migrations  # noqa: E402
+
+OFFSET_SQL = """
+    SELECT b.record_id AS id, p.name, b.max_stage, b.total_correct, b.played_at
+    FROM player_best b INDEXED BY idx_player_best_rank
+    JOIN players p ON p.id = b.player_id
+    ORDER BY b.max_stage DESC, b.total_correct DESC, b.record_id
+    LIMIT 20 OFFSET ?
+"""
+COUNT_SQL = """
+    SELECT COUNT(*) FROM player_best
+    WHERE max_stage > ? OR (max_stage = ? AND total_correct > ?)
+"""
+
+
+def build(path, n, players, seed=0):
+    """기록 n개 (최근 60일에 흩어 놓음) → 최신 스키마로 마이그레이션"""
+    rnd = random.Random(seed)
+    conn = db.connect(path)
+    for m in migrations.MIGRATIONS[:2]:
+        m.apply(conn)
+    conn.execute("PRAGMA user_version = 2")
+    conn.executemany("INSERT INTO players (id, name) VALUES (?,?)",
+                     ((f"p{i}", f"player{i}") for i in range(players)))
+    conn.executemany(
+        "INSERT INTO records (player_id, max_stage, total_correct, total_wrong, played_at) "
+        "VALUES (?,?,?,0, datetime('now', ?))",
+        ((f"p{rnd.randrange(players)}", rnd.randint(0, 30), rnd.randint(0, 60),
+          f"-{rnd.randrange(60 * 86400)} seconds") for _ in range(n)))
+    conn.execute("""
+        INSERT INTO player_best SELECT player_id, max_stage, total_correct FROM (
+            SELECT player_id, max_stage, total_correct,
+                   ROW_NUMBER() OVER (PARTITION BY player_id
+                                      ORDER BY max_stage DESC, total_correct DESC) AS rn
+            FROM records) WHERE rn = 1
+    """)
+    conn.commit()
+    t0 = time.perf_counter()
+    migrations.migrate(conn)
+    return conn, time.perf_counter() - t0
+
+
+def timed(fn, iters):
+    samples = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--players", type=int, default=5000)
+    ap.add_argument("--iters", type=int, default=300)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_boards_")
+    print(f"{'records':>10}{'backfill s':>12}  {'query':<22}{'p50 µs':>10}{'p99 µs':>10}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        conn, backfill = build(os.path.join(tmp, f"{n}.db"), n, args.players)
+        mid = conn.execute("SELECT COUNT(*) FROM player_best").fetchone()[0] // 2
+        row = conn.execute(OFFSET_SQL, (mid,)).fetchone()
+        cursor = (row["max_stage"], row["total_correct"], row["id"])
+        week = boards.current_bucket("week")
+        pids = [r[0] for r in conn.execute("SELECT player_id FROM player_best")]
+        rnd = random.Random(1)
+
+        def naive_rank():
+            pid = rnd.choice(pids)
+            mine = conn.execute("SELECT max_stage, total_correct FROM player_best WHERE player_id=?",
+                                (pid,)).fetchone()
+            conn.execute(COUNT_SQL, (mine[0], mine[0], mine[1])).fetchone()
+
+        cases = [
+            ("OFFSET page (mid)", lambda: conn.execute(OFFSET_SQL, (mid,)).fetchall()),
+            ("keyset page (mid)", lambda: boards.page(conn, "all", "", cursor)),
+            ("weekly page 1", lambda: boards.page(conn, "week", week)),
+            ("COUNT(*) rank", naive_rank),
+            ("hist rank (all)", lambda: boards.rank(conn, rnd.choice(pids), "all", "")),
+            ("hist rank (week)", lambda: boards.rank(conn, rnd.choice(pids), "week", week)),
+        ]
+        for i, (label, fn) in enumerate(cases):
+            p50, p99 = timed(fn, args.iters)
+            head = f"{n:>10}{backfill:>12.2f}" if i == 0 else " " * 22
+            print(f"{head}  {label:<22}{p50:>10.0f}{p99:>10.0f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
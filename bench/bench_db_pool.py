@@ -0,0 +1,91 @@
+"""DB 연결 방식 벤치마크: 요청마다 connect vs 워커 연결 풀
+
+Flask test client로 register → save_record → my_best → leaderboard 흐름을
+여러 스레드에서 반복하며 req/s를 비교한다. 예전 방식(get_db가 매번
+os.path.exists + sqlite3.connect + close)은 get_db를 바꿔 끼워 재현한다.
+
+    python bench/bench_db_pool.py [--seconds 5] [--threads 4]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DB_PATH", tempfile.mkdtemp(prefix="bench_db_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as game  # noqa: E402
+import db  # noqa: E402
+from flask import g  # noqa: E402
+
+
+def legacy_get_db():
+    """풀 도입 이전의 get_db (요청마다 새 연결, 기본 저널 모드)"""
+    if not os.path.exists(db.DB_PATH):
+        os.makedirs(db.DB_PATH)
+    conn = sqlite3.connect(db.DB)
+    conn.row_factory = sqlite3.Row
+    g.legacy_conns = getattr(g, "legacy_conns", []) + [conn]
+    return conn
+
+
+def close_legacy(exc):
+    for conn in g.pop("legacy_conns", []):
+        conn.close()
+
+
+# 첫 요청 전에 등록해야 한다 (legacy 연결이 없으면 아무것도 안 함)
+game.app.teardown_appcontext(close_legacy)
+
+
+def one_game(client):
+    pid = client.post("/api/register", json={"name": "bench"}).get_json()["player_id"]
+    client.post("/api/save_record", json={"player_id": pid, "max_stage": 7, "total_correct": 6, "total_wrong": 1})
+    client.get("/api/my_best?player_id=" + pid)
+    client.get("/api/leaderboard")
+    return 4
+
+
+def run(seconds, threads):
+    count = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(i):
+        client = game.app.test_client()
+        while time.perf_counter() < deadline:
+            count[i] += one_game(client)
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return sum(count) / seconds
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+
+    pooled = run(args.seconds, args.threads)
+
+    # 예전 방식: rollback 저널 + 요청마다 connect/close
+    db.get_pool().close()
+    conn = sqlite3.connect(db.DB)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+    game.get_db = legacy_get_db
+    legacy = run(args.seconds, args.threads)
+
+    print(f"threads={args.threads} seconds={args.seconds}")
+    print(f"open-per-request : {legacy:8.0f} req/s")
+    print(f"connection pool  : {pooled:8.0f} req/s  ({pooled / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""다음 정답 시각 검색(NEXT_MATCH) 벤치마크
+
+조건 종류별로 "정답까지 거리"가 가까운 시작점과 먼 시작점을 나눠
+조회 비용을 재고, 초 단위 선형 탐색과 비교한다.
+거리와 상관없이 ns/op가 평평하게 나오면 정상이다.
+정답 배열은 시작 시 전부 만들므로, 새 NextMatch를 만드는 시간과
+그 인스턴스에서 키마다 처음 조회하는 시간(first ns)도 따로 잰다.
+
+    python bench/bench_next_match.py [--repeat 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conditions import CONDITIONS  # noqa: E402
+from timetable import DAY_SECONDS, TABLE, NextMatch  # noqa: E402
+
+# verify()가 처리하는 시각 기반 etype 전부
+CASES = [
+    ("specific_number", {"unit": "second", "target": 37}),
+    ("specific_number", {"unit": "minute", "target": 12}),
+    ("matching_digits", {"digit": 5, "count": 3}),
+    ("palindrome", {}),
+    ("digit_appears", {"target_digit": 7}),
+    ("no_digit", {"excluded_digit": 1}),
+    ("sum_target", {"target": 33}),
+    ("sum_even", {}),
+    ("sum_odd", {}),
+    ("multiple_7", {}),
+    ("prime_second", {}),
+    ("sandwich", {}),
+    ("ascending", {}),
+    ("descending", {}),
+    ("second_zero", {}),
+]
+
+
+def linear_find(pos_set, start):
+    for i in range(DAY_SECONDS):
+        t = (start + i) % DAY_SECONDS
+        if t in pos_set:
+            return t
+    return None
+
+
+def starts_by_distance(pos):
+    """정답까지 거리가 가장 짧은/긴 시작점"""
+    near = pos[0]
+    far, gap = pos[0], 0
+    for a, b in zip(pos, list(pos[1:]) + [pos[0] + DAY_SECONDS]):
+        if b - a > gap:
+            far, gap = (a + 1) % DAY_SECONDS, b - a
+    return near, far, gap
+
+
+def bench(fn, repeat):
+    t0 = time.perf_counter_ns()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter_ns() - t0) / repeat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20000)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    next_match = NextMatch(TABLE)
+    print(f"NextMatch 생성: {(time.perf_counter() - t0) * 1000:.0f}ms ({len(next_match.keys())}개 키)\n")
+
+    print(f"{'etype':<16} {'detail':<34} {'gap(s)':>7} {'first ns':>9} {'near ns':>9} {'far ns':>9} "
+          f"{'linear far ns':>14}")
+    worst_ratio = 1.0
+    for etype, detail in CASES:
+        key = CONDITIONS[etype].key(detail)
+        t0 = time.perf_counter_ns()
+        next_match.find(key, 0)  # 이 인스턴스에서 처음 조회
+        first_ns = time.perf_counter_ns() - t0
+        pos = next_match.positions(key)
+        near, far, gap = starts_by_distance(pos)
+        near_ns = bench(lambda: next_match.find(key, near), args.repeat)
+        far_ns = bench(lambda: next_match.find(key, far), args.repeat)
+        pos_set = set(pos)
+        lin_ns = bench(lambda: linear_find(pos_set, far), max(1, args.repeat // 100))
+        worst_ratio = max(worst_ratio, far_ns / near_ns, near_ns / far_ns)
+        print(f"{etype:<16} {str(detail):<34} {gap:>7} {first_ns:>9} {near_ns:>9.0f} {far_ns:>9.0f} "
+              f"{lin_ns:>14.0f}")
+    unknown_ns = bench(lambda: next_match.find(("sum", 99), 0), args.repeat)
+    print(f"{'(목록에 없는 키)':<16} {str(('sum', 99)):<34} {'-':>7} {'-':>9} {unknown_ns:>9.0f}")
+    print(f"\n최대 near/far 비율: {worst_ratio:.2f}x (1에 가까울수록 거리와 무관)")
+
+
+if __name__ == "__main__":
+    main()
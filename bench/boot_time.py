@@ -0,0 +1,98 @@
+"""gunicorn 워커 부팅 시간 측정 (preload 켬/끔)
+
+임시 DB로 gunicorn을 띄워서 gunicorn.conf.py가 남기는 "worker N 부팅 X ms" 로그를
+모으고, 프로세스 시작부터 모든 워커가 준비될 때까지 / 첫 응답까지 걸린 시간을 잰다.
+워커 부팅은 fork 뒤 app import(preload가 아니면)와 워커 초기화까지다.
+
+    python bench/boot_time.py [--workers 4] [--runs 3]
+"""
+import argparse
+import http.client
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest import ROOT, free_port  # noqa: E402
+
+BOOT_RE = re.compile(r"worker (\d+) 부팅 ([\d.]+)ms")
+
+
+def boot_once(workers, preload):
+    """(워커별 부팅 ms 목록, 전체 준비 ms, 첫 응답 ms)"""
+    port = free_port()
+    db_dir = tempfile.mkdtemp(prefix="boot_db_")
+    log_path = os.path.join(db_dir, "gunicorn.log")
+    env = dict(os.environ, DB_PATH=db_dir, GUNICORN_PRELOAD="1" if preload else "0",
+               EVENT_POOL="0", METRICS="0")
+    cmd = [sys.executable, "-m", "gunicorn", "app:app", "-b", f"127.0.0.1:{port}",
+           "-w", str(workers), "--log-level", "info", "--error-logfile", log_path]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    first = ready = None
+    try:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline and ready is None:
+            if proc.poll() is not None:
+                raise RuntimeError(f"gunicorn이 종료되었습니다 (exit {proc.returncode})")
+            if first is None:
+                try:
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                    conn.request("GET", "/api/leaderboard")
+                    if conn.getresponse().status == 200:
+                        first = (time.perf_counter() - t0) * 1000
+                    conn.close()
+                except OSError:
+                    pass
+            boots = _boots(log_path)
+            if len(boots) >= workers:
+                ready = (time.perf_counter() - t0) * 1000
+            time.sleep(0.005)
+        if ready is None:
+            raise RuntimeError("워커가 60초 안에 다 뜨지 않았습니다")
+        return boots, ready, first
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+def _boots(log_path):
+    try:
+        with open(log_path, encoding="utf-8") as f:
+            return [float(m.group(2)) for m in BOOT_RE.finditer(f.read())]
+    except FileNotFoundError:
+        return []
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'mode':<12}{'worker boot p50':>16}{'max':>10}{'all ready':>12}{'first 200':>12}  (ms)")
+    for preload in (False, True):
+        boots, readies, firsts = [], [], []
+        for _ in range(args.runs):
+            b, r, f = boot_once(args.workers, preload)
+            boots += b
+            readies.append(r)
+            if f is not None:
+                firsts.append(f)
+        first = f"{statistics.median(firsts):>12.0f}" if firsts else f"{'-':>12}"
+        print(f"{'preload' if preload else 'no preload':<12}{statistics.median(boots):>16.1f}"
+              f"{max(boots):>10.1f}{statistics.median(readies):>12.0f}{first}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""엔드포인트 부하 테스트 (로컬 gunicorn + 임시 DB)
+
+gunicorn app:app 을 127.0.0.1 임의 포트에 띄우고 (DB_PATH는 임시 폴더)
+실제 게임 흐름을 여러 가상 사용자로 반복한 뒤 라우트별 처리량과
+p50/p95/p99 지연을 보고한다. 네트워크 밖으로는 나가지 않는다.
+
+    python bench/loadtest.py [--mix game] [--users 16] [--seconds 10] [--workers 2]
+    python bench/loadtest.py --rate 50            # open-loop: 초당 50게임 시작
+    python bench/loadtest.py --out base.json      # 결과 저장
+    python bench/loadtest.py --baseline base.json # 저장한 결과와 비교 (회귀면 exit 1)
+    python bench/loadtest.py --url http://127.0.0.1:5000  # 이미 떠 있는 서버
+
+믹스
+- game   : register → (new_event → verify) x stages → save_record → leaderboard → my_best
+- events : new_event → verify 만 반복 (이벤트 생성/검증 경로)
+- read   : leaderboard / my_best 만 반복 (조회 경로)
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ─── 서버 ────────────────────────────────────────────────────────
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, threads, env_extra):
+    """임시 DB로 gunicorn 실행 → (process, host, port, db_dir)"""
+    port = free_port()
+    db_dir = tempfile.mkdtemp(prefix="loadtest_db_")
+    env = dict(os.environ, DB_PATH=db_dir, **env_extra)
+    cmd = [sys.executable, "-m", "gunicorn", "app:app", "-b", f"127.0.0.1:{port}",
+           "-w", str(workers), "--threads", str(threads), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn이 종료되었습니다 (exit {proc.returncode})")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/leaderboard")
+            conn.getresponse().read()
+            conn.close()
+            return proc, "127.0.0.1", port, db_dir
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("gunicorn이 60초 안에 뜨지 않았습니다")
+
+
+def stop_server(proc, db_dir):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+    shutil.rmtree(db_dir, ignore_errors=True)
+
+
+# ─── 클라이언트 ──────────────────────────────────────────────────
+
+class Recorder:
+    """라우트별 지연(ms) / 오류 수 (스레드 안전)"""
+
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lag = []  # open-loop: 예정 시각보다 늦게 시작한 시간 (ms)
+        self._lock = threading.Lock()
+
+    def add(self, route, ms, ok):
+        with self._lock:
+            self.latency[route].append(ms)
+            if not ok:
+                self.errors[route] += 1
+
+
+class Client:
+    """keep-alive 연결 하나로 요청하는 가상 사용자"""
+
+    def __init__(self, host, port, rec):
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.rec = rec
+
+    def call(self, method, path, body=None):
+        route = path.split("?", 1)[0]
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        data = json.dumps(body) if body is not None else None
+        t0 = time.perf_counter()
+        try:
+            self.conn.request(method, path, data, headers)
+            resp = self.conn.getresponse()
+            raw = resp.read()
+            ok = resp.status < 400
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.rec.add(route, (time.perf_counter() - t0) * 1000, False)
+            return None
+        self.rec.add(route, (time.perf_counter() - t0) * 1000, ok)
+        return json.loads(raw) if ok and raw else None
+
+    def close(self):
+        self.conn.close()
+
+
+def play_stage(c, rng, stage):
+    evt = c.call("GET", f"/api/new_event?stage={stage}")
+    if not evt:
+        return False
+    # 10초 안의 아무 시각에 멈춘 것으로 보낸다 (정답 여부는 상관없음)
+    t = (evt["t0"] + rng.randint(1, 10)) % 86400
+    c.call("POST", "/api/verify", {
+        "event_id": evt["event_id"],
+        "current_time": {"h": t // 3600, "m": t // 60 % 60, "s": t % 60},
+        "stopped_at": round(rng.uniform(0.5, 9.5), 2),
+        "spacebar_count": rng.randint(0, 20),
+        "clicked": True,
+    })
+    return rng.random() < 0.8
+
+
+def mix_game(c, rng, state):
+    reg = c.call("POST", "/api/register", {"name": f"lt{rng.randint(0, 99999)}"})
+    if not reg:
+        return
+    pid = reg["player_id"]
+    stage, correct = 1, 0
+    while stage <= 25 and play_stage(c, rng, stage):
+        stage += 1
+        correct += 1
+    c.call("POST", "/api/save_record", {"player_id": pid, "max_stage": stage,
+                                        "total_correct": correct, "total_wrong": 1})
+    c.call("GET", "/api/leaderboard")
+    c.call("GET", f"/api/my_best?player_id={pid}")
+    state["pids"].append(pid)
+
+
+def mix_events(c, rng, state):
+    play_stage(c, rng, rng.randint(1, 25))
+
+
+def mix_read(c, rng, state):
+    if rng.random() < 0.5 or not state["pids"]:
+        c.call("GET", "/api/leaderboard")
+    else:
+        c.call("GET", f"/api/my_best?player_id={rng.choice(state['pids'])}")
+
+
+MIXES = {"game": mix_game, "events": mix_events, "read": mix_read}
+
+
+def seed_players(host, port, rec, n=50):
+    """read 믹스용 기록 미리 채우기 (측정에는 넣지 않는다)"""
+    c = Client(host, port, Recorder())
+    pids = []
+    for i in range(n):
+        reg = c.call("POST", "/api/register", {"name": f"seed{i}"})
+        if reg:
+            pids.append(reg["player_id"])
+            c.call("POST", "/api/save_record", {"player_id": reg["player_id"], "max_stage": i % 20 + 1,
+                                                "total_correct": i % 20, "total_wrong": 1})
+    c.close()
+    return pids
+
+
+def run_closed(host, port, mix, users, seconds, seed, state):
+    """closed-loop: users명이 쉬지 않고 반복"""
+    rec = Recorder()
+    deadline = time.perf_counter() + seconds
+
+    def user(i):
+        rng = random.Random(seed + i)
+        c = Client(host, port, rec)
+        while time.perf_counter() < deadline:
+            mix(c, rng, state)
+        c.close()
+
+    ts = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return rec, time.perf_counter() - t0
+
+
+def run_open(host, port, mix, rate, seconds, seed, state, max_inflight):
+    """open-loop: 응답과 무관하게 초당 rate번 믹스 한 번(게임 하나)을 시작"""
+    rec = Recorder()
+    local = threading.local()
+
+    def one(i, due):
+        rec.lag.append((time.perf_counter() - due) * 1000)
+        if not hasattr(local, "client"):
+            local.client = Client(host, port, rec)
+        mix(local.client, random.Random(seed + i), state)
+
+    interval = 1.0 / rate
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        i = 0
+        while True:
+            due = t0 + i * interval
+            if due - t0 >= seconds:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, i, due)
+            i += 1
+    return rec, time.perf_counter() - t0
+
+
+# ─── 보고 ────────────────────────────────────────────────────────
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+def summarize(rec, elapsed):
+    routes = {}
+    total = 0
+    for route, values in sorted(rec.latency.items()):
+        values.sort()
+        total += len(values)
+        routes[route] = {
+            "count": len(values),
+            "rps": round(len(values) / elapsed, 1),
+            "errors": rec.errors.get(route, 0),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+        }
+    out = {"elapsed_s": round(elapsed, 3), "total_rps": round(total / elapsed, 1), "routes": routes}
+    if rec.lag:
+        lag = sorted(rec.lag)
+        out["schedule_lag_ms"] = {"p50": round(percentile(lag, 50), 3), "p99": round(percentile(lag, 99), 3)}
+    return out
+
+
+def print_report(result):
+    print(f"{'route':<18}{'count':>8}{'rps':>9}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, r in result["routes"].items():
+        print(f"{route:<18}{r['count']:>8}{r['rps']:>9.1f}{r['errors']:>6}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+    print(f"total {result['total_rps']:.1f} req/s over {result['elapsed_s']:.1f}s")
+    if "schedule_lag_ms" in result:
+        lag = result["schedule_lag_ms"]
+        print(f"open-loop 시작 지연 p50 {lag['p50']:.2f} ms / p99 {lag['p99']:.2f} ms")
+
+
+def compare(result, baseline, threshold):
+    """기준 결과 대비 라우트별 변화, 회귀(threshold % 이상 악화) 목록 반환"""
+    regressions = []
+    cfg, base_cfg = result.get("config", {}), baseline.get("config", {})
+    for key in ("mix", "users", "rate", "workers", "threads", "env"):
+        if cfg.get(key) != base_cfg.get(key):
+            print(f"주의: {key} 설정이 기준과 다릅니다 ({base_cfg.get(key)} → {cfg.get(key)})")
+    # open-loop 처리량은 rate가 정하므로 지연만 비교한다
+    check_rps = not cfg.get("rate")
+    print(f"\n{'route':<18}{'rps':>10}{'p50':>10}{'p99':>10}   (기준 대비 %)")
+    for route, r in result["routes"].items():
+        b = baseline["routes"].get(route)
+        if not b:
+            continue
+        d_rps = (r["rps"] / b["rps"] - 1) * 100 if b["rps"] else 0.0
+        d_p50 = (r["p50_ms"] / b["p50_ms"] - 1) * 100 if b["p50_ms"] else 0.0
+        d_p99 = (r["p99_ms"] / b["p99_ms"] - 1) * 100 if b["p99_ms"] else 0.0
+        flag = ""
+        if (check_rps and d_rps < -threshold) or d_p50 > threshold or d_p99 > threshold:
+            flag = "  <- 회귀"
+            regressions.append(route)
+        print(f"{route:<18}{d_rps:>+9.1f}%{d_p50:>+9.1f}%{d_p99:>+9.1f}%{flag}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mix", choices=sorted(MIXES), default="game")
+    ap.add_argument("--users", type=int, default=16, help="closed-loop 가상 사용자 수")
+    ap.add_argument("--rate", type=float, help="open-loop: 초당 믹스 시작 횟수")
+    ap.add_argument("--max-inflight", type=int, default=256, help="open-loop 동시 실행 상한")
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--warmup", type=float, default=2)
+    ap.add_argument("--workers", type=int, default=2, help="gunicorn 워커 수")
+    ap.add_argument("--threads", type=int, default=4, help="gunicorn 워커당 스레드 수")
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                    help="서버 환경 변수 (예: DB_WRITE_BEHIND=1)")
+    ap.add_argument("--url", help="이미 떠 있는 서버 (주면 gunicorn을 띄우지 않음)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="결과 JSON 저장 경로")
+    ap.add_argument("--baseline", help="비교할 기준 결과 JSON")
+    ap.add_argument("--threshold", type=float, default=10.0, help="회귀 판정 기준 (%%)")
+    args = ap.parse_args()
+
+    proc = db_dir = None
+    if args.url:
+        u = urlparse(args.url)
+        host, port = u.hostname, u.port or 80
+    else:
+        env_extra = dict(kv.split("=", 1) for kv in args.env)
+        proc, host, port, db_dir = start_server(args.workers, args.threads, env_extra)
+    try:
+        mix = MIXES[args.mix]
+        state = {"pids": seed_players(host, port, Recorder())}
+        if args.warmup > 0:
+            run_closed(host, port, mix, args.users, args.warmup, args.seed + 10**6, state)
+        if args.rate:
+            rec, elapsed = run_open(host, port, mix, args.rate, args.seconds, args.seed, state, args.max_inflight)
+        else:
+            rec, elapsed = run_closed(host, port, mix, args.users, args.seconds, args.seed, state)
+    finally:
+        if proc is not None:
+            stop_server(proc, db_dir)
+
+    result = summarize(rec, elapsed)
+    result["config"] = {k: getattr(args, k) for k in
+                        ("mix", "users", "rate", "seconds", "workers", "threads", "env", "seed")}
+    print_report(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
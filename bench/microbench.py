@@ -0,0 +1,260 @@
+"""이벤트 생성/검증 핫 함수 마이크로벤치마크
+
+함수 단위로 ns/op와 호출당 메모리 할당을 잰다. 난수는 모두 고정 seed라서
+같은 코드면 같은 입력 순서가 들어가고, 결과를 JSON으로 저장해 커밋끼리 비교할 수 있다.
+
+    python bench/microbench.py                       # 전체
+    python bench/microbench.py -k verify.check       # 이름에 포함된 것만
+    python bench/microbench.py --out before.json
+    python bench/microbench.py --compare before.json # 저장한 결과 대비 변화 (%)
+
+항목
+- get_possible_times
+- create_time_based_event.stage{1,5,10,15,20}
+- create_non_time_event.stage{1,5,10,15,20}
+- build_schedules.<etype>   : generate_event의 스케줄 단계
+- generate_event.stage{1,5,10,15,20}
+- verify.compile.<etype>    : compile_event (seed/예전 방식 verify가 매번 하는 일)
+- verify.check.<etype>      : 검사 클로저 호출 (event_id 방식 verify)
+  (조건 레지스트리의 모든 etype, rhythm_tap은 탭/깜빡임 이중 루프 포함)
+
+allocations
+- alloc_peak_bytes : 한 번 호출하는 동안 tracemalloc 최대 사용량 (임시 객체 포함)
+- alloc_blocks     : 호출 1000번 뒤 남은 메모리 블록 수 / 1000 (누수 확인용)
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conditions import CONDITIONS, build_event, build_time_event, compile_event  # noqa: E402
+from events import (build_schedules, create_non_time_event, create_time_based_event,  # noqa: E402
+                    generate_event, get_possible_times)
+from timetable import DAY_SECONDS  # noqa: E402
+
+SEED = 20240501
+STAGES = (1, 5, 10, 15, 20)
+
+# 시각 기반 조건의 대표 인자 (build_time_event(etype, *args))
+TIME_ARGS = {
+    "specific_number": ("second", 30),
+    "matching_digits": (1, 3),
+    "palindrome": (),
+    "digit_appears": (7,),
+    "no_digit": (7,),
+    "no_click": (7,),
+    "sum_target": (20,),
+    "second_zero": (),
+    "sum_even": (),
+    "sum_odd": (),
+    "multiple_7": (),
+    "prime_second": (),
+    "sandwich": (),
+    "ascending": (),
+    "descending": (),
+}
+
+# verify 요청에 올 수 있는 입력을 모두 채운 것 (rhythm_tap은 10탭 x 20깜빡임)
+VERIFY_DATA = {
+    "spacebar_count": 12,
+    "active_bg_color": "#3498db",
+    "active_icons": ["⭐", "🔥", "🍎"],
+    "active_highlight": "analog",
+    "active_clock_color": "#2ecc71",
+    "rapid_taps": [0.1, 0.3, 0.5, 0.8, 1.1, 1.4],
+    "press_start": 20,
+    "press_duration": 1.2,
+    "clicked": True,
+    "red_appeared": False,
+    "rhythm_taps": [0.5 * i + 0.05 for i in range(10)],
+    "blink_times": [0.5 * i for i in range(20)],
+}
+
+
+def sample_event(etype, rng):
+    if etype in TIME_ARGS:
+        return build_time_event(etype, *TIME_ARGS[etype])
+    return build_event(etype, 20, rng)
+
+
+# ─── 측정 ────────────────────────────────────────────────────────
+
+def _calibrate(make, target_s):
+    number = 1
+    while True:
+        fn = make()
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - t0 >= target_s / 10 or number >= 1 << 22:
+            return max(1, int(number * target_s / max(time.perf_counter() - t0, 1e-9) / 10))
+        number *= 2
+
+
+def measure(make, repeat, target_s, number=None):
+    """ns/op (repeat번 중 최소/중앙값) + 할당"""
+    number = number or _calibrate(make, target_s)
+    gc_was = gc.isenabled()
+    gc.disable()
+    try:
+        runs = []
+        for _ in range(repeat):
+            fn = make()
+            t0 = time.perf_counter_ns()
+            for _ in range(number):
+                fn()
+            runs.append((time.perf_counter_ns() - t0) / number)
+    finally:
+        if gc_was:
+            gc.enable()
+    runs.sort()
+
+    fn = make()
+    tracemalloc.start()
+    fn()  # 캐시 워밍
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    fn = make()
+    fn()
+    gc.collect()
+    blocks0 = sys.getallocatedblocks()
+    for _ in range(1000):
+        fn()
+    gc.collect()
+    blocks = (sys.getallocatedblocks() - blocks0) / 1000
+
+    return {
+        "ns_per_op": round(runs[0], 1),
+        "ns_median": round(runs[len(runs) // 2], 1),
+        "number": number,
+        "alloc_peak_bytes": peak,
+        "alloc_blocks": round(blocks, 3),
+    }
+
+
+# ─── 항목 ────────────────────────────────────────────────────────
+# 항목마다 make()가 새 난수/입력 상태로 호출 대상을 만든다. 반복마다 make()를
+# 다시 부르므로 (측정 밖) 같은 number면 매번 같은 입력 순서가 들어간다.
+
+def _inputs(values):
+    """고정 seed로 섞은 입력을 처음부터 돌아가며 돌려주는 함수"""
+    values = list(values)
+    random.Random(SEED).shuffle(values)
+    n, state = len(values), [0]
+
+    def nxt():
+        i = state[0]
+        state[0] = (i + 1) % n
+        return values[i]
+    return nxt
+
+
+def cases():
+    """(이름, make) 목록"""
+    out = []
+    rng = random.Random(SEED)
+    t0s = [rng.randrange(DAY_SECONDS) for _ in range(512)]
+    windows = [get_possible_times(t) for t in t0s]
+    seeds = range(SEED, SEED + 512)
+
+    def make_possible_times():
+        nt = _inputs(t0s)
+        return lambda: get_possible_times(nt())
+    out.append(("get_possible_times", make_possible_times))
+
+    for stage in STAGES:
+        def make(st=stage):
+            nw, r = _inputs(windows), random.Random(SEED + st)
+            return lambda: create_time_based_event(nw(), st, r)
+        out.append((f"create_time_based_event.stage{stage}", make))
+    for stage in STAGES:
+        def make(st=stage):
+            r = random.Random(SEED + st)
+            return lambda: create_non_time_event(st, r)
+        out.append((f"create_non_time_event.stage{stage}", make))
+
+    clocks = ["digital", "analog", "flip", "neon"]
+    for etype in ("bg_color_change", "icon_appears", "clock_type_match", "clock_color_match", "specific_number"):
+        def make(e=sample_event(etype, random.Random(SEED))):
+            r = random.Random(SEED)
+            return lambda: build_schedules(e, list(clocks), r)
+        out.append((f"build_schedules.{etype}", make))
+
+    for stage in STAGES:
+        def make(st=stage):
+            ns, nt = _inputs(seeds), _inputs(t0s)
+            return lambda: generate_event(st, ns(), nt())
+        out.append((f"generate_event.stage{stage}", make))
+
+    for etype in CONDITIONS:
+        detail = sample_event(etype, random.Random(SEED))["detail"]
+        out.append((f"verify.compile.{etype}", lambda e=etype, d=detail: lambda: compile_event(e, d)))
+
+        def make(check=compile_event(etype, detail).check):
+            nt = _inputs(t0s)
+            return lambda: check(nt(), VERIFY_DATA)
+        out.append((f"verify.check.{etype}", make))
+    return out
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline):
+    print(f"\n{'name':<44}{'before ns':>12}{'after ns':>12}{'change':>9}")
+    for name, r in results.items():
+        b = baseline.get("results", {}).get(name)
+        if not b:
+            continue
+        change = (r["ns_per_op"] / b["ns_per_op"] - 1) * 100 if b["ns_per_op"] else 0.0
+        print(f"{name:<44}{b['ns_per_op']:>12.1f}{r['ns_per_op']:>12.1f}{change:>+8.1f}%")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-k", dest="pattern", help="이름에 이 문자열이 들어간 항목만")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--target", type=float, default=0.2, help="반복 한 번당 목표 시간 (초)")
+    ap.add_argument("--number", type=int, help="반복 한 번당 호출 수 고정 (주지 않으면 --target으로 보정)")
+    ap.add_argument("--out", help="결과 JSON 저장 경로")
+    ap.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = ap.parse_args()
+
+    results = {}
+    print(f"{'name':<44}{'ns/op':>12}{'median':>12}{'peak B':>9}{'blocks':>8}")
+    for name, make in cases():
+        if args.pattern and args.pattern not in name:
+            continue
+        r = results[name] = measure(make, args.repeat, args.target, args.number)
+        print(f"{name:<44}{r['ns_per_op']:>12.1f}{r['ns_median']:>12.1f}"
+              f"{r['alloc_peak_bytes']:>9}{r['alloc_blocks']:>8.2f}")
+
+    meta = {"commit": git_commit(), "python": platform.python_version(), "seed": SEED,
+            "repeat": args.repeat, "target_s": args.target}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""기간별 리더보드 (전체 / 일간 / 주간), 키셋 페이지, 내 순위
+
+- board_rollup: (period, bucket, player_id)마다 그 기간의 최고기록 한 줄.
+  bucket은 일간이면 날짜, 주간이면 그 주 월요일 날짜 (played_at과 같은 UTC 기준).
+  save_record가 기록을 넣는 트랜잭션 안에서 player_best와 함께 갱신한다.
+- score_hist: (scope, bucket, max_stage, total_correct)마다 그 점수인 플레이어 수.
+  내 순위 = 1 + 나보다 좋은 점수 칸들의 합이라, 읽는 행 수가 기록 수가 아니라
+  서로 다른 점수 개수에 묶인다 (COUNT(*)로 앞사람을 세지 않는다).
+- 페이지: after=(max_stage,total_correct,id) 커서 다음부터. OFFSET 없이
+  정렬 인덱스에서 바로 그 위치로 찾아 들어가므로 뒤 페이지도 첫 페이지와 비용이 같다.
+  전체도 일간/주간처럼 플레이어마다 최고기록 한 줄(player_best)이라 페이지의 순서와
+  내 순위가 같은 것을 센다. id는 그 최고기록의 record id.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+import db
+import fastjson
+
+PERIODS = ("all", "day", "week")
+PAGE_MAX = 100
+CURSOR_MAX = 2 ** 63 - 1  # 커서 각 값의 절댓값 상한 (SQLite 64비트 정수, 저장된 어떤 값이든 담긴다)
+
+# 새 기록의 버킷 (records.played_at 기본값 CURRENT_TIMESTAMP가 UTC)
+BUCKET_SQL = """
+    SELECT date(played_at), date(played_at, 'weekday 0', '-6 days'), played_at
+    FROM records WHERE id=?
+"""
+
+
+def _better(score, old):
+    return score[0] > old[0] or (score[0] == old[0] and score[1] > old[1])
+
+
+def current_bucket(period, today=None):
+    """오늘이 속한 버킷 (전체는 '')"""
+    if period == "all":
+        return ""
+    today = today or datetime.now(timezone.utc).date()
+    if period == "week":
+        today -= timedelta(days=today.weekday())
+    return today.isoformat()
+
+
+def parse_bucket(period, value):
+    """요청의 날짜 → 버킷 (주간은 아무 날짜나 받아 그 주 월요일로). 잘못되면 ValueError"""
+    if period == "all" or not value:
+        return current_bucket(period)
+    return current_bucket(period, date.fromisoformat(value))
+
+
+def parse_cursor(value):
+    """'max_stage,total_correct,id' → 튜플 (없으면 None). 잘못되거나 범위를 넘으면 ValueError"""
+    if not value:
+        return None
+    ms, tc, rid = (int(v) for v in value.split(","))
+    if max(abs(ms), abs(tc), abs(rid)) > CURSOR_MAX:
+        raise ValueError(f"커서 값은 ±{CURSOR_MAX} 안이어야 합니다")
+    return ms, tc, rid
+
+
+# ─── 쓰기 (write_record와 같은 트랜잭션) ─────────────────────────
+
+def record_best(conn, record_id, pid, max_stage, total_correct):
+    """방금 넣은 기록으로 player_best / 일간·주간 집계 / 점수 분포 갱신 (pid는 NULL이 아님)"""
+    day, week, played_at = conn.execute(BUCKET_SQL, (record_id,)).fetchone()
+    score = (max_stage, total_correct)
+
+    old = conn.execute(
+        "SELECT max_stage, total_correct FROM player_best WHERE player_id=?", (pid,)
+    ).fetchone()
+    if old is None or _better(score, old):
+        conn.execute("""
+            INSERT INTO player_best (player_id, max_stage, total_correct, record_id, played_at)
+            VALUES (?,?,?,?,?)
+            ON CONFLICT(player_id) DO UPDATE SET
+                max_stage=excluded.max_stage, total_correct=excluded.total_correct,
+                record_id=excluded.record_id, played_at=excluded.played_at
+        """, (pid, max_stage, total_correct, record_id, played_at))
+        _move(conn, "all", "", old, score)
+
+    for period, bucket in (("day", day), ("week", week)):
+        old = conn.execute("""
+            SELECT max_stage, total_correct FROM board_rollup
+            WHERE period=? AND bucket=? AND player_id=?
+        """, (period, bucket, pid)).fetchone()
+        if old is not None and not _better(score, old):
+            continue  # 동점이면 먼저 세운 기록을 남긴다
+        conn.execute("""
+            INSERT INTO board_rollup
+                (period, bucket, player_id, max_stage, total_correct, record_id, played_at)
+            VALUES (?,?,?,?,?,?,?)
+            ON CONFLICT(period, bucket, player_id) DO UPDATE SET
+                max_stage=excluded.max_stage, total_correct=excluded.total_correct,
+                record_id=excluded.record_id, played_at=excluded.played_at
+        """, (period, bucket, pid, max_stage, total_correct, record_id, played_at))
+        _move(conn, period, bucket, old, score)
+
+
+def _move(conn, scope, bucket, old, score):
+    """점수 분포에서 한 플레이어를 old 칸 → score 칸으로 옮긴다"""
+    if old is not None:
+        conn.execute("""
+            UPDATE score_hist SET players = players - 1
+            WHERE scope=? AND bucket=? AND max_stage=? AND total_correct=?
+        """, (scope, bucket, old[0], old[1]))
+    conn.execute("""
+        INSERT INTO score_hist (scope, bucket, max_stage, total_correct, players)
+        VALUES (?,?,?,?,1)
+        ON CONFLICT(scope, bucket, max_stage, total_correct) DO UPDATE SET players = players + 1
+    """, (scope, bucket, score[0], score[1]))
+
+
+# ─── 페이지 ──────────────────────────────────────────────────────
+# 커서 다음 행은 (같은 max_stage·total_correct, 더 큰 id) → (같은 max_stage, 더 작은
+# total_correct) → (더 작은 max_stage) 세 구간이다. OR 하나로 쓰면 SQLite가 인덱스
+# 처음부터 훑으므로, 구간마다 등호 접두사로 인덱스를 찾아 들어가고 LIMIT개씩만 읽는다.
+# 첫 페이지는 커서 조건 없이 인덱스 맨 앞부터 읽는다 (값 상한에 기대지 않는다).
+
+_ARMS = (
+    "{t}.max_stage = :ms AND {t}.total_correct = :tc AND {id} > :id",
+    "{t}.max_stage = :ms AND {t}.total_correct < :tc",
+    "{t}.max_stage < :ms",
+)
+
+
+def _page_sql(source, t, id_col, where=()):
+    """(첫 페이지 SQL, 커서 다음 페이지 SQL)"""
+    def select(*conds):
+        clause = f"WHERE {' AND '.join(conds)}" if conds else ""
+        return f"""
+            SELECT {id_col} AS id, p.name AS name, {t}.max_stage AS max_stage,
+                   {t}.total_correct AS total_correct, {t}.played_at AS played_at
+            FROM {source}
+            JOIN players p ON p.id = {t}.player_id
+            {clause}
+            ORDER BY {t}.max_stage DESC, {t}.total_correct DESC, {id_col}
+            LIMIT :limit"""
+    after = (" UNION ALL ".join(f"SELECT * FROM ({select(*where, c.format(t=t, id=id_col))})" for c in _ARMS)
+             + " ORDER BY max_stage DESC, total_correct DESC, id LIMIT :limit")
+    return select(*where), after
+
+
+# 전체: 플레이어마다 최고기록 (idx_player_best_rank, rank()와 같은 단위)
+ALL_FIRST_SQL, ALL_PAGE_SQL = _page_sql("player_best b INDEXED BY idx_player_best_rank", "b", "b.record_id")
+# 일간/주간: 플레이어마다 그 기간 최고기록 (idx_board_rollup_rank)
+ROLLUP_FIRST_SQL, ROLLUP_PAGE_SQL = _page_sql("board_rollup b INDEXED BY idx_board_rollup_rank", "b", "b.record_id",
+                                              ("b.period = :period", "b.bucket = :bucket"))
+
+PAGE_FIELDS = ("id",) + db.LEADERBOARD_FIELDS
+encode_page_row = fastjson.record_encoder(PAGE_FIELDS)
+
+
+def page(conn, period, bucket, after=None, limit=20):
+    """(행 JSON 배열 fastjson.Raw, 다음 커서 또는 None). 행은 PAGE_FIELDS"""
+    params = {"limit": limit, "period": period, "bucket": bucket}
+    if after is None:
+        sql = ALL_FIRST_SQL if period == "all" else ROLLUP_FIRST_SQL
+    else:
+        params["ms"], params["tc"], params["id"] = after
+        sql = ALL_PAGE_SQL if period == "all" else ROLLUP_PAGE_SQL
+    rows = conn.execute(sql, params).fetchall()
+    nxt = None
+    if len(rows) == limit:
+        last = rows[-1]
+        nxt = f"{last['max_stage']},{last['total_correct']},{last['id']}"
+    return fastjson.Raw.join([encode_page_row(r) for r in rows]), nxt
+
+
+# ─── 내 순위 ─────────────────────────────────────────────────────
+
+def rank(conn, pid, period, bucket):
+    """{"rank", "players", "max_stage", "total_correct"} (기록이 없으면 rank None)
+
+    같은 점수는 같은 순위 (1 + 더 좋은 점수인 플레이어 수).
+    """
+    if period == "all":
+        mine = conn.execute(
+            "SELECT max_stage, total_correct FROM player_best WHERE player_id=?", (pid,)
+        ).fetchone()
+    else:
+        mine = conn.execute("""
+            SELECT max_stage, total_correct FROM board_rollup
+            WHERE period=? AND bucket=? AND player_id=?
+        """, (period, bucket, pid)).fetchone()
+    players = conn.execute(
+        "SELECT COALESCE(SUM(players), 0) FROM score_hist WHERE scope=? AND bucket=?",
+        (period, bucket)
+    ).fetchone()[0]
+    if mine is None:
+        return {"rank": None, "players": players, "max_stage": 0, "total_correct": 0}
+    ms, tc = mine
+    ahead = conn.execute("""
+        SELECT COALESCE(SUM(players), 0) FROM score_hist
+        WHERE scope=:scope AND bucket=:bucket
+          AND (max_stage > :ms OR (max_stage = :ms AND total_correct > :tc))
+    """, {"scope": period, "bucket": bucket, "ms": ms, "tc": tc}).fetchone()[0]
+    return {"rank": ahead + 1, "players": players, "max_stage": ms, "total_correct": tc}
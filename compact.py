@@ -0,0 +1,75 @@
+"""new_event 응답의 compact(열 방향) 형식
+
+기본 응답은 스케줄 항목마다 {"at": ..., "color": ...} 같은 키를 반복하고
+all_icons 목록과 테마 dict도 매번 보낸다. format=compact를 요청한 클라이언트에는
+- 스케줄을 평행 배열로 (시각은 정수 ms, 색/아이콘/시계/테마는 팔레트 인덱스)
+- 팔레트는 /api/palette로 한 번만 받아 캐시 (PALETTE_VERSION이 바뀌면 다시 받음)
+형태로 보낸다. 예전 클라이언트는 그대로 기본 형식을 받는다.
+"""
+import json
+import zlib
+
+import fastjson
+from conditions import BG_COLORS, CLOCK_TYPES, ICONS
+from events import THEMES
+
+# 팔레트 내용이 바뀌면 올린다 (클라이언트는 응답의 palette 값과 비교)
+PALETTE_VERSION = 1
+
+PALETTE = {
+    "version": PALETTE_VERSION,
+    "colors": list(BG_COLORS.values()),  # 시계 색상(CLOCK_COLORS)은 이 중 일부
+    "icons": ICONS,
+    "clocks": CLOCK_TYPES,
+    "themes": THEMES,
+}
+
+PALETTE_ETAG = '"palette-%d-%08x"' % (
+    PALETTE_VERSION, zlib.crc32(json.dumps(PALETTE, sort_keys=True).encode()))
+
+# 바뀌지 않으므로 한 번만 직렬화해 두고 그대로 보낸다
+PALETTE_JSON = fastjson.Raw.of(PALETTE)
+
+_COLOR = {c: i for i, c in enumerate(PALETTE["colors"])}
+_ICON = {c: i for i, c in enumerate(ICONS)}
+_CLOCK = {c: i for i, c in enumerate(CLOCK_TYPES)}
+_THEME = {t["name"]: i for i, t in enumerate(THEMES)}
+
+
+def _ms(schedule):
+    return [round(item["at"] * 1000) for item in schedule]
+
+
+def encode(payload):
+    """기본 payload → compact dict (event_id 등 다른 키는 호출한 쪽에서 붙인다)"""
+    evt = payload["event"]
+    if evt is not None and "all_icons" in evt.get("detail", {}):
+        # 전체 아이콘 목록은 팔레트에 있으므로 뺀다
+        evt = dict(evt, detail={k: v for k, v in evt["detail"].items() if k != "all_icons"})
+    bg = payload["bg_schedule"]
+    icons = payload["icon_schedule"]
+    hl = payload["clock_highlight_schedule"]
+    cc = payload["clock_color_schedule"]
+    out = {
+        "format": "compact",
+        "palette": PALETTE_VERSION,
+        "stage": payload["stage"],
+        "seed": payload["seed"],
+        "t0": payload["t0"],
+        "event": evt,
+        "theme": _THEME[payload["theme"]["name"]],
+        "clocks": [_CLOCK[c] for c in payload["clocks"]],
+        "bg": {"at": _ms(bg), "color": [_COLOR[item["color"]] for item in bg]},
+        "icons": {
+            "at": _ms(icons),
+            "icon": [_ICON[item["icon"]] for item in icons],
+            "x": [item["x"] for item in icons],
+            "y": [item["y"] for item in icons],
+        },
+        "highlight": {"at": _ms(hl), "clock": [_CLOCK[item["clock"]] for item in hl]},
+        "clock_color": {"at": _ms(cc), "color": [_COLOR[item["color"]] for item in cc]},
+        "effects": payload["effects"],
+    }
+    if "anchor" in payload:
+        out["anchor"] = payload["anchor"]
+    return out
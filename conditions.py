@@ -0,0 +1,530 @@
+"""조건 레지스트리
+
+조건 종류(etype)마다 한 곳에서 선언한다.
+- compile : detail → 검사 클로저 check(t, data)  (t = 초 인덱스, data = verify 요청)
+- answer  : detail → 정답 안내 문구
+- key     : detail → 다음 정답 시각 검색 키 (시각 기반 조건만, timetable.NEXT_MATCH)
+            함정(is_trap) 이벤트는 10초 안에 정답 시각이 없으므로 키를 만들지 않는다
+- build   : 이벤트 생성 훅 (시각 기반: build(*args, is_trap), 그 외: build(stage, rng))
+- fields  : detail 필드 → 허용 값 (compile 전에 검사, 어긋나면 InvalidEvent)
+
+verify / generate_answer_info / 이벤트 생성은 모두 CONDITIONS[etype] 한 번 조회로 끝난다.
+새 조건은 여기 @condition 하나만 추가하면 된다.
+"""
+import random
+from collections import namedtuple
+
+from timetable import (TABLE, F_PALINDROME, F_ASCENDING, F_DESCENDING, F_PRIME_SECOND)
+
+CLOCK_TYPES = ["digital", "analog", "binary", "flip", "neon"]
+UNIT_LABELS = {"hour": "시", "minute": "분", "second": "초"}
+CLOCK_LABELS = {"digital": "디지털", "analog": "아날로그", "binary": "바이너리", "flip": "플립", "neon": "네온"}
+ICONS = ["⭐", "🔥", "💎", "🌙", "❄️", "🍎", "🌈", "⚡", "🎯", "🦋"]
+BG_COLORS = {
+    "빨간색": "#e74c3c", "파란색": "#3498db", "초록색": "#2ecc71",
+    "노란색": "#f1c40f", "보라색": "#9b59b6", "주황색": "#e67e22"
+}
+CLOCK_COLORS = {
+    "빨간색": "#e74c3c", "파란색": "#3498db", "초록색": "#2ecc71",
+    "노란색": "#f1c40f", "보라색": "#9b59b6"
+}
+
+Condition = namedtuple("Condition", "etype compile answer key build fields")
+
+# 한 이벤트에 대해 미리 만들어 둔 검사기 (detail은 여기서 한 번만 읽는다)
+# trap: 검사를 통과한 detail의 is_trap (등록되지 않은 etype은 False)
+Compiled = namedtuple("Compiled", "etype check answer key trap")
+
+CONDITIONS = {}
+
+
+class InvalidEvent(ValueError):
+    """detail 필드가 없거나 타입/범위가 맞지 않는 이벤트 (예전 클라이언트가 보낸 event)"""
+
+
+# fields 허용 값: range → 그 안의 정수, frozenset → 그 안의 문자열, int/str/NUMBER → 그 타입,
+# 함수 → detail을 받아 위 중 하나를 돌려준다 (앞 필드에 따라 범위가 바뀌는 경우)
+NUMBER = (int, float)
+UNIT_RANGES = {"hour": range(24), "minute": range(60), "second": range(60)}
+DIGITS = range(10)
+
+
+def _allowed(value, spec):
+    if isinstance(value, bool):  # JSON true/false는 숫자로 치지 않는다
+        return False
+    if isinstance(spec, range):
+        return isinstance(value, int) and value in spec
+    if isinstance(spec, frozenset):
+        return isinstance(value, str) and value in spec
+    return isinstance(value, spec)
+
+
+def _validate(cond, detail):
+    if not isinstance(detail, dict):
+        raise InvalidEvent(f"{cond.etype}: detail이 객체가 아닙니다")
+    for name, spec in cond.fields.items():
+        if callable(spec) and not isinstance(spec, type):
+            spec = spec(detail)
+        if name not in detail or not _allowed(detail[name], spec):
+            raise InvalidEvent(f"{cond.etype}: {name} 값이 잘못되었습니다")
+
+
+def condition(etype, answer, key=None, build=None, fields=None):
+    """compile 함수에 붙이는 등록 데코레이터"""
+    def register(compile_fn):
+        CONDITIONS[etype] = Condition(etype, compile_fn, answer, key, build, fields or {})
+        return compile_fn
+    return register
+
+
+def _never(t, data):
+    return False
+
+
+def compile_event(etype, detail):
+    """이벤트 하나의 검사 클로저/정답 문구/검색 키를 한 번에 준비
+
+    등록된 조건인데 detail이 맞지 않으면 InvalidEvent.
+    함정 이벤트는 key가 None이다 (verify가 expected_time을 찾지 않는다).
+    """
+    if etype is not None and not isinstance(etype, str):
+        raise InvalidEvent("type이 문자열이 아닙니다")
+    cond = CONDITIONS.get(etype)
+    if cond is None:
+        return Compiled(etype, _never, "조건 충족 시", None, False)
+    _validate(cond, detail)
+    trap = detail.get("is_trap") is True
+    return Compiled(
+        etype,
+        cond.compile(detail),
+        cond.answer(detail),
+        cond.key(detail) if cond.key and not trap else None,
+        trap,
+    )
+
+
+def build_time_event(etype, *args, is_trap=False):
+    """시각 기반 조건 튜플 (etype, *args) → 이벤트 dict"""
+    return CONDITIONS[etype].build(*args, is_trap=is_trap)
+
+
+def build_event(etype, stage, rng=random):
+    """시각과 무관한 조건 → 이벤트 dict (난수는 rng에서)"""
+    return CONDITIONS[etype].build(stage, rng)
+
+
+# ─── 시각 기반 조건 ──────────────────────────────────────────────
+
+def _build_specific_number(unit, target, is_trap=False):
+    label = {"second": "초**가", "minute": "분**이", "hour": "시**가"}[unit]
+    return {
+        "type": "specific_number",
+        "description": f"시계에서 **{target}{label} 표시될 때 멈추세요!",
+        "detail": {"target": target, "unit": unit, "is_trap": is_trap}
+    }
+
+
+@condition(
+    "specific_number",
+    answer=lambda d: f"{d['target']}{UNIT_LABELS[d['unit']]}이 표시될 때",
+    key=lambda d: (d["unit"], d["target"]),
+    build=_build_specific_number,
+    fields={"unit": frozenset(UNIT_RANGES), "target": lambda d: UNIT_RANGES[d["unit"]]},
+)
+def _specific_number(detail):
+    target = detail["target"]
+    # 시/분/초를 초 인덱스에서 바로 뽑는다
+    unit_of = {
+        "hour": lambda t: t // 3600,
+        "minute": lambda t: (t // 60) % 60,
+        "second": lambda t: t % 60,
+    }[detail["unit"]]
+    return lambda t, data: unit_of(t) == target
+
+
+@condition(
+    "matching_digits",
+    answer=lambda d: f"숫자 {d['digit']}이 {d['count']}개 연속으로 나타날 때",
+    key=lambda d: ("run", d["digit"], d["count"]),
+    fields={"digit": DIGITS, "count": range(1, 7)},
+    # 연속 숫자는 변조가 복잡하므로 is_trap=False 고정
+    build=lambda digit, count, is_trap=False: {
+        "type": "matching_digits",
+        "description": f"숫자 **{digit}**이 **{count}개** 연속으로 나타날 때 멈추세요!",
+        "detail": {"digit": digit, "count": count, "is_trap": False}
+    },
+)
+def _matching_digits(detail):
+    runs, shift, count = TABLE.runs, 3 * detail["digit"], detail["count"]
+    return lambda t, data: (runs[t] >> shift) & 7 >= count
+
+
+def _flag_checker(bit):
+    flags = TABLE.flags
+    return lambda detail: (lambda t, data: bool(flags[t] & bit))
+
+
+def _simple_build(etype, description):
+    """인자 없는 조건 (변조 안 함 → is_trap=False)"""
+    return lambda is_trap=False: {"type": etype, "description": description, "detail": {"is_trap": False}}
+
+
+condition(
+    "palindrome",
+    answer=lambda d: "시간이 회문(앞뒤 같은 숫자)일 때",
+    key=lambda d: ("flag", F_PALINDROME),
+    build=_simple_build("palindrome", "시간 표시가 **회문(앞뒤로 읽어도 같은 숫자)**이 될 때 멈추세요!"),
+)(_flag_checker(F_PALINDROME))
+
+
+@condition(
+    "digit_appears",
+    answer=lambda d: f"숫자 {d['target_digit']}이 포함될 때",
+    key=lambda d: ("has", d["target_digit"]),
+    fields={"target_digit": DIGITS},
+    build=lambda digit, is_trap=False: {
+        "type": "digit_appears",
+        "description": f"시간 표시에 숫자 **{digit}**이 포함될 때 멈추세요!",
+        "detail": {"target_digit": digit, "is_trap": is_trap}
+    },
+)
+def _digit_appears(detail):
+    masks, bit = TABLE.digit_mask, 1 << detail["target_digit"]
+    return lambda t, data: bool(masks[t] & bit)
+
+
+@condition(
+    "no_digit",
+    answer=lambda d: f"숫자 {d['excluded_digit']}이 없을 때",
+    key=lambda d: ("not", d["excluded_digit"]),
+    fields={"excluded_digit": DIGITS},
+    build=lambda digit, is_trap=False: {
+        "type": "no_digit",
+        "description": f"시간 표시에 숫자 **{digit}**이 없을 때 멈추세요!",
+        "detail": {"excluded_digit": digit, "is_trap": False}
+    },
+)
+def _no_digit(detail):
+    masks, bit = TABLE.digit_mask, 1 << detail["excluded_digit"]
+    return lambda t, data: not masks[t] & bit
+
+
+@condition(
+    "no_click",
+    answer=lambda d: f"숫자 {d.get('impossible_digit', '?')}이 나타나지 않으므로 누르지 않기",
+    # 이건 원래 함정
+    build=lambda digit, is_trap=True: {
+        "type": "no_click",
+        "description": f"⚠️ 10초 동안 숫자 **{digit}**이 나타나지 않습니다. **멈추지 마세요!**",
+        "detail": {"impossible_digit": digit, "is_trap": True}
+    },
+)
+def _no_click(detail):
+    # 불가능 조건 - 누르지 않았어야 함
+    return lambda t, data: not data.get("clicked", True)
+
+
+@condition(
+    "sum_target",
+    answer=lambda d: f"숫자 합이 {d['target']}일 때",
+    key=lambda d: ("sum", d["target"]),
+    fields={"target": range(55)},
+    build=lambda total, is_trap=False: {
+        "type": "sum_target",
+        "description": f"시간 숫자들의 **합이 {total}**이 될 때 멈추세요!",
+        "detail": {"target": total, "is_trap": is_trap}
+    },
+)
+def _sum_target(detail):
+    sums, target = TABLE.digit_sum, detail["target"]
+    return lambda t, data: sums[t] == target
+
+
+@condition(
+    "second_zero",
+    answer=lambda d: "초가 00일 때",
+    key=lambda d: ("second", 0),
+    build=_simple_build("second_zero", "시계의 **초(秒)가 00**이 될 때 멈추세요!"),
+)
+def _second_zero(detail):
+    return lambda t, data: t % 60 == 0
+
+
+# 고급 조건들은 변조 로직이 없으므로 is_trap=False
+
+@condition(
+    "sum_even",
+    answer=lambda d: "숫자 합이 짝수일 때",
+    key=lambda d: ("parity", 0),
+    build=_simple_build("sum_even", "합이 짝수일 때 멈추세요!"),
+)
+def _sum_even(detail):
+    sums = TABLE.digit_sum
+    return lambda t, data: sums[t] % 2 == 0
+
+
+@condition(
+    "sum_odd",
+    answer=lambda d: "숫자 합이 홀수일 때",
+    key=lambda d: ("parity", 1),
+    build=_simple_build("sum_odd", "합이 홀수일 때 멈추세요!"),
+)
+def _sum_odd(detail):
+    sums = TABLE.digit_sum
+    return lambda t, data: sums[t] % 2 == 1
+
+
+@condition(
+    "multiple_7",
+    answer=lambda d: "초가 7의 배수일 때",
+    key=lambda d: ("multiple_7",),
+    build=_simple_build("multiple_7", "초가 7의 배수일 때 멈추세요!"),
+)
+def _multiple_7(detail):
+    return lambda t, data: t % 60 % 7 == 0 and t % 60 > 0
+
+
+condition(
+    "prime_second",
+    answer=lambda d: "초가 소수일 때",
+    key=lambda d: ("flag", F_PRIME_SECOND),
+    build=_simple_build("prime_second", "초가 소수일 때 멈추세요!"),
+)(_flag_checker(F_PRIME_SECOND))
+
+
+@condition(
+    "sandwich",
+    answer=lambda d: "분과 초가 같을 때",
+    key=lambda d: ("sandwich",),
+    build=_simple_build("sandwich", "분과 초가 같을 때 멈추세요!"),
+)
+def _sandwich(detail):
+    return lambda t, data: (t // 60) % 60 == t % 60
+
+
+condition(
+    "ascending",
+    answer=lambda d: "숫자가 연속으로 증가할 때",
+    key=lambda d: ("flag", F_ASCENDING),
+    build=_simple_build("ascending", "숫자가 연속 증가할 때 멈추세요!"),
+)(_flag_checker(F_ASCENDING))
+
+condition(
+    "descending",
+    answer=lambda d: "숫자가 연속으로 감소할 때",
+    key=lambda d: ("flag", F_DESCENDING),
+    build=_simple_build("descending", "숫자가 연속 감소할 때 멈추세요!"),
+)(_flag_checker(F_DESCENDING))
+
+
+# ─── 시각과 무관한 조건 ──────────────────────────────────────────
+
+def _build_bg_color(stage, rng):
+    name, hex_val = rng.choice(list(BG_COLORS.items()))
+    return {
+        "type": "bg_color_change",
+        "description": f"배경이 **{name}**으로 바뀌면 멈추세요!",
+        "detail": {"target_color_name": name, "target_color_hex": hex_val}
+    }
+
+
+@condition(
+    "bg_color_change",
+    answer=lambda d: f"배경이 {d.get('target_color_name', '특정 색')}일 때",
+    build=_build_bg_color,
+    fields={"target_color_hex": str},
+)
+def _bg_color_change(detail):
+    target = detail["target_color_hex"]
+    return lambda t, data: data.get("active_bg_color") == target
+
+
+def _build_icon(stage, rng):
+    icon = rng.choice(ICONS)
+    return {
+        "type": "icon_appears",
+        "description": f"화면에 **{icon}** 가 나타나면 멈추세요!",
+        "detail": {"target_icon": icon, "all_icons": ICONS}
+    }
+
+
+@condition(
+    "icon_appears",
+    answer=lambda d: f"{d['target_icon']} 아이콘이 나타날 때",
+    build=_build_icon,
+    fields={"target_icon": str},
+)
+def _icon_appears(detail):
+    target = detail["target_icon"]
+    return lambda t, data: target in data.get("active_icons", [])
+
+
+def _build_clock_hl(stage, rng):
+    clock = rng.choice(CLOCK_TYPES)
+    return {
+        "type": "clock_type_match",
+        "description": f"**{CLOCK_LABELS[clock]}** 시계가 빛나는 순간 멈추세요!",
+        "detail": {"target_clock": clock}
+    }
+
+
+@condition(
+    "clock_type_match",
+    answer=lambda d: f"{CLOCK_LABELS[d['target_clock']]} 시계가 빛날 때",
+    build=_build_clock_hl,
+    fields={"target_clock": frozenset(CLOCK_TYPES)},
+)
+def _clock_type_match(detail):
+    target = detail["target_clock"]
+    return lambda t, data: data.get("active_highlight") == target
+
+
+def _build_clock_color(stage, rng):
+    name, hex_val = rng.choice(list(CLOCK_COLORS.items()))
+    return {
+        "type": "clock_color_match",
+        "description": f"시계가 **{name}**으로 빛날 때 멈추세요!",
+        "detail": {"target_color_name": name, "target_color_hex": hex_val}
+    }
+
+
+@condition(
+    "clock_color_match",
+    answer=lambda d: f"시계가 {d.get('target_color_name', '특정 색')}으로 빛날 때",
+    build=_build_clock_color,
+    fields={"target_color_hex": str},
+)
+def _clock_color_match(detail):
+    target = detail["target_color_hex"]
+    return lambda t, data: data.get("active_clock_color") == target
+
+
+def _build_spacebar(stage, rng):
+    # 스테이지에 따라 횟수 증가
+    if stage < 5:
+        count = rng.randint(3, 10)
+    elif stage < 10:
+        count = rng.randint(10, 30)
+    elif stage < 15:
+        count = rng.randint(20, 40)
+    else:
+        count = rng.randint(40, 60)
+    return {
+        "type": "spacebar_count",
+        "description": f"스페이스바를 정확히 **{count}번** 누르세요!",
+        "detail": {"target_count": count}
+    }
+
+
+@condition(
+    "spacebar_count",
+    answer=lambda d: f"정확히 {d['target_count']}번 눌렀을 때",
+    build=_build_spacebar,
+    fields={"target_count": int},
+)
+def _spacebar_count(detail):
+    target = detail["target_count"]
+    return lambda t, data: data.get("spacebar_count", 0) == target
+
+
+# === 피지컬 조건들 ===
+
+@condition(
+    "rapid_tap",
+    answer=lambda d: f"초가 {d['target_second']}이 된 후 {d['duration']}초 안에 {d['tap_count']}번 연타",
+    # 초=00 순간부터 2초 안에 5번 연타
+    build=lambda stage, rng: {
+        "type": "rapid_tap",
+        "description": "**초가 00**이 되는 순간부터 **2초 안에 스페이스바 5번 연타**하세요!",
+        "detail": {"target_second": 0, "duration": 2.0, "tap_count": 5}
+    },
+    fields={"target_second": range(60), "duration": NUMBER, "tap_count": int},
+)
+def _rapid_tap(detail):
+    target_s, duration, required_count = detail["target_second"], detail["duration"], detail["tap_count"]
+
+    def check(t, data):
+        rapid_taps = data.get("rapid_taps", [])  # 탭 타임스탬프 리스트
+        s = t % 60
+        # 초=00이 된 시점 이후의 탭만 카운트
+        if s == target_s or (s == target_s + 1 and len(rapid_taps) > 0):
+            valid_taps = [tap for tap in rapid_taps if 0 <= tap <= duration]
+            return len(valid_taps) >= required_count
+        return False
+    return check
+
+
+def _build_long_press(stage, rng):
+    # 10의 배수일 때 1초 동안 길게 누르기
+    target = rng.choice([10, 20, 30, 40, 50])
+    return {
+        "type": "long_press",
+        "description": f"**초가 {target}**일 때 스페이스바를 **1초 동안 꾹** 누르고 있으세요!",
+        "detail": {"target_second": target, "duration": 1.0}
+    }
+
+
+@condition(
+    "long_press",
+    answer=lambda d: f"초가 {d['target_second']}일 때 {d['duration']}초 동안 꾹 누르기",
+    build=_build_long_press,
+    fields={"target_second": range(60), "duration": NUMBER},
+)
+def _long_press(detail):
+    target_s, required_duration = detail["target_second"], detail["duration"]
+    return lambda t, data: (data.get("press_start") == target_s
+                            and data.get("press_duration", 0) >= required_duration)
+
+
+def _dont_click_answer(detail):
+    if detail.get("will_appear_red", False):
+        return "빨간색이 나타났으므로 누르지 않기"
+    return "빨간색이 나타나지 않았으므로 마지막에 누르기"
+
+
+@condition(
+    "dont_click",
+    answer=_dont_click_answer,
+    # 빨간색이 나오지 않으면 마지막에 누르기
+    build=lambda stage, rng: {
+        "type": "dont_click",
+        "description": "10초 동안 **빨간색 배경이 나오지 않으면** 마지막에 누르세요! (나오면 누르지 마세요)",
+        "detail": {"forbidden_color": "#e74c3c"}
+    },
+)
+def _dont_click(detail):
+    def check(t, data):
+        clicked = data.get("clicked", False)
+        if data.get("red_appeared", False):
+            # 빨간색 나왔으면 누르면 안 됨
+            return not clicked
+        # 빨간색 안 나왔으면 눌러야 함
+        return clicked
+    return check
+
+
+@condition(
+    "rhythm_tap",
+    answer=lambda d: f"깜빡임에 맞춰 {d['tap_count']}번 연속 누르기",
+    # 콜론 깜빡임에 맞춰 3번 연속 (±0.3초 허용)
+    build=lambda stage, rng: {
+        "type": "rhythm_tap",
+        "description": "시계의 **콜론(:) 깜빡임에 맞춰** 스페이스바를 **3번 연속** 누르세요!",
+        "detail": {"tap_count": 3, "tolerance": 0.3}
+    },
+    fields={"tap_count": int, "tolerance": NUMBER},
+)
+def _rhythm_tap(detail):
+    required_count, tolerance = detail["tap_count"], detail["tolerance"]
+
+    def check(t, data):
+        # 각 탭이 깜빡임 타이밍과 ±tolerance 안에 있는지 확인
+        blink_times = data.get("blink_times", [])
+        matched = 0
+        for tap in data.get("rhythm_taps", []):
+            for blink in blink_times:
+                if abs(tap - blink) <= tolerance:
+                    matched += 1
+                    break
+        return matched >= required_count
+    return check
@@ -0,0 +1,386 @@
+"""SQLite 연결 풀 (워커 프로세스별)
+
+요청마다 connect/close 하지 않고, 프로세스마다 미리 열어 둔 연결을
+빌려 쓰고 돌려준다. 연결을 열 때 WAL 등 PRAGMA를 한 번만 적용하고,
+sqlite3 자체의 prepared statement 캐시(cached_statements)를 재사용한다.
+"""
+import atexit
+from bisect import bisect_right
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import fastjson
+import metrics
+
+DB_PATH = os.environ.get("DB_PATH", "/data")
+DB = os.path.join(DB_PATH, "game.db")
+
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256MB
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+_op_labels = {}
+
+
+def _op(sql):
+    """SQL 첫 키워드 라벨 (op="select" 등, 키워드별로 한 번만 만든다)"""
+    head = sql.lstrip()[:10].split(None, 1)
+    op = head[0].lower() if head else "unknown"
+    lbl = _op_labels.get(op)
+    if lbl is None:
+        lbl = _op_labels[op] = metrics.labels(op=op)
+    return lbl
+
+
+class TimedConnection(sqlite3.Connection):
+    """문장/커밋 실행 시간을 sqlite_duration_seconds 지표로 남기는 연결"""
+
+    def execute(self, sql, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            metrics.observe("sqlite_duration_seconds", _op(sql), time.perf_counter() - t0)
+
+    def executemany(self, sql, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            metrics.observe("sqlite_duration_seconds", _op(sql), time.perf_counter() - t0)
+
+    def executescript(self, script):
+        t0 = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            metrics.observe("sqlite_duration_seconds", 'op="script"', time.perf_counter() - t0)
+
+    def commit(self):
+        t0 = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            metrics.observe("sqlite_duration_seconds", 'op="commit"', time.perf_counter() - t0)
+
+
+def connect(path=None):
+    """PRAGMA가 적용된 새 연결 (풀 밖에서 쓸 때도 동일 설정)"""
+    factory = TimedConnection if metrics.METRICS else sqlite3.Connection
+    conn = sqlite3.connect(path or DB, check_same_thread=False, cached_statements=256, factory=factory)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """스레드 안전한 연결 풀 (LIFO: 최근에 쓴 연결을 먼저 재사용)"""
+
+    def __init__(self, path, size=POOL_SIZE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+
+    def acquire(self, timeout=5.0):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                return connect(self.path)
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._opened = 0
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """현재 프로세스의 풀 (fork 후에는 부모 연결을 쓰지 않도록 새로 만든다)"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool_pid != pid:
+        with _pool_lock:
+            if _pool_pid != pid:
+                _pool = ConnectionPool(DB)
+                _pool_pid = pid
+    return _pool
+
+
+# ─── 리더보드 캐시 ───────────────────────────────────────────────
+# 상위 N개를 프로세스 메모리에 들고 있고, save_record가 N위보다 좋은
+# 기록을 넣을 때만 갱신한다. 워밍된 뒤에는 조회가 SQLite를 타지 않는다.
+# 시작 시 idx_records_rank (정렬 순서 그대로의 커버링 인덱스)로 다시 만든다.
+
+LEADERBOARD_SIZE = 20
+
+LEADERBOARD_SQL = """
+    SELECT r.id, p.name, r.max_stage, r.total_correct, r.played_at
+    FROM records r INDEXED BY idx_records_rank
+    JOIN players p ON p.id = r.player_id
+    ORDER BY r.max_stage DESC, r.total_correct DESC, r.id
+    LIMIT ?
+"""
+
+
+LEADERBOARD_FIELDS = ("name", "max_stage", "total_correct", "played_at")
+encode_leaderboard_row = fastjson.record_encoder(LEADERBOARD_FIELDS)
+
+
+def _rank_key(max_stage, total_correct, record_id):
+    return (-max_stage, -total_correct, record_id)
+
+
+class LeaderboardCache:
+    """상위 N개 기록 (정렬 유지, 스레드 안전)
+
+    행은 (name, max_stage, total_correct, played_at) 튜플로 들고, 행마다 JSON 조각을
+    한 번만 만들어 둔다. 응답 본문은 바뀐 뒤 처음 요청될 때 조각을 이어 붙여 캐시한다.
+    """
+
+    def __init__(self, size=LEADERBOARD_SIZE):
+        self.size = size
+        self._keys = []
+        self._rows = []
+        self._json = []
+        self._body = None
+        self._lock = threading.Lock()
+        self.gen = None
+        self.warm = False
+
+    def load(self, conn):
+        self.replace(conn.execute(LEADERBOARD_SQL, (self.size,)).fetchall())
+
+    def replace(self, rows, gen=None):
+        """(id, name, max_stage, total_correct, played_at) 행으로 통째로 바꾼다
+
+        gen은 공유 캐시(shared_cache.py)의 리더보드 세대 (같으면 다시 읽지 않는다).
+        """
+        with self._lock:
+            self._keys = [_rank_key(r[2], r[3], r[0]) for r in rows]
+            self._rows = [tuple(r)[1:] for r in rows]
+            self._json = [encode_leaderboard_row(r) for r in self._rows]
+            self._body = None
+            self.gen = gen
+            self.warm = True
+
+    def rows(self):
+        return [dict(zip(LEADERBOARD_FIELDS, r)) for r in self._rows]
+
+    def body(self):
+        """순위 목록 JSON (fastjson.Raw, 바뀌기 전까지 같은 객체)"""
+        body = self._body
+        if body is None:
+            with self._lock:
+                body = self._body = fastjson.Raw.join(self._json)
+        return body
+
+    def qualifies(self, max_stage, total_correct):
+        """N위 안에 들어가는 기록인지 (새 기록은 동점이면 뒤로 간다)"""
+        keys = self._keys
+        return len(keys) < self.size or (-max_stage, -total_correct) < keys[-1][:2]
+
+    def offer(self, record_id, name, max_stage, total_correct, played_at):
+        key = _rank_key(max_stage, total_correct, record_id)
+        row = (name, max_stage, total_correct, played_at)
+        with self._lock:
+            i = bisect_right(self._keys, key)
+            if i >= self.size:
+                return False
+            self._keys.insert(i, key)
+            self._rows.insert(i, row)
+            self._json.insert(i, encode_leaderboard_row(row))
+            del self._keys[self.size:], self._rows[self.size:], self._json[self.size:]
+            self._body = None
+        return True
+
+
+# ─── write-behind 그룹 커밋 ──────────────────────────────────────
+# DB_WRITE_BEHIND=1 이면 쓰기 작업을 바운드 큐에 넣고 바로 반환한다.
+# 백그라운드 writer가 FLUSH_MS마다 또는 FLUSH_ROWS개가 모이면 한 트랜잭션으로
+# 커밋하므로 fsync가 요청 수만큼이 아니라 배치 수만큼만 일어난다.
+# DB_WRITE_ACK=durable 이면 요청은 자기 작업이 커밋될 때까지 기다린다.
+
+WRITE_BEHIND = os.environ.get("DB_WRITE_BEHIND", "0") == "1"
+WRITE_ACK_DURABLE = os.environ.get("DB_WRITE_ACK", "none") == "durable"
+FLUSH_MS = int(os.environ.get("DB_FLUSH_MS", 50))
+FLUSH_ROWS = int(os.environ.get("DB_FLUSH_ROWS", 200))
+QUEUE_SIZE = int(os.environ.get("DB_QUEUE_SIZE", 10000))
+
+log = logging.getLogger(__name__)
+
+
+class _Write:
+    __slots__ = ("fn", "done", "error")
+
+    def __init__(self, fn, durable):
+        self.fn = fn
+        self.done = threading.Event() if durable else None
+        self.error = None
+
+
+class WriteBehindQueue:
+    """바운드 큐 + 단일 writer 스레드
+
+    작업은 fn(conn) 형태이고, fn이 콜러블을 반환하면 커밋 후에 실행한다
+    (캐시 갱신처럼 커밋된 뒤에만 해야 하는 일).
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, flush_ms=FLUSH_MS, flush_rows=FLUSH_ROWS, maxsize=QUEUE_SIZE):
+        self.path = path
+        self.flush_s = flush_ms / 1000
+        self.flush_rows = flush_rows
+        self._q = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+        # 지표
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def submit(self, fn, durable=False, timeout=5.0):
+        item = _Write(fn, durable)
+        self._q.put(item, timeout=timeout)  # 가득 차면 기다림 (backpressure)
+        if durable:
+            if not item.done.wait(timeout):
+                raise TimeoutError("write-behind 커밋 대기 시간 초과")
+            if item.error is not None:
+                raise item.error
+
+    def _run(self):
+        conn = connect(self.path)
+        stopping = False
+        while not stopping:
+            item = self._q.get()
+            if item is self._STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_s
+            while len(batch) < self.flush_rows:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is self._STOP:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            self._flush(conn, batch)
+        conn.close()
+
+    def _flush(self, conn, batch):
+        t0 = time.perf_counter()
+        afters = []
+        try:
+            for item in batch:
+                after = item.fn(conn)
+                if callable(after):
+                    afters.append(after)
+            conn.commit()
+        except Exception:
+            # 배치 하나가 실패하면 하나씩 다시 시도해서 나머지는 살린다
+            conn.rollback()
+            afters = self._flush_one_by_one(conn, batch)
+        else:
+            for item in batch:
+                if item.done:
+                    item.done.set()
+        for after in afters:
+            try:
+                after()
+            except Exception:
+                log.exception("write-behind 후처리 실패")
+        ms = (time.perf_counter() - t0) * 1000
+        self.batches += 1
+        self.rows += len(batch)
+        self.last_flush_ms = ms
+        self.max_flush_ms = max(self.max_flush_ms, ms)
+        self._total_flush_ms += ms
+
+    def _flush_one_by_one(self, conn, batch):
+        afters = []
+        for item in batch:
+            try:
+                after = item.fn(conn)
+                conn.commit()
+                if callable(after):
+                    afters.append(after)
+            except Exception as e:
+                conn.rollback()
+                self.errors += 1
+                item.error = e
+                log.exception("write-behind 쓰기 실패")
+            if item.done:
+                item.done.set()
+        return afters
+
+    def close(self, timeout=10.0):
+        """남은 작업을 모두 커밋하고 writer 종료 (워커 종료 시)"""
+        if self._thread.is_alive():
+            self._q.put(self._STOP)
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "queue_depth": self._q.qsize(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "errors": self.errors,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.batches, 3) if self.batches else 0.0,
+        }
+
+
+_writer = None
+_writer_pid = None
+
+
+def get_writer():
+    """현재 프로세스의 write-behind 큐 (처음 쓸 때 writer 스레드 시작)"""
+    global _writer, _writer_pid
+    pid = os.getpid()
+    if _writer_pid != pid:
+        with _pool_lock:
+            if _writer_pid != pid:
+                _writer = WriteBehindQueue(DB)
+                _writer_pid = pid
+                atexit.register(_writer.close)
+    return _writer
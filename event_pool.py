@@ -0,0 +1,171 @@
+"""미리 만들어 둔 이벤트 풀 (워커 프로세스별)
+
+new_event가 요청 스레드에서 스케줄(배경색 rejection sampling, 강조/색상 루프)을
+매번 만들지 않도록, 백그라운드 스레드가 스테이지별 이벤트를 미리 만들어 둔다.
+시각 기반 조건은 현재 시각에 따라 달라지므로 미뤄 둔 채(anchor=play_start)
+저장했다가 꺼낼 때 events.resolve_time_event로 조건만 확정한다.
+
+슬롯은 스테이지마다 하나다 (같은 구간 안에서도 시계 수/효과가 스테이지마다
+다르므로). STAGE_CAP 이상은 생성 결과가 같으므로 슬롯 하나를 같이 쓴다.
+지표는 난이도 구간(1~4, 5~9, 10~14, 15~19, 20+)별로 모은다.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import fastjson
+from events import generate_event, new_seed, resolve_time_event
+
+EVENT_POOL = os.environ.get("EVENT_POOL", "1") == "1"
+EVENT_POOL_DEPTH = int(os.environ.get("EVENT_POOL_DEPTH", 16))  # 슬롯(스테이지)당 개수
+
+# 난이도 구간 (시작 스테이지, 이름)
+BANDS = ((1, "1-4"), (5, "5-9"), (10, "10-14"), (15, "15-19"), (20, "20+"))
+
+# 이 스테이지 이상은 시계 수(최대 5)와 조건/효과 종류가 더 바뀌지 않는다
+STAGE_CAP = 21
+
+log = logging.getLogger(__name__)
+
+
+def band_of(stage):
+    """스테이지 → 난이도 구간 이름"""
+    name = BANDS[0][1]
+    for start, band in BANDS:
+        if stage >= start:
+            name = band
+    return name
+
+
+class _Slot:
+    __slots__ = ("items", "bytes", "low_since")
+
+    def __init__(self):
+        self.items = deque()  # (payload, size)
+        self.bytes = 0
+        self.low_since = None  # 가득 차 있다가 처음 꺼내진 시각 (refill 지연 측정용)
+
+
+class _BandStats:
+    __slots__ = ("hits", "misses", "refilled", "last_lag_ms", "max_lag_ms")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.refilled = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+
+class EventPool:
+    """스테이지별 deque + refill 스레드 (꺼내기는 popleft 한 번)"""
+
+    def __init__(self, depth=EVENT_POOL_DEPTH):
+        self.depth = depth
+        self._slots = {stage: _Slot() for stage in range(1, STAGE_CAP + 1)}
+        self._stats = {band: _BandStats() for _, band in BANDS}
+        self._wake = threading.Event()
+        self._stop = False
+        self._wake.set()  # 시작하자마자 한 번 채운다
+        self._thread = threading.Thread(target=self._run, name="event-pool", daemon=True)
+        self._thread.start()
+
+    def take(self, stage, t0=None):
+        """풀에서 꺼낸 payload (시각 기반 조건은 t0 기준으로 확정), 비어 있으면 새로 생성"""
+        if stage < 1:  # 풀에 없는 스테이지
+            return generate_event(stage, t0=t0)
+        slot = self._slots[min(stage, STAGE_CAP)]
+        stats = self._stats[band_of(stage)]
+        try:
+            payload, size = slot.items.popleft()
+        except IndexError:
+            stats.misses += 1
+            self._wake.set()
+            return generate_event(stage, t0=t0)
+        stats.hits += 1
+        slot.bytes -= size
+        if slot.low_since is None:
+            slot.low_since = time.monotonic()
+        self._wake.set()
+        if payload["stage"] != stage:
+            payload["stage"] = stage
+        return resolve_time_event(payload, t0)
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self._refill()
+            except Exception:
+                log.exception("이벤트 풀 refill 실패")
+                time.sleep(1.0)
+
+    def _refill(self):
+        # 한 바퀴에 슬롯마다 하나씩 채워서 한 스테이지만 오래 비어 있지 않게 한다
+        while not self._stop:
+            filled = False
+            for stage, slot in self._slots.items():
+                if len(slot.items) >= self.depth:
+                    continue
+                payload = generate_event(stage, new_seed(), 0, defer_time_event=True)
+                size = len(fastjson.dumps(payload))
+                slot.items.append((payload, size))
+                slot.bytes += size
+                filled = True
+                if len(slot.items) >= self.depth and slot.low_since is not None:
+                    stats = self._stats[band_of(stage)]
+                    lag = (time.monotonic() - slot.low_since) * 1000
+                    stats.refilled += 1
+                    stats.last_lag_ms = lag
+                    stats.max_lag_ms = max(stats.max_lag_ms, lag)
+                    slot.low_since = None
+            if not filled:
+                return
+
+    def close(self):
+        self._stop = True
+        self._wake.set()
+
+    def stats(self):
+        bands = {}
+        for stage, slot in self._slots.items():
+            band = band_of(stage)
+            b = bands.setdefault(band, {"ready": 0, "bytes": 0})
+            b["ready"] += len(slot.items)
+            b["bytes"] += slot.bytes
+        for band, s in self._stats.items():
+            total = s.hits + s.misses
+            bands[band].update({
+                "hits": s.hits,
+                "misses": s.misses,
+                "hit_rate": round(s.hits / total, 4) if total else None,
+                "refilled": s.refilled,
+                "last_refill_lag_ms": round(s.last_lag_ms, 3),
+                "max_refill_lag_ms": round(s.max_lag_ms, 3),
+            })
+        return {
+            "enabled": True,
+            "depth": self.depth,
+            "bytes": sum(b["bytes"] for b in bands.values()),
+            "bands": bands,
+        }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_event_pool():
+    """현재 프로세스의 이벤트 풀 (fork 후 처음 쓸 때 refill 스레드 시작)"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool_pid != pid:
+        with _pool_lock:
+            if _pool_pid != pid:
+                _pool = EventPool()
+                _pool_pid = pid
+    return _pool
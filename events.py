@@ -0,0 +1,428 @@
+"""이벤트(조건 + 스케줄) 생성
+
+모든 난수는 이벤트마다 만든 random.Random(seed)에서 뽑는다.
+같은 (seed, stage, t0)이면 언제 다시 돌려도 같은 이벤트/스케줄이 나오므로
+seed만으로 재현(리플레이)하거나 verify에서 다시 만들어 검사할 수 있다.
+"""
+import random
+import secrets
+from datetime import datetime
+
+from timetable import TABLE, WINDOWS, time_index, split_index, missing_values
+from conditions import CLOCK_TYPES, ICONS, build_event, build_time_event
+
+
+# 테마 (compact 응답 팔레트도 이 순서를 쓴다)
+THEMES = [
+    {"bg": "#0f0f1a", "accent": "#00fff5", "name": "dark_cyber"},
+    {"bg": "#1a0a2e", "accent": "#e94560", "name": "neon_night"},
+    {"bg": "#0d1117", "accent": "#58a6ff", "name": "github_dark"},
+    {"bg": "#1b1b2f", "accent": "#f0a500", "name": "amber_dark"},
+    {"bg": "#162447", "accent": "#e94560", "name": "deep_navy"},
+    {"bg": "#1e3a5f", "accent": "#00d2ff", "name": "ocean_deep"},
+]
+
+
+def now_index():
+    """현재 시각의 초 인덱스 (t0 기본값)"""
+    now = datetime.now()
+    return time_index(now.hour, now.minute, now.second)
+
+
+def new_seed():
+    return secrets.randbits(32)
+
+
+# ─── 10초 안의 시각 기반 조건 생성 ──────────────────────────────────
+
+def get_possible_times(t0=None):
+    """현재 시각(t0: 하루 중 몇 번째 초) 기준 2~10초 후의 모든 시각 반환"""
+    if t0 is None:
+        t0 = now_index()
+    h, m, s = split_index(t0)
+    
+    possible_times = []
+    for i in range(2, 11):  # 1~10초
+        future_s = s + i
+        future_m = m
+        future_h = h
+        if future_s >= 60:
+            future_s -= 60
+            future_m += 1
+            if future_m >= 60:
+                future_m -= 60
+                future_h = (future_h + 1) % 24
+        possible_times.append((future_h, future_m, future_s))
+    
+    return possible_times
+
+
+def create_time_based_event(possible_times, stage, rng=random):
+    """10초 안의 실제 시각을 기반으로 조건 생성 (함정 로직 추가됨)
+
+    possible_times는 get_possible_times()처럼 연속된 초 목록이어야 한다
+    (윈도우 인덱스로 한 번에 집계).
+    """
+    # 2~10초 후 구간에서 나올 수 있는 값들 (숫자/합/초/분 비트셋)
+    window = WINDOWS.query(time_index(*possible_times[0]), len(possible_times))
+    
+    # [기존 코드 1] 랜덤하게 시각 선택 및 조건 생성 (그대로 유지)
+    target_time = rng.choice(possible_times)
+    h, m, s = target_time
+    t = time_index(h, m, s)
+    mask = TABLE.digit_mask[t]
+    
+    conditions = []
+    
+    # 1. 특정 숫자
+    conditions.append(("specific_number", "second", s))
+    if rng.random() < 0.2:
+        conditions.append(("specific_number", "minute", m))
+    
+    # 2. 연속 숫자 (테이블에 미리 계산된 최장 연속 길이/숫자)
+    max_run = TABLE.max_run[t]
+    if max_run >= 2:
+        conditions.append(("matching_digits", TABLE.run_digit[t], max_run))
+    
+    # 3~12. 나머지 조건들 (회문, 포함, 미포함, 합, 배수, 소수 등... 기존 코드 그대로)
+    if TABLE.is_palindrome(t): conditions.append(("palindrome",))
+    
+    unique_digits = [d for d in range(10) if mask >> d & 1]
+    if unique_digits:
+        digit = rng.choice(unique_digits)
+        conditions.append(("digit_appears", digit))
+        
+    absent = [d for d in range(10) if not mask >> d & 1]
+    if absent:
+        digit = rng.choice(absent)
+        # 미포함 로직은 원본의 'never_appears' 체크가 이미 강력한 함정 역할이므로 그대로 둠
+        never_appears = not window.digit_mask >> digit & 1
+        if never_appears: conditions.append(("no_click", digit))
+        else: conditions.append(("no_digit", digit))
+            
+    total = TABLE.digit_sum[t]
+    conditions.append(("sum_target", total))
+    
+    if s == 0: conditions.append(("second_zero",))
+    
+    if stage >= 5:
+        if total % 2 == 0: conditions.append(("sum_even",))
+        else: conditions.append(("sum_odd",))
+        if s % 7 == 0 and s > 0: conditions.append(("multiple_7",))
+        if TABLE.is_prime_second(t): conditions.append(("prime_second",))
+        if m == s: conditions.append(("sandwich",))
+        if TABLE.is_ascending(t): conditions.append(("ascending",))
+        elif TABLE.is_descending(t): conditions.append(("descending",))
+
+    if not conditions: return None
+    
+    cond = rng.choice(conditions)
+
+    # =========================================================================
+    # [추가된 로직] 여기서 결정을 뒤집습니다 (함정 생성)
+    # =========================================================================
+    is_trap = False
+    
+    # no_click은 이미 함정이므로 건드리지 않음
+    if cond[0] != "no_click":
+        # 30% 확률로 정답 조건을 오답으로 변조
+        if rng.random() < 0.3:
+            
+            # 1) 초(Second) 변조
+            if cond[:2] == ("specific_number", "second"):
+                invalid_secs = missing_values(window.second_bits, 60)
+                if invalid_secs:
+                    cond = ("specific_number", "second", rng.choice(invalid_secs))
+                    is_trap = True
+                    
+            # 2) 분(Minute) 변조
+            elif cond[:2] == ("specific_number", "minute"):
+                invalid_mins = missing_values(window.minute_bits, 60)
+                if invalid_mins:
+                    cond = ("specific_number", "minute", rng.choice(invalid_mins))
+                    is_trap = True
+            
+            # 3) 합(Sum) 변조
+            elif cond[0] == "sum_target":
+                # 가능한 합 범위 (0~54) 중 안 나오는 것 선택
+                invalid_sums = missing_values(window.sum_bits, 55)
+                if invalid_sums:
+                    cond = ("sum_target", rng.choice(invalid_sums))
+                    is_trap = True
+                    
+            # 4) 숫자 포함(Digit In) 변조
+            elif cond[0] == "digit_appears":
+                invalid_digits = missing_values(window.digit_mask, 10)
+                if invalid_digits:
+                    cond = ("digit_appears", rng.choice(invalid_digits))
+                    is_trap = True
+
+    # =========================================================================
+    # [수정된 반환] is_trap 정보를 detail에 추가하여 반환 (레지스트리의 build 훅)
+    # =========================================================================
+    return build_time_event(*cond, is_trap=is_trap)
+
+
+def create_non_time_event(stage, rng=random):
+    """시각과 무관한 조건 생성"""
+    event_types = ["bg_color_change", "icon_appears", "clock_type_match", "spacebar_count"]
+    
+    # 스테이지 10+ 에서 시계 색상 조건 추가
+    if stage >= 10:
+        event_types.append("clock_color_match")
+    
+    # 스테이지 15+ 에서 피지컬 조건 추가
+    if stage >= 15:
+        event_types.extend(["rapid_tap", "long_press", "dont_click", "rhythm_tap"])
+    
+    etype = rng.choice(event_types)
+    return build_event(etype, stage, rng)
+
+
+# ─── 스케줄 타임라인 샘플러 ─────────────────────────────────────
+# k개 시각을 최소 간격을 보장하며 정렬된 상태로 뽑는다 (거절 샘플링 없음).
+# 간격 기반: 남는 여유 구간(slack)에 균등 분포 k개를 놓고 오름차순으로
+# i번째에 i*min_gap을 더한다. 추첨은 항상 k번(+정답 자리 2번)이고,
+# k(최대 8)개 정수 정렬 외에는 O(k)다. 결과가 이미 정렬되어 있으므로
+# 스케줄마다 dict를 at 기준으로 다시 정렬할 필요가 없다.
+# 반올림 때문에 간격이 줄지 않도록 10^-ndigits 단위 정수로 계산한다.
+
+# 아이콘/시계 강조/시계 색상 스케줄의 최소 간격 (초, 같은 순간에 겹치지 않게)
+SCHEDULE_MIN_GAP = 0.3
+
+
+def _sorted_offsets(rng, k, slack):
+    """0~slack 정수 k개 (오름차순, 중복 가능)"""
+    rnd, n = rng.random, slack + 1
+    return sorted([int(rnd() * n) for _ in range(k)])
+
+
+def _spread(rng, k, lo, hi, gap):
+    """정수 단위 [lo, hi]에 간격 gap 이상인 k개 (오름차순)"""
+    if k <= 0:
+        return []
+    slack = hi - lo - (k - 1) * gap
+    if slack < 0:
+        raise ValueError(f"{k}개를 간격 {gap}으로 [{lo}, {hi}]에 놓을 수 없습니다")
+    return [lo + off + i * gap for i, off in enumerate(_sorted_offsets(rng, k, slack))]
+
+
+def sample_timeline(rng, k, lo, hi, min_gap=0.0, anchor=None, ndigits=2):
+    """[lo, hi] 구간의 k개 시각 (오름차순, 이웃 간격 min_gap 이상)
+
+    anchor=(a_lo, a_hi)를 주면 그중 하나(정답 자리)가 그 구간에 오도록 뽑고
+    (시각 목록, 정답 인덱스)를 돌려준다.
+    """
+    unit = 10 ** ndigits
+    L, H, G = round(lo * unit), round(hi * unit), round(min_gap * unit)
+    if anchor is None:
+        return [t / unit for t in _spread(rng, k, L, H, G)]
+    a_lo, a_hi = round(anchor[0] * unit), round(anchor[1] * unit)
+    # 정답이 j번째일 때 앞에 j개, 뒤에 k-1-j개가 들어갈 자리가 있어야 한다
+    feasible = []
+    for j in range(k):
+        lo_j, hi_j = max(a_lo, L + j * G), min(a_hi, H - (k - 1 - j) * G)
+        if lo_j <= hi_j:
+            feasible.append((j, lo_j, hi_j))
+    if not feasible:
+        raise ValueError(f"{k}개 중 하나를 {anchor} 안에 놓을 수 없습니다")
+    j, lo_j, hi_j = rng.choice(feasible)
+    a = lo_j + int(rng.random() * (hi_j - lo_j + 1))
+    times = _spread(rng, j, L, a - G, G) + [a] + _spread(rng, k - 1 - j, a + G, H, G)
+    return [t / unit for t in times], j
+
+
+# ─── 이벤트 전체 생성 ───────────────────────────────────────────
+
+def _time_event(stage, seed, t0):
+    """시각 기반 조건 ((seed, t0) 전용 난수열 → 화면 구성과 독립)"""
+    cond_rng = random.Random(seed * 86400 + t0)
+    possible_times = get_possible_times(t0)
+    evt = create_time_based_event(possible_times, stage, cond_rng)
+    if not evt:  # 생성 실패 시 fallback
+        evt = create_non_time_event(stage, cond_rng)
+    return evt
+
+
+
+def build_schedules(evt, selected_clocks, rng):
+    """배경/아이콘/시계 강조/시계 색상 스케줄 (generate_event의 스케줄 단계)"""
+    etype = evt["type"] if evt else None
+    bg_schedule = []
+    icon_schedule = []
+    
+    if etype == "bg_color_change":
+        target_color = evt["detail"]["target_color_hex"]
+        change_count = rng.randint(3, 5) # 총 변경 횟수
+        min_dist = 1.2  # 각 색상 간의 최소 간격 (초 단위, 취향껏 조절하세요)
+        
+        # 서로 min_dist 이상 떨어진 시간 슬롯 (정렬된 상태로 나옴)
+        scheduled_times = sample_timeline(rng, change_count, 0.5, 9.0, min_dist)
+        
+        # 생성된 시간 슬롯 중 하나를 랜덤하게 골라 정답 색상 위치로 지정
+        target_time_idx = rng.randint(0, len(scheduled_times) - 1)
+        other = [c for c in ["#e74c3c", "#3498db", "#2ecc71", "#f1c40f", "#9b59b6", "#e67e22"] if c != target_color]
+        for i, at in enumerate(scheduled_times):
+            if i == target_time_idx:
+                # 정답 색상 배치
+                bg_schedule.append({"at": at, "color": target_color})
+            else:
+                # 가짜 색상들 중 하나 골라 배치
+                bg_schedule.append({"at": at, "color": rng.choice(other)})
+    
+    if etype == "icon_appears":
+        target_icon = evt["detail"]["target_icon"]
+        icon_count = rng.randint(4, 8)
+        # 정답 아이콘은 2~8초 사이 자리에
+        times, target_idx = sample_timeline(rng, icon_count, 0.3, 9.7, SCHEDULE_MIN_GAP, anchor=(2.0, 8.0))
+        for i, at in enumerate(times):
+            icon = target_icon if i == target_idx else rng.choice(ICONS)
+            icon_schedule.append({"at": at, "icon": icon, "x": rng.randint(5, 95), "y": rng.randint(10, 85)})
+    
+    # 시계 강조 스케줄
+    clock_hl_schedule = []
+    clock_color_schedule = []  # 시계 색상 스케줄
+    hl_count = rng.randint(3, 6)
+    
+    if etype == "clock_type_match":
+        target = evt["detail"]["target_clock"]
+        if target not in selected_clocks:
+            selected_clocks[rng.randint(0, len(selected_clocks)-1)] = target
+        times, target_idx = sample_timeline(rng, hl_count, 0.5, 9.5, SCHEDULE_MIN_GAP, anchor=(2.0, 8.0))
+        for i, at in enumerate(times):
+            clock = target if i == target_idx else rng.choice(selected_clocks)
+            clock_hl_schedule.append({"at": at, "clock": clock})
+    elif etype == "clock_color_match":
+        # 시계 색상 조건
+        target_color = evt["detail"]["target_color_hex"]
+        colors = ["#e74c3c", "#3498db", "#2ecc71", "#f1c40f", "#9b59b6"]
+        other_colors = [c for c in colors if c != target_color]
+        color_count = rng.randint(3, 6)
+        times, target_idx = sample_timeline(rng, color_count, 0.5, 9.5, SCHEDULE_MIN_GAP, anchor=(2.0, 8.0))
+        for i, at in enumerate(times):
+            color = target_color if i == target_idx else rng.choice(other_colors)
+            clock_color_schedule.append({"at": at, "color": color})
+        # 일반 시계 강조도 진행
+        for at in sample_timeline(rng, hl_count, 0.5, 9.5, SCHEDULE_MIN_GAP):
+            clock_hl_schedule.append({"at": at, "clock": rng.choice(selected_clocks)})
+    else:
+        for at in sample_timeline(rng, hl_count, 0.5, 9.5, SCHEDULE_MIN_GAP):
+            clock_hl_schedule.append({"at": at, "clock": rng.choice(selected_clocks)})
+    
+    return bg_schedule, icon_schedule, clock_hl_schedule, clock_color_schedule
+
+
+def generate_event(stage, seed=None, t0=None, defer_time_event=False):
+    """스테이지 이벤트 + 스케줄 생성 (seed/t0가 같으면 결과도 같다)
+
+    시각 기반 조건은 (seed, t0)로 만든 별도 난수열에서 뽑으므로 화면 구성
+    (시계/테마/스케줄/효과)은 t0와 무관하게 seed만으로 정해진다.
+    defer_time_event=True 이면 시각 기반 조건을 만들지 않고 event=None,
+    anchor="play_start"로 돌려준다 (미리 받아 둔 스테이지는 플레이 시작 시
+    같은 seed로 new_event를 다시 불러 조건만 확정한다).
+    """
+    if seed is None:
+        seed = new_seed()
+    if t0 is None:
+        t0 = now_index()
+    rng = random.Random(seed)
+    
+    # 스테이지별 시계 개수
+    num_clocks = min(5, 1 + (stage - 1) // 5)
+    
+    # 바이너리 시계는 스테이지 10부터
+    available_clocks = CLOCK_TYPES.copy()
+    if stage < 10:
+        available_clocks = [c for c in available_clocks if c != "binary"]
+    
+    selected_clocks = rng.sample(available_clocks, min(num_clocks, len(available_clocks)))
+    
+    # 숫자 표시 시계가 있는지 확인
+    has_digital = any(c in selected_clocks for c in ["digital", "binary", "flip", "neon"])
+    
+    # 이벤트 생성
+    anchor = None
+    if has_digital and rng.random() < 0.7:  # 70% 확률로 시각 기반 조건
+        if defer_time_event:
+            evt, anchor = None, "play_start"
+        else:
+            evt = _time_event(stage, seed, t0)
+    else:
+        evt = create_non_time_event(stage, rng)
+    etype = evt["type"] if evt else None
+    
+    # 테마
+    theme = rng.choice(THEMES)
+    
+    # 스케줄 생성 (clock_type_match면 selected_clocks에 정답 시계를 넣는다)
+    bg_schedule, icon_schedule, clock_hl_schedule, clock_color_schedule = \
+        build_schedules(evt, selected_clocks, rng)
+    
+    # === 연출 효과 (스테이지별) ===
+    effects = []
+    
+    # 스테이지 7+ : 안개 효과
+    if stage >= 7 and rng.random() < 0.3:  # 30% 확률
+        effects.append({"type": "fog", "opacity": 0.4})
+    
+    # 스테이지 12+ : 거울 모드
+    if stage >= 12 and rng.random() < 0.2:  # 20% 확률
+        effects.append({"type": "mirror"})
+    
+    # 스테이지 18+ : 가짜 시계
+    if stage >= 18 and rng.random() < 0.25:  # 25% 확률
+        effects.append({"type": "fake_clock", "offset": 1})  # 1초 빠른 시계
+    
+    # dont_click 조건일 때는 특별 배경 스케줄 생성
+    if etype == "dont_click":
+        # 빨간색이 나올지 말지 랜덤 결정
+        will_appear = rng.random() < 0.5  # 50%
+        if will_appear:
+            # 빨간색 등장 (누르면 안 됨)
+            appear_at = round(rng.uniform(2.0, 8.0), 2)
+            bg_schedule = [{"at": appear_at, "color": "#e74c3c"}]
+        else:
+            # 빨간색 안 나옴 (마지막에 눌러야 함)
+            bg_schedule = []
+        evt["detail"]["will_appear_red"] = will_appear
+    
+    return {
+        "stage": stage,
+        "seed": seed,
+        "t0": t0,
+        "event": evt,
+        "theme": theme,
+        "clocks": selected_clocks,
+        "bg_schedule": bg_schedule,
+        "icon_schedule": icon_schedule,
+        "clock_highlight_schedule": clock_hl_schedule,
+        "clock_color_schedule": clock_color_schedule,
+        "effects": effects,  # 연출 효과
+        **({"anchor": anchor} if anchor else {}),
+    }
+
+
+def generate_events(stage, count, t0=None, seed=None):
+    """stage부터 count개 스테이지를 한 번에 생성 (미리 받기용)
+
+    i번째 스테이지의 seed는 seed + i (seed를 안 주면 스테이지마다 새로 뽑는다).
+    시각 기반 조건은 플레이 시작 시각에 맞춰야 하므로 만들지 않고 미룬다.
+    그런 스테이지(anchor=play_start)는 시작할 때 new_event?seed= 한 번이 더 필요하다.
+    """
+    if t0 is None:
+        t0 = now_index()
+    seeds = [seed + i for i in range(count)] if seed is not None else [new_seed() for _ in range(count)]
+    return [generate_event(stage + i, seeds[i], t0, defer_time_event=True) for i in range(count)]
+
+
+def resolve_time_event(payload, t0=None):
+    """미뤄 둔(anchor=play_start) 시각 기반 조건을 t0 기준으로 확정
+
+    generate_event(stage, seed, t0)와 같은 결과를 조건 생성 비용만으로 만든다.
+    """
+    if t0 is None:
+        t0 = now_index()
+    payload = dict(payload, t0=t0)
+    if payload.pop("anchor", None):
+        payload["event"] = _time_event(payload["stage"], payload["seed"], t0)
+    return payload
@@ -0,0 +1,103 @@
+"""빠른 JSON 직렬화 (Flask JSON provider)
+
+orjson 패키지가 있으면 쓰고, 없으면 표준 json으로 직렬화한다 (선택 의존성).
+둘 다 공백 없이, UTF-8 그대로(이스케이프 없이) 내보내며 키를 정렬하지 않는다.
+orjson이 못 다루는 값(64비트를 넘는 정수 등)은 표준 json으로 다시 시도한다.
+
+바뀌지 않는 응답 조각(팔레트, 순위 행)은 한 번만 bytes로 만들어 두고
+응답에서는 그 bytes를 이어 붙이기만 한다 (Raw, record_encoder).
+"""
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+_std = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=DefaultJSONProvider.default)
+
+
+def _std_dumps(obj):
+    return _std.encode(obj).encode()
+
+
+if orjson:
+    _OPTS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """obj → JSON bytes"""
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=_OPTS)
+        except TypeError:  # JSONEncodeError 포함 (큰 정수 등)
+            return _std_dumps(obj)
+
+    loads = orjson.loads
+else:
+    dumps = _std_dumps
+    loads = json.loads
+
+
+class Raw(bytes):
+    """미리 직렬화한 JSON 조각 (응답 본문으로 그대로 쓴다)"""
+
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, obj):
+        return cls(dumps(obj))
+
+    @classmethod
+    def join(cls, fragments):
+        """조각들 → JSON 배열"""
+        return cls(b"[" + b",".join(fragments) + b"]")
+
+    @classmethod
+    def object(cls, **fields):
+        """키=값 → JSON 객체 (Raw 값은 다시 직렬화하지 않고 그대로 끼운다)"""
+        return cls(b"{" + b",".join(dumps(k) + b":" + (v if isinstance(v, Raw) else dumps(v))
+                                    for k, v in fields.items()) + b"}")
+
+
+def record_encoder(fields):
+    """필드 이름 순서 → (값 튜플 → JSON 객체 bytes) 함수
+
+    키 부분('{"name":', ',"max_stage":' ...)은 미리 만들어 두고 값만 직렬화한다.
+    DB 커서 튜플을 dict로 바꾸지 않고 바로 JSON으로 만들 때 쓴다.
+    """
+    prefixes = [(b"{" if i == 0 else b",") + dumps(f) + b":" for i, f in enumerate(fields)]
+
+    def encode(values):
+        out = bytearray()
+        for prefix, v in zip(prefixes, values):
+            out += prefix
+            out += dumps(v)
+        out += b"}"
+        return bytes(out)
+    return encode
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """app.json = FastJSONProvider(app) — jsonify/request.get_json이 이 구현을 쓴다"""
+
+    sort_keys = False
+    ensure_ascii = False
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:  # 옵션을 준 호출은 Flask 기본 동작 그대로
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = obj if isinstance(obj, Raw) else dumps(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
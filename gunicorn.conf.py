@@ -0,0 +1,53 @@
+"""gunicorn 설정 (gunicorn은 실행 폴더의 gunicorn.conf.py를 자동으로 읽는다)
+
+- preload_app: 마스터가 app을 한 번 import 해서 (timetable 표, 정적 파일 압축본,
+  조건 레지스트리) 워커가 fork로 복사 없이(copy-on-write) 나눠 쓴다.
+  import 때는 DB를 건드리지 않으므로 마스터에서 열린 연결이 워커로 새지 않는다.
+  GUNICORN_PRELOAD=0 이면 예전처럼 워커마다 import 한다.
+- on_starting: 워커를 띄우기 전에 마스터에서 스키마 마이그레이션을 한 번 실행하고,
+  이번 실행의 공유 캐시 run id(SHARED_CACHE_RUN)와 지표 폴더(마스터 pid별, 비움,
+  METRICS_DIR)를 정해 환경 변수로 워커에 넘긴다
+- on_exit: on_starting이 만든 지표 폴더를 지운다
+- 워커마다 fork → 요청 받을 준비까지 걸린 시간을 로그로 남긴다 (bench/boot_time.py가 읽음)
+"""
+import gc
+import os
+import time
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+
+def on_starting(server):
+    import migrations
+    applied = migrations.migrate_db()
+    if applied:
+        server.log.info("마이그레이션 적용: %s", applied)
+
+    import shared_cache
+    if shared_cache.SHARED_CACHE:
+        shared_cache.start_run()  # 워커가 붙을 때 이번 실행 id로 한 번만 다시 채운다
+
+    import metrics
+    directory = os.environ.get("METRICS_DIR")
+    if not directory:
+        directory = os.environ["METRICS_DIR"] = metrics.run_dir()
+        server.metrics_dir_owned = directory
+    metrics.reset_dir(directory)
+    if preload_app:
+        # 이미 만든 객체를 GC 대상에서 빼 두면 워커의 GC가 공유 페이지를 건드리지 않는다
+        gc.freeze()
+
+
+def on_exit(server):
+    owned = getattr(server, "metrics_dir_owned", None)
+    if owned:
+        import metrics
+        metrics.remove_dir(owned)
+
+
+def post_fork(server, worker):
+    worker.boot_t0 = time.perf_counter()
+
+
+def post_worker_init(worker):
+    worker.log.info("worker %s 부팅 %.1fms", worker.pid, (time.perf_counter() - worker.boot_t0) * 1000)
@@ -0,0 +1,222 @@
+"""Prometheus 텍스트 형식 지표 (gunicorn 워커 합산)
+
+워커마다 메모리 카운터/히스토그램을 들고 있다가 METRICS_FLUSH_S마다
+METRICS_DIR/<pid>-<token>.json 으로 스냅샷을 쓴다 (임시 파일 → rename).
+/metrics는 어느 워커가 받든 디렉터리의 모든 스냅샷을 더해서 보여준다.
+끝난 워커의 파일도 남겨 두므로 카운터가 줄어들지 않는다.
+
+폴더는 실행마다 따로 쓴다.
+- gunicorn: on_starting(마스터)이 마스터 pid로 폴더를 만들고 비운 뒤 METRICS_DIR
+  환경 변수로 워커에 넘긴다 (직접 METRICS_DIR을 줬으면 그 폴더를 비우고 쓴다).
+  마스터가 끝날 때 on_exit이 만든 폴더를 지운다.
+- 그 밖(python app.py, test client): METRICS_DIR이 없으면 프로세스 pid별 폴더를
+  처음 쓸 때 비우고 쓴다.
+"""
+import json
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+
+METRICS = os.environ.get("METRICS", "1") == "1"
+FLUSH_S = float(os.environ.get("METRICS_FLUSH_S", 1.0))
+
+# 초 단위 버킷 (HTTP 요청 / SQLite 둘 다)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 이름 → (종류, 설명)
+HELP = {
+    "http_requests_total": ("counter", "라우트/메서드/상태별 요청 수"),
+    "http_request_duration_seconds": ("histogram", "라우트별 요청 처리 시간"),
+    "sqlite_duration_seconds": ("histogram", "SQLite 문장(첫 키워드)/커밋별 실행 시간"),
+    "events_generated_total": ("counter", "생성한 이벤트 수 (type, 스테이지 구간)"),
+    "event_traps_total": ("counter", "함정(is_trap) 이벤트 수 (type, 스테이지 구간)"),
+    "verify_total": ("counter", "verify 결과 수 (etype, correct)"),
+}
+
+log = logging.getLogger(__name__)
+
+
+def labels(**kw):
+    """라벨 dict → 'a="x",b="y"' (값의 역슬래시/따옴표/줄바꿈 이스케이프)"""
+    return ",".join(
+        '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in kw.items()
+    )
+
+
+class Registry:
+    """프로세스 하나의 카운터/히스토그램 (잠금은 dict 갱신 동안만)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{secrets.token_hex(4)}.json")
+        self._counters = {}  # "name|labels" → 값
+        self._hists = {}     # "name|labels" → [버킷별 개수..., 합, 개수]
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def inc(self, name, label_str="", value=1):
+        key = f"{name}|{label_str}"
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._dirty = True
+
+    def observe(self, name, label_str, value, buckets=LATENCY_BUCKETS):
+        key = f"{name}|{label_str}"
+        n = len(buckets)
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = [0] * n + [0.0, 0]
+            for i in range(n):  # 누적 버킷이 아니라 구간별로 세고 출력할 때 누적
+                if value <= buckets[i]:
+                    h[i] += 1
+                    break
+            h[n] += value
+            h[n + 1] += 1
+            self._dirty = True
+
+    def snapshot(self):
+        with self._lock:
+            return {"counters": dict(self._counters),
+                    "hists": {k: list(v) for k, v in self._hists.items()}}
+
+    def flush(self):
+        """스냅샷 파일 쓰기 (바뀐 것이 있을 때만)"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while True:
+            time.sleep(FLUSH_S)
+            try:
+                self.flush()
+            except OSError:
+                log.exception("지표 스냅샷 쓰기 실패")
+
+
+def _merge(snapshots):
+    counters, hists = {}, {}
+    for snap in snapshots:
+        for k, v in snap.get("counters", {}).items():
+            counters[k] = counters.get(k, 0) + v
+        for k, v in snap.get("hists", {}).items():
+            acc = hists.get(k)
+            if acc is None:
+                hists[k] = list(v)
+            else:
+                for i, x in enumerate(v):
+                    acc[i] += x
+    return counters, hists
+
+
+def _fmt(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render(registry, buckets=LATENCY_BUCKETS):
+    """모든 워커 스냅샷 합계 → Prometheus 텍스트"""
+    snaps = [registry.snapshot()]
+    try:
+        names = os.listdir(registry.directory)
+    except FileNotFoundError:
+        names = []
+    own = os.path.basename(registry.path)
+    for name in names:
+        if not name.endswith(".json") or name == own:
+            continue
+        try:
+            with open(os.path.join(registry.directory, name)) as f:
+                snaps.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # 쓰는 중이거나 깨진 파일은 이번 스크레이프에서 건너뜀
+    counters, hists = _merge(snaps)
+
+    series = {}
+    for key, v in counters.items():
+        name, lbl = key.split("|", 1)
+        series.setdefault(name, []).append(f"{name}{{{lbl}}} {_fmt(v)}" if lbl else f"{name} {_fmt(v)}")
+    for key, h in hists.items():
+        name, lbl = key.split("|", 1)
+        sep = "," if lbl else ""
+        lines = series.setdefault(name, [])
+        cum = 0
+        for b, c in zip(buckets, h):
+            cum += c
+            lines.append(f'{name}_bucket{{{lbl}{sep}le="{b}"}} {cum}')
+        lines.append(f'{name}_bucket{{{lbl}{sep}le="+Inf"}} {h[-1]}')
+        lines.append(f"{name}_sum{{{lbl}}} {_fmt(h[-2])}")
+        lines.append(f"{name}_count{{{lbl}}} {h[-1]}")
+
+    out = []
+    for name in sorted(series):
+        kind, text = HELP.get(name, ("untyped", name))
+        out.append(f"# HELP {name} {text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(sorted(series[name]))
+    return "\n".join(out) + "\n"
+
+
+# ─── 실행별 폴더 ─────────────────────────────────────────────────
+
+def run_dir(pid=None):
+    """pid(기본 현재 프로세스)별 기본 폴더"""
+    return os.path.join(tempfile.gettempdir(), f"10min-metrics-{pid or os.getpid()}")
+
+
+def reset_dir(directory):
+    """폴더를 만들고 남아 있던 스냅샷(*.json, *.tmp)을 지운다 (다른 파일은 건드리지 않음)"""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith((".json", ".tmp")):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def remove_dir(directory):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+_registry = None
+_registry_pid = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """현재 프로세스의 지표 (fork 후 처음 쓸 때 새로 만들고 flush 스레드 시작)"""
+    global _registry, _registry_pid
+    pid = os.getpid()
+    if _registry_pid != pid:
+        with _registry_lock:
+            if _registry_pid != pid:
+                # import 시점이 아니라 여기서 읽는다 (preload면 on_starting보다 import가 먼저)
+                directory = os.environ.get("METRICS_DIR")
+                if not directory:
+                    directory = run_dir(pid)
+                    reset_dir(directory)  # 같은 pid로 예전에 남은 파일
+                _registry = Registry(directory)
+                _registry_pid = pid
+                threading.Thread(target=_registry._run, name="metrics-flush", daemon=True).start()
+    return _registry
+
+
+def inc(name, label_str="", value=1):
+    if METRICS:
+        get_registry().inc(name, label_str, value)
+
+
+def observe(name, label_str, value):
+    if METRICS:
+        get_registry().observe(name, label_str, value)
@@ -0,0 +1,267 @@
+"""스키마 마이그레이션 (PRAGMA user_version)
+
+버전마다 @migration 하나로 선언하고, 아직 적용되지 않은 것만 순서대로 실행한다.
+마이그레이션마다 BEGIN IMMEDIATE 트랜잭션 하나 안에서 스키마 변경과
+user_version 갱신을 같이 커밋하므로, 중간에 실패해도 그 버전은 통째로 롤백된다.
+여러 프로세스가 동시에 실행해도 잠금을 잡은 뒤 버전을 다시 읽으므로 한 번만 적용된다.
+
+실행
+- gunicorn: gunicorn.conf.py의 on_starting 훅 (마스터에서 워커를 띄우기 전에 한 번)
+- 직접:     python migrations.py [--status]
+- 그 밖의 실행(python app.py, test client 등)은 첫 요청 때 밀린 버전이 있으면 적용한다.
+
+새 스키마 변경은 아래에 버전을 하나 올려 @migration을 추가한다 (기존 것은 고치지 않는다).
+"""
+import argparse
+import logging
+import os
+import threading
+from collections import namedtuple
+
+import db
+
+Migration = namedtuple("Migration", "version description apply")
+
+MIGRATIONS = []
+
+log = logging.getLogger(__name__)
+
+
+def migration(version, description):
+    """apply(conn) 함수에 붙이는 등록 데코레이터 (버전은 1부터 빠짐없이)"""
+    def register(fn):
+        if version != len(MIGRATIONS) + 1:
+            raise ValueError(f"마이그레이션 버전은 {len(MIGRATIONS) + 1}이어야 합니다: {version}")
+        MIGRATIONS.append(Migration(version, description, fn))
+        return fn
+    return register
+
+
+def _table_exists(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)
+    ).fetchone() is not None
+
+
+# ─── 마이그레이션 목록 ───────────────────────────────────────────
+# user_version이 없던 예전 DB(0)에도 그대로 적용되도록 IF NOT EXISTS로 쓴다.
+
+@migration(1, "players / records / event_sessions 기본 스키마")
+def _base_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS players (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_id TEXT,
+            max_stage INTEGER DEFAULT 0,
+            total_correct INTEGER DEFAULT 0,
+            total_wrong INTEGER DEFAULT 0,
+            played_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(player_id) REFERENCES players(id)
+        )
+    """)
+    # 리더보드 정렬 순서 그대로의 커버링 인덱스
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_records_rank
+            ON records(max_stage DESC, total_correct DESC, id, player_id, played_at)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_records_player ON records(player_id)")
+    # 워커 간 공유용 이벤트 세션 (sessions.py)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS event_sessions (
+            id TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+
+
+@migration(2, "player_best (개인 최고기록, records에서 채움)")
+def _player_best(conn):
+    if _table_exists(conn, "player_best"):
+        # user_version 도입 전에 이미 만들어 둔 DB. player_id 없는 기록은
+        # NULL끼리 충돌하지 않아 기록마다 한 줄씩 쌓였으므로 지운다
+        conn.execute("DELETE FROM player_best WHERE player_id IS NULL")
+        return
+    conn.execute("""
+        CREATE TABLE player_best (
+            player_id TEXT PRIMARY KEY,
+            max_stage INTEGER NOT NULL,
+            total_correct INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO player_best (player_id, max_stage, total_correct)
+        SELECT player_id, max_stage, total_correct FROM (
+            SELECT player_id, max_stage, total_correct,
+                   ROW_NUMBER() OVER (PARTITION BY player_id
+                                      ORDER BY max_stage DESC, total_correct DESC) AS rn
+            FROM records WHERE player_id IS NOT NULL
+        ) WHERE rn = 1
+    """)
+
+
+@migration(3, "board_rollup / score_hist (일간·주간 리더보드, 순위 분포, records에서 채움)")
+def _board_rollup(conn):
+    # 기간마다 플레이어 최고기록 한 줄 (boards.py). bucket은 날짜 / 그 주 월요일
+    conn.execute("""
+        CREATE TABLE board_rollup (
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            player_id TEXT NOT NULL,
+            max_stage INTEGER NOT NULL,
+            total_correct INTEGER NOT NULL,
+            record_id INTEGER NOT NULL,
+            played_at TEXT,
+            PRIMARY KEY (period, bucket, player_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE INDEX idx_board_rollup_rank
+            ON board_rollup(period, bucket, max_stage DESC, total_correct DESC, record_id)
+    """)
+    # 점수별 플레이어 수 (scope: all / day / week, 전체는 bucket '')
+    conn.execute("""
+        CREATE TABLE score_hist (
+            scope TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            max_stage INTEGER NOT NULL,
+            total_correct INTEGER NOT NULL,
+            players INTEGER NOT NULL,
+            PRIMARY KEY (scope, bucket, max_stage, total_correct)
+        ) WITHOUT ROWID
+    """)
+    # 동점이면 먼저 세운 기록 (save_record의 갱신 규칙과 같다)
+    for period, bucket in (("day", "date(played_at)"),
+                           ("week", "date(played_at, 'weekday 0', '-6 days')")):
+        conn.execute(f"""
+            INSERT INTO board_rollup
+                (period, bucket, player_id, max_stage, total_correct, record_id, played_at)
+            SELECT '{period}', bucket, player_id, max_stage, total_correct, id, played_at FROM (
+                SELECT {bucket} AS bucket, player_id, max_stage, total_correct, id, played_at,
+                       ROW_NUMBER() OVER (PARTITION BY {bucket}, player_id
+                                          ORDER BY max_stage DESC, total_correct DESC, id) AS rn
+                FROM records WHERE player_id IS NOT NULL
+            ) WHERE rn = 1
+        """)
+    conn.execute("""
+        INSERT INTO score_hist (scope, bucket, max_stage, total_correct, players)
+        SELECT 'all', '', max_stage, total_correct, COUNT(*) FROM player_best
+        WHERE player_id IS NOT NULL
+        GROUP BY max_stage, total_correct
+    """)
+    conn.execute("""
+        INSERT INTO score_hist (scope, bucket, max_stage, total_correct, players)
+        SELECT period, bucket, max_stage, total_correct, COUNT(*) FROM board_rollup
+        GROUP BY period, bucket, max_stage, total_correct
+    """)
+
+
+@migration(4, "player_best에 record_id / played_at (전체 리더보드 플레이어 단위 페이지)")
+def _player_best_record(conn):
+    conn.execute("ALTER TABLE player_best ADD COLUMN record_id INTEGER")
+    conn.execute("ALTER TABLE player_best ADD COLUMN played_at TEXT")
+    # 그 점수를 처음 세운 기록 (save_record는 더 좋은 기록일 때만 덮어쓴다)
+    conn.execute("""
+        UPDATE player_best SET (record_id, played_at) = (
+            SELECT r.id, r.played_at FROM records r
+            WHERE r.player_id = player_best.player_id
+              AND r.max_stage = player_best.max_stage
+              AND r.total_correct = player_best.total_correct
+            ORDER BY r.id LIMIT 1
+        )
+    """)
+    # 리더보드 정렬 순서 그대로의 커버링 인덱스 (idx_records_rank와 같은 모양)
+    conn.execute("""
+        CREATE INDEX idx_player_best_rank
+            ON player_best(max_stage DESC, total_correct DESC, record_id, player_id, played_at)
+    """)
+
+
+# ─── 실행 ────────────────────────────────────────────────────────
+
+LATEST = len(MIGRATIONS)
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """밀린 마이그레이션 적용 → 적용한 버전 목록"""
+    applied = []
+    for m in MIGRATIONS:
+        if current_version(conn) >= m.version:  # 잠금 없이 먼저 확인 (대부분 여기서 끝)
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= m.version:  # 다른 프로세스가 먼저 적용
+                conn.rollback()
+                continue
+            m.apply(conn)
+            conn.execute(f"PRAGMA user_version = {m.version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        log.info("마이그레이션 %d 적용: %s", m.version, m.description)
+        applied.append(m.version)
+    return applied
+
+
+def migrate_db(path=None):
+    """DB 파일에 새 연결로 마이그레이션 (gunicorn 훅 / CLI용)"""
+    os.makedirs(os.path.dirname(path or db.DB), exist_ok=True)
+    conn = db.connect(path)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+_checked_pid = None
+_checked_lock = threading.Lock()
+
+
+def ensure_current(get_conn):
+    """프로세스마다 처음 한 번만 버전 확인 (gunicorn 훅/CLI 없이 띄운 경우 여기서 적용)"""
+    global _checked_pid
+    pid = os.getpid()
+    if _checked_pid == pid:
+        return
+    with _checked_lock:
+        if _checked_pid == pid:
+            return
+        conn = get_conn()
+        if current_version(conn) < LATEST:
+            migrate(conn)
+        _checked_pid = pid
+
+
+def main():
+    ap = argparse.ArgumentParser(description="DB 스키마 마이그레이션 (PRAGMA user_version)")
+    ap.add_argument("--db", default=db.DB, help=f"DB 파일 (기본 {db.DB})")
+    ap.add_argument("--status", action="store_true", help="적용하지 않고 버전만 보기")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.status:
+        conn = db.connect(args.db)
+        version = current_version(conn)
+        conn.close()
+        for m in MIGRATIONS:
+            print(f"{'✔' if version >= m.version else ' '} {m.version:>3}  {m.description}")
+        print(f"user_version {version} / 최신 {LATEST}")
+        return
+    applied = migrate_db(args.db)
+    print(f"적용: {applied}" if applied else f"최신입니다 (user_version {LATEST})")
+
+
+if __name__ == "__main__":
+    main()
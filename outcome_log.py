@@ -0,0 +1,327 @@
+"""verify 결과 로그 (스테이지 시도 하나하나)
+
+/api/verify는 결과(정답 여부, etype, 스테이지, 함정 여부)를 응답만 하고 버렸다.
+여기서는 결과마다 메모리 링 버퍼에 한 줄을 넣고 (요청 스레드는 deque append만),
+백그라운드 스레드가 OUTCOME_FLUSH_S마다 모아서 열 방향 고정 폭 블록으로
+세그먼트 파일에 덧붙인다. 버퍼가 가득 차면 기다리지 않고 버리고 dropped를 센다.
+
+세그먼트 파일: OUTCOME_DIR/<시작 시각>-<pid>-<번호>.seg (워커마다 따로)
+OUTCOME_SEGMENT_BYTES를 넘으면 다음 번호로 넘어가고, 폴더가 OUTCOME_MAX_BYTES를
+넘으면 오래된 세그먼트부터 지운다.
+
+블록 (little-endian)
+    b"VOB1", 행 수 n (u32), etype 이름 수 k (u16)
+    etype 이름 k개: 길이(u8) + UTF-8
+    ts          f64[n]   유닉스 시각
+    latency_us  u32[n]   서버 처리 시간 (요청 시작 → 판정)
+    stage       u16[n]   (모르면 0)
+    etype       u8[n]    위 이름 목록의 인덱스
+    flags       u8[n]    1 = 정답, 2 = 함정
+    player      16s[n]   player_id (없으면 빈 값)
+쓰는 중인 마지막 블록이 잘려 있으면 읽는 쪽은 거기서 멈춘다.
+
+집계:
+    python outcome_log.py [--dir DIR] [--by etype|stage|etype,stage] [--since 2024-05-01]
+"""
+import argparse
+import atexit
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+
+import db
+
+OUTCOME_LOG = os.environ.get("OUTCOME_LOG", "1") == "1"
+OUTCOME_DIR = os.environ.get("OUTCOME_DIR") or os.path.join(db.DB_PATH, "outcomes")
+OUTCOME_RING = int(os.environ.get("OUTCOME_RING", 65536))          # 버퍼 최대 행 수
+OUTCOME_FLUSH_S = float(os.environ.get("OUTCOME_FLUSH_S", 1.0))
+OUTCOME_SEGMENT_BYTES = int(os.environ.get("OUTCOME_SEGMENT_BYTES", 8 * 1024 * 1024))
+OUTCOME_MAX_BYTES = int(os.environ.get("OUTCOME_MAX_BYTES", 512 * 1024 * 1024))
+
+MAGIC = b"VOB1"
+BLOCK_HEAD = struct.Struct("<4sIH")
+PLAYER_BYTES = 16
+FLAG_CORRECT = 1
+FLAG_TRAP = 2
+
+# (열 이름, array 형식, 바이트 수)
+COLUMNS = (("ts", "d", 8), ("latency_us", "I", 4), ("stage", "H", 2), ("etype", "B", 1), ("flags", "B", 1))
+
+log = logging.getLogger(__name__)
+
+
+def _le(arr):
+    """array → little-endian bytes"""
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def encode_block(rows):
+    """[(ts, latency_s, stage, etype, correct, is_trap, player_id), ...] → 블록 bytes"""
+    names = {}
+    ts, lat, stage, etype, flags = array("d"), array("I"), array("H"), array("B"), array("B")
+    players = bytearray()
+    for t, latency, st, et, correct, trap, pid in rows:
+        ts.append(t)
+        lat.append(min(int(latency * 1e6), 0xFFFFFFFF))
+        stage.append(min(max(st, 0), 0xFFFF))
+        etype.append(names.setdefault(et, len(names)))  # etype은 등록된 이름 또는 "unknown"만
+        flags.append((FLAG_CORRECT if correct else 0) | (FLAG_TRAP if trap else 0))
+        players += (pid or "").encode()[:PLAYER_BYTES].ljust(PLAYER_BYTES, b"\0")
+    head = bytearray(BLOCK_HEAD.pack(MAGIC, len(ts), len(names)))
+    for name in names:  # dict는 넣은 순서 = 코드 순서
+        raw = name.encode()
+        head += bytes((len(raw),)) + raw
+    return bytes(head) + b"".join(_le(c) for c in (ts, lat, stage, etype, flags)) + bytes(players)
+
+
+class OutcomeLog:
+    """워커별 버퍼 + flush 스레드"""
+
+    def __init__(self, directory=OUTCOME_DIR, capacity=OUTCOME_RING, flush_s=OUTCOME_FLUSH_S,
+                 segment_bytes=OUTCOME_SEGMENT_BYTES, max_bytes=OUTCOME_MAX_BYTES):
+        self.directory = directory
+        self.capacity = capacity
+        self.flush_s = flush_s
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self._buf = deque()
+        self._prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._seq = 0
+        self._path = None
+        self._flush_lock = threading.Lock()
+        self.appended = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.blocks = 0
+        self.last_flush_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="outcome-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def append(self, stage, etype, correct, is_trap, latency_s, player_id=None):
+        """결과 한 줄 (가득 찼으면 버리고 False). player_id는 문자열로 (클라이언트가 보낸 값)"""
+        if player_id is not None and not isinstance(player_id, str):
+            player_id = str(player_id)
+        if len(self._buf) >= self.capacity:
+            self.dropped += 1
+            return False
+        self._buf.append((time.time(), latency_s, stage, etype, correct, is_trap, player_id))
+        self.appended += 1
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_s)
+            try:
+                self.flush()
+            except Exception:  # 스레드가 죽으면 이후 결과가 모두 버려지므로 어떤 예외든 남기고 계속
+                log.exception("verify 결과 로그 쓰기 실패")
+
+    def flush(self):
+        """버퍼에 쌓인 것을 블록 하나로 세그먼트에 덧붙인다"""
+        with self._flush_lock:
+            n = len(self._buf)
+            if not n:
+                return 0
+            t0 = time.perf_counter()
+            rows = [self._buf.popleft() for _ in range(n)]
+            block = encode_block(rows)
+            path = self._segment(len(block))
+            with open(path, "ab") as f:
+                f.write(block)
+            self.flushed += n
+            self.blocks += 1
+            self.last_flush_ms = (time.perf_counter() - t0) * 1000
+            return n
+
+    def _segment(self, incoming):
+        """지금 쓸 세그먼트 경로 (넘치면 다음 번호로, 폴더 상한 정리)"""
+        path = self._path
+        if path is not None:
+            try:
+                if os.path.getsize(path) + incoming <= self.segment_bytes:
+                    return path
+            except FileNotFoundError:
+                pass
+        os.makedirs(self.directory, exist_ok=True)
+        self._seq += 1
+        self._path = os.path.join(self.directory, f"{self._prefix}-{self._seq:05d}.seg")
+        _rotate(self.directory, self.max_bytes)
+        return self._path
+
+    def stats(self):
+        return {
+            "buffered": len(self._buf),
+            "capacity": self.capacity,
+            "appended": self.appended,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "blocks": self.blocks,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "segment": self._path,
+        }
+
+
+def _rotate(directory, max_bytes):
+    """세그먼트 합계가 max_bytes를 넘으면 오래된 것(이름순)부터 삭제"""
+    files = []
+    for name in os.listdir(directory):
+        if name.endswith(".seg"):
+            p = os.path.join(directory, name)
+            try:
+                files.append((name, os.path.getsize(p), p))
+            except FileNotFoundError:
+                continue
+    total = sum(size for _, size, _ in files)
+    for _, size, p in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+_log = None
+_log_pid = None
+_log_lock = threading.Lock()
+
+
+def get_outcome_log():
+    """현재 프로세스의 로그 (fork 후 처음 쓸 때 새로 만들고 flush 스레드 시작)"""
+    global _log, _log_pid
+    pid = os.getpid()
+    if _log_pid != pid:
+        with _log_lock:
+            if _log_pid != pid:
+                _log = OutcomeLog()
+                _log_pid = pid
+    return _log
+
+
+def record(stage, etype, correct, is_trap, latency_s, player_id=None):
+    if OUTCOME_LOG:
+        get_outcome_log().append(stage, etype, correct, is_trap, latency_s, player_id)
+
+
+# ─── 읽기 ────────────────────────────────────────────────────────
+
+def segments(directory=OUTCOME_DIR):
+    """세그먼트 경로 (이름순 = 시작 시각순)"""
+    try:
+        names = sorted(n for n in os.listdir(directory) if n.endswith(".seg"))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, n) for n in names]
+
+
+def _column(buf, at, typecode, size, n):
+    arr = array(typecode)
+    arr.frombytes(buf[at:at + size * n])
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr, at + size * n
+
+
+def iter_blocks(path, columns=("ts", "latency_us", "stage", "etype", "flags", "player")):
+    """세그먼트 하나 → 블록마다 (etype 이름 목록, {열 이름: array/list})
+
+    필요한 열만 꺼낸다 (나머지는 건너뛴다). 잘린 마지막 블록에서 멈춘다.
+    """
+    with open(path, "rb") as f:
+        buf = memoryview(f.read())
+    at = 0
+    while at + BLOCK_HEAD.size <= len(buf):
+        magic, n, k = BLOCK_HEAD.unpack_from(buf, at)
+        if magic != MAGIC:
+            log.warning("%s: %d 위치에 블록이 아닙니다", path, at)
+            return
+        p = at + BLOCK_HEAD.size
+        names = []
+        for _ in range(k):
+            if p >= len(buf):
+                return
+            ln = buf[p]
+            names.append(bytes(buf[p + 1:p + 1 + ln]).decode(errors="replace"))
+            p += 1 + ln
+        end = p + sum(size for _, _, size in COLUMNS) * n + PLAYER_BYTES * n
+        if end > len(buf):
+            return  # 쓰는 중
+        out = {}
+        for name, typecode, size in COLUMNS:
+            if name in columns:
+                out[name], p = _column(buf, p, typecode, size, n)
+            else:
+                p += size * n
+        if "player" in columns:
+            out["player"] = [bytes(buf[i:i + PLAYER_BYTES]).rstrip(b"\0").decode(errors="replace")
+                             for i in range(p, p + PLAYER_BYTES * n, PLAYER_BYTES)]
+        yield names, out
+        at = end
+
+
+def iter_outcomes(directory=OUTCOME_DIR):
+    """모든 세그먼트의 결과를 dict로 하나씩 (디버깅/내보내기용)"""
+    for path in segments(directory):
+        for names, cols in iter_blocks(path):
+            for ts, lat, st, et, fl, pid in zip(cols["ts"], cols["latency_us"], cols["stage"],
+                                                 cols["etype"], cols["flags"], cols["player"]):
+                yield {"ts": ts, "latency_us": lat, "stage": st, "etype": names[et] if et < len(names) else "?",
+                       "correct": bool(fl & FLAG_CORRECT), "is_trap": bool(fl & FLAG_TRAP), "player_id": pid or None}
+
+
+def aggregate(directory=OUTCOME_DIR, by=("etype", "stage"), since=None):
+    """(by 열 값 튜플) → [시도 수, 정답 수]  (세그먼트를 블록 단위로 흘려 읽는다)"""
+    need = {"etype", "stage", "flags"} | ({"ts"} if since is not None else set())
+    acc = {}
+    for path in segments(directory):
+        for names, cols in iter_blocks(path, need):
+            keys = [cols["stage"] if c == "stage" else [names[i] if i < len(names) else "?" for i in cols["etype"]]
+                    for c in by]
+            ts = cols.get("ts")
+            for i, fl in enumerate(cols["flags"]):
+                if ts is not None and ts[i] < since:
+                    continue
+                key = tuple(k[i] for k in keys)
+                a = acc.get(key)
+                if a is None:
+                    a = acc[key] = [0, 0]
+                a[0] += 1
+                a[1] += fl & FLAG_CORRECT
+    return acc
+
+
+def main():
+    ap = argparse.ArgumentParser(description="verify 결과 세그먼트 집계 (조건/스테이지별 정답률)")
+    ap.add_argument("--dir", default=OUTCOME_DIR)
+    ap.add_argument("--by", default="etype,stage", help="etype, stage, etype,stage 중 하나")
+    ap.add_argument("--since", help="이 날짜(YYYY-MM-DD) 이후만")
+    args = ap.parse_args()
+
+    by = tuple(args.by.split(","))
+    if not set(by) <= {"etype", "stage"}:
+        sys.exit("--by는 etype / stage 조합만 됩니다")
+    since = datetime.strptime(args.since, "%Y-%m-%d").timestamp() if args.since else None
+    acc = aggregate(args.dir, by, since)
+    if not acc:
+        sys.exit(f"{args.dir} 에 결과가 없습니다")
+    print("".join(f"{c:<20}" for c in by) + f"{'attempts':>10}{'correct':>10}{'pass %':>9}")
+    for key in sorted(acc):
+        n, ok = acc[key]
+        print("".join(f"{str(v):<20}" for v in key) + f"{n:>10}{ok:>10}{100 * ok / n:>8.1f}%")
+    total = sum(a[0] for a in acc.values())
+    print(f"\n{total} attempts, {len(segments(args.dir))} segments")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""요청 단위 프로파일링 (PROFILE=1 일 때만)
+
+WSGI 미들웨어로 감싸서 요청 전체(라우팅, 이벤트 생성, JSON 직렬화까지)를 잰다.
+PROFILE_SAMPLE 비율의 요청, 또는 PROFILE_HEADER 헤더로 강제한 요청만 프로파일한다.
+강제는 헤더 값이 PROFILE_SECRET과 같을 때만 (없으면 루프백에서 온 요청만) 받는다.
+강제한 요청의 응답에는 덤프 경로 대신 X-Profile-Id(파일 이름에 들어가는 무작위 id)를 붙인다.
+PROFILE이 꺼져 있으면 미들웨어를 아예 끼우지 않으므로 비용이 없다.
+
+형식 (PROFILE_FORMAT)
+- pstats    : cProfile 결과 (.prof, snakeviz / pstats로 열 수 있음)
+- collapsed : 요청 스레드 스택을 PROFILE_INTERVAL_MS마다 샘플링한 "a;b;c 개수" 줄
+              (flamegraph.pl / speedscope에 바로 넣을 수 있음)
+
+파일은 PROFILE_DIR/<엔드포인트>/ 아래에 쌓인다. 폴더 이름은 Flask url_map에서 찾은
+엔드포인트(없는 경로는 모두 other)라 폴더 수가 라우트 수로 묶이고, 폴더마다
+PROFILE_MAX_FILES개 / PROFILE_MAX_BYTES를 넘으면 오래된 파일부터 지운다.
+
+집계:
+    python profiling.py [--dir DIR] [--route new_event] [--top 20] [--sort tottime]
+"""
+import argparse
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE = os.environ.get("PROFILE", "0") == "1"
+PROFILE_SAMPLE = float(os.environ.get("PROFILE_SAMPLE", 0.01))
+PROFILE_HEADER = os.environ.get("PROFILE_HEADER", "X-Profile")
+PROFILE_SECRET = os.environ.get("PROFILE_SECRET", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_FORMAT = os.environ.get("PROFILE_FORMAT", "pstats")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 1.0))
+PROFILE_MAX_BYTES = int(os.environ.get("PROFILE_MAX_BYTES", 50 * 1024 * 1024))  # 라우트별
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 200))  # 라우트별
+
+LOOPBACK = ("127.0.0.1", "::1")
+
+SUFFIX = {"pstats": ".prof", "collapsed": ".collapsed"}
+
+
+def route_dir_name(url_map, environ):
+    """요청 → 엔드포인트 이름 (/api/new_event → new_event, 맞는 라우트가 없으면 other)"""
+    try:
+        endpoint, _ = url_map.bind_to_environ(environ).match()
+    except Exception:  # NotFound / MethodNotAllowed / RequestRedirect
+        return "other"
+    return "".join(c if c.isalnum() else "_" for c in endpoint)[:64]
+
+
+def _rotate(directory, max_bytes, max_files):
+    """폴더가 max_files개 또는 max_bytes를 넘으면 오래된 파일부터 삭제"""
+    files = []
+    for name in os.listdir(directory):
+        p = os.path.join(directory, name)
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            continue
+        files.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in files)
+    count = len(files)
+    for _, size, p in sorted(files):
+        if total <= max_bytes and count <= max_files:
+            break
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+        total -= size
+        count -= 1
+
+
+class _StackSampler:
+    """대상 스레드의 스택을 주기적으로 찍는 샘플러 (collapsed 형식용)"""
+
+    def __init__(self, thread_id, interval_s):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        # GIL 전환 주기(기본 5ms)가 샘플 간격보다 길면 CPU를 쓰는 동안 샘플이 안 찍힌다
+        self._switch = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch, self.interval_s / 2))
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if self._stop.is_set():  # stop()의 join 중인 스택은 버린다
+                break
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def _consume(app_iter):
+    """WSGI 응답 본문을 끝까지 만들고 close()까지 호출"""
+    try:
+        return list(app_iter)
+    finally:
+        close = getattr(app_iter, "close", None)
+        if close is not None:
+            close()
+
+
+class ProfilingMiddleware:
+    """샘플링된 요청만 프로파일해서 라우트별 폴더에 저장"""
+
+    def __init__(self, wsgi_app, url_map, directory=PROFILE_DIR, sample=PROFILE_SAMPLE, fmt=PROFILE_FORMAT,
+                 header=PROFILE_HEADER, secret=PROFILE_SECRET, max_bytes=PROFILE_MAX_BYTES,
+                 max_files=PROFILE_MAX_FILES, interval_ms=PROFILE_INTERVAL_MS):
+        if fmt not in SUFFIX:
+            raise ValueError(f"PROFILE_FORMAT은 {', '.join(SUFFIX)} 중 하나여야 합니다: {fmt}")
+        self.wsgi_app = wsgi_app
+        self.url_map = url_map
+        self.directory = directory
+        self.sample = sample
+        self.fmt = fmt
+        self.environ_key = "HTTP_" + header.upper().replace("-", "_")
+        self.secret = secret
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.interval_s = interval_ms / 1000
+        # cProfile은 프로세스에서 하나만 켤 수 있는 버전이 있어 한 번에 한 요청만 잰다
+        self._busy = threading.Lock()
+
+    def _forced(self, environ):
+        """헤더로 강제한 요청인지 (비밀값이 맞거나, 비밀값이 없으면 루프백에서 온 요청)"""
+        value = environ.get(self.environ_key)
+        if value in (None, "", "0"):
+            return False
+        if self.secret:
+            return hmac.compare_digest(value.encode(), self.secret.encode())
+        return environ.get("REMOTE_ADDR") in LOOPBACK
+
+    def __call__(self, environ, start_response):
+        forced = self._forced(environ)
+        if not (forced or random.random() < self.sample) or not self._busy.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+        try:
+            return self._profiled(environ, start_response, forced)
+        finally:
+            self._busy.release()
+
+    def _profiled(self, environ, start_response, forced):
+        route = route_dir_name(self.url_map, environ)
+        profile_id = secrets.token_hex(8)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{profile_id}{SUFFIX[self.fmt]}"
+        directory = os.path.join(self.directory, route)
+        path = os.path.join(directory, name)
+
+        def start_with_header(status, headers, exc_info=None):
+            if forced:  # 경로는 알려 주지 않는다 (id로 서버에서 파일을 찾는다)
+                headers = list(headers) + [("X-Profile-Id", profile_id)]
+            return start_response(status, headers, exc_info)
+
+        if self.fmt == "pstats":
+            prof = cProfile.Profile()
+            prof.enable()
+            try:
+                # 응답 본문까지 만들어야 직렬화 비용이 잡힌다
+                body = _consume(self.wsgi_app(environ, start_with_header))
+            finally:
+                prof.disable()
+            os.makedirs(directory, exist_ok=True)
+            prof.dump_stats(path)
+        else:
+            sampler = _StackSampler(threading.get_ident(), self.interval_s)
+            sampler.start()
+            try:
+                body = _consume(self.wsgi_app(environ, start_with_header))
+            finally:
+                sampler.stop()
+            os.makedirs(directory, exist_ok=True)
+            with open(path, "w") as f:
+                f.write(sampler.dump())
+        _rotate(directory, self.max_bytes, self.max_files)
+        return body
+
+
+def install(app):
+    """PROFILE=1 이면 Flask 앱에 미들웨어를 끼운다 (아니면 아무것도 안 함)"""
+    if PROFILE:
+        app.wsgi_app = ProfilingMiddleware(app.wsgi_app, app.url_map)
+
+
+# ─── 집계 CLI ────────────────────────────────────────────────────
+
+def _files(directory, route, suffix):
+    out = []
+    for root, _, names in os.walk(directory):
+        if route and os.path.basename(root) != route:
+            continue
+        out.extend(os.path.join(root, n) for n in names if n.endswith(suffix))
+    return sorted(out)
+
+
+def report_pstats(files, top, sort):
+    stats = pstats.Stats(files[0], stream=io.StringIO())
+    for f in files[1:]:
+        stats.add(f)
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats(sort).print_stats(top)
+    return out.getvalue()
+
+
+def report_collapsed(files, top):
+    self_counts, total_counts = Counter(), Counter()
+    samples = 0
+    for path in files:
+        with open(path) as f:
+            for line in f:
+                stack, _, n = line.rstrip("\n").rpartition(" ")
+                if not stack:
+                    continue
+                n = int(n)
+                frames = stack.split(";")
+                samples += n
+                self_counts[frames[-1]] += n
+                for fn in set(frames):  # 재귀는 한 번만
+                    total_counts[fn] += n
+    lines = [f"{len(files)} files, {samples} samples", "",
+             f"{'self %':>8}{'total %':>9}  function"]
+    for fn, n in self_counts.most_common(top):
+        lines.append(f"{100 * n / samples:>7.1f}%{100 * total_counts[fn] / samples:>8.1f}%  {fn}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="프로파일 덤프 집계 (상위 N개 함수)")
+    ap.add_argument("--dir", default=PROFILE_DIR)
+    ap.add_argument("--route", help="엔드포인트 폴더 이름 (예: new_event)")
+    ap.add_argument("--format", choices=sorted(SUFFIX), default=None, help="기본: 있는 파일로 판단")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--sort", default="tottime", help="pstats 정렬 기준 (tottime, cumulative, ...)")
+    args = ap.parse_args()
+
+    fmts = [args.format] if args.format else ["pstats", "collapsed"]
+    found = False
+    for fmt in fmts:
+        files = _files(args.dir, args.route, SUFFIX[fmt])
+        if not files:
+            continue
+        found = True
+        print(f"== {fmt} ({len(files)} files) ==")
+        print(report_pstats(files, args.top, args.sort) if fmt == "pstats" else report_collapsed(files, args.top))
+    if not found:
+        sys.exit(f"{args.dir} 에 프로파일 파일이 없습니다")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ let STATE = {
   totalCorrect: 0,
   totalWrong: 0,
   event: null,
+  eventId: null,
   theme: null,
   bgSchedule: [],
   iconSchedule: [],
@@ -116,6 +117,7 @@ async function beginStage(stage) {
     const res = await fetch(BASE + "/new_event?stage=" + stage);
     const data = await res.json();
     STATE.event = data.event;
+    STATE.eventId = data.event_id;
     STATE.theme = data.theme;
     STATE.bgSchedule = data.bg_schedule;
     STATE.iconSchedule = data.icon_schedule;
@@ -373,6 +375,25 @@ function updateFlip(h, m, s) {
 // ════════════════════════════════════════════════════════════
 // STOP BUTTON
 // ════════════════════════════════════════════════════════════
+// 서버에 보내는 verify 본문: event_id + 멈춘 시점 + 조건에 필요한 입력만.
+// 배경/아이콘/하이라이트/시계색/빨간색 여부는 서버가 저장된 스케줄과 stopped_at으로 계산한다.
+function verifyBody(stoppedAt, clicked) {
+  const body = {
+    event_id: STATE.eventId,
+    player_id: STATE.playerId,
+    stopped_at: stoppedAt,
+    current_time: { h: STATE.currentH, m: STATE.currentM, s: STATE.currentS },
+    clicked: clicked,
+  };
+  switch (STATE.event?.type) {
+    case "spacebar_count": body.spacebar_count = STATE.spacebarCount; break;
+    case "rapid_tap": body.rapid_taps = STATE.rapidTaps; break;
+    case "long_press": body.press_start = STATE.pressStart; body.press_duration = STATE.pressDuration; break;
+    case "rhythm_tap": body.rhythm_taps = STATE.rhythmTaps; body.blink_times = STATE.blinkTimes; break;
+  }
+  return body;
+}
+
 async function onStop(e) {
   if (!STATE.running || STATE.stopped) return;
   const btn = document.getElementById("btnStop");
@@ -397,15 +418,7 @@ async function onStop(e) {
     const res = await fetch(BASE + "/verify", {
       method: "POST",
       headers: {"Content-Type":"application/json"},
-      body: JSON.stringify({
-        event: STATE.event,
-        stopped_at: stoppedAt,
-        current_time: { h: STATE.currentH, m: STATE.currentM, s: STATE.currentS },
-        active_bg_color: STATE.activeBg,
-        active_icons: STATE.activeIcons,
-        active_highlight: STATE.activeHighlight,
-        spacebar_count: STATE.spacebarCount,
-      })
+      body: JSON.stringify(verifyBody(stoppedAt, true))
     });
     const data = await res.json();
     if (data.correct) {
@@ -814,23 +827,7 @@ window.onStop = async function(event) {
     const res = await fetch(BASE + "/verify", {
       method: "POST",
       headers: {"Content-Type":"application/json"},
-      body: JSON.stringify({
-        event: STATE.event,
-        stopped_at: stoppedAt,
-        current_time: { h: STATE.currentH, m: STATE.currentM, s: STATE.currentS },
-        active_bg_color: STATE.activeBg,
-        active_icons: STATE.activeIcons,
-        active_highlight: STATE.activeHighlight,
-        active_clock_color: STATE.activeClockColor,
-        spacebar_count: STATE.spacebarCount,
-        rapid_taps: STATE.rapidTaps,
-        press_start: STATE.pressStart,
-        press_duration: STATE.pressDuration,
-        red_appeared: STATE.redAppeared,
-        clicked: true,
-        rhythm_taps: STATE.rhythmTaps,
-        blink_times: STATE.blinkTimes,
-      })
+      body: JSON.stringify(verifyBody(stoppedAt, true))
     });
     const data = await res.json();
     if (data.correct) {
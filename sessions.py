@@ -0,0 +1,228 @@
+"""서버 측 게임 세션 저장소
+
+/api/new_event가 만든 이벤트와 스케줄을 짧은 id로 저장해 두고,
+/api/verify는 id + 입력값만 받는다. 메모리는 LRU + TTL + 용량 상한으로 관리하고,
+다른 gunicorn 워커가 만든 이벤트는 SQLite event_sessions 테이블에서 찾아온다.
+공유 테이블 기록은 요청 안에서 하지 않고 워커별 flush 스레드가 SESSION_FLUSH_MS마다
+모아서 한 트랜잭션으로 쓴다 (verify는 이벤트를 보여 준 뒤 몇 초 지나서 온다).
+검사 클로저(conditions.compile_event)도 함께 저장해서 detail은 한 번만 읽는다.
+
+용량 상한 SESSION_MAX_JSON_BYTES는 payload를 JSON으로 직렬화한 크기의 합이다.
+파이썬 객체로 들고 있는 실제 메모리는 객체 오버헤드 때문에 이보다 몇 배 크다.
+"""
+import atexit
+import logging
+import math
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+import db
+import fastjson
+from conditions import compile_event
+
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 600))  # 초
+SESSION_MAX_ITEMS = int(os.environ.get("SESSION_MAX_ITEMS", 50000))
+SESSION_MAX_JSON_BYTES = int(os.environ.get("SESSION_MAX_JSON_BYTES", 32 * 1024 * 1024))
+SESSION_SHARED = os.environ.get("SESSION_SHARED", "1") == "1"  # SQLite 공유 테이블 사용
+SESSION_FLUSH_MS = int(os.environ.get("SESSION_FLUSH_MS", 50))
+
+# 만료 행 정리 주기 (초, flush 스레드가 함께 한다)
+PRUNE_EVERY_S = 60
+
+log = logging.getLogger(__name__)
+
+
+class Session:
+    __slots__ = ("payload", "compiled", "expires_at", "size")
+
+    def __init__(self, payload, expires_at, size):
+        self.payload = payload
+        evt = payload["event"]
+        self.compiled = compile_event(evt.get("type"), evt.get("detail", {}))
+        self.expires_at = expires_at
+        self.size = size
+
+
+class SessionStore:
+    """LRU/TTL/용량 상한 메모리 저장소 (+ SQLite 공유 테이블)"""
+
+    def __init__(self, ttl=SESSION_TTL, max_items=SESSION_MAX_ITEMS,
+                 max_json_bytes=SESSION_MAX_JSON_BYTES, shared=SESSION_SHARED,
+                 flush_ms=SESSION_FLUSH_MS):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_json_bytes = max_json_bytes
+        self.shared = shared
+        self.flush_s = flush_ms / 1000
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._flush_lock = threading.Lock()
+        self._flusher_pid = None
+        self._conn = None
+        self._pruned_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.sqlite_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.persisted = 0
+        self.persist_dropped = 0
+        self.last_flush_ms = 0.0
+
+    def put(self, payload):
+        """payload 저장 → id (공유 테이블에는 flush 스레드가 나중에 기록)"""
+        sid = secrets.token_urlsafe(6)
+        text = fastjson.dumps(payload).decode()
+        expires_at = time.time() + self.ttl
+        self._insert(sid, Session(payload, expires_at, len(text)))
+        if self.shared:
+            self._ensure_flusher()
+            if len(self._pending) >= self.max_items:
+                self.persist_dropped += 1  # DB가 계속 실패하는 경우 (메모리에는 있다)
+            else:
+                self._pending.append((sid, text, expires_at))
+        return sid
+
+    def _insert(self, sid, sess):
+        with self._lock:
+            self._items[sid] = sess
+            self._bytes += sess.size
+            now = time.time()
+            # 오래된 쪽(앞)부터 만료 정리 후 상한 넘으면 LRU 제거
+            while self._items:
+                oldest = next(iter(self._items.values()))
+                if oldest.expires_at < now:
+                    self.expirations += 1
+                elif len(self._items) > self.max_items or self._bytes > self.max_json_bytes:
+                    self.evictions += 1
+                else:
+                    break
+                self._bytes -= self._items.popitem(last=False)[1].size
+
+    def get(self, sid, get_conn=None):
+        """id → Session (메모리에 없으면 get_conn()으로 SQLite 조회, 없거나 만료면 None)"""
+        now = time.time()
+        with self._lock:
+            sess = self._items.get(sid)
+            if sess is not None:
+                if sess.expires_at >= now:
+                    self._items.move_to_end(sid)
+                    self.hits += 1
+                    return sess
+                del self._items[sid]
+                self._bytes -= sess.size
+                self.expirations += 1
+        if get_conn is not None and self.shared:
+            row = get_conn().execute(
+                "SELECT payload, expires_at FROM event_sessions WHERE id=?", (sid,)
+            ).fetchone()
+            if row and row["expires_at"] >= now:
+                sess = Session(fastjson.loads(row["payload"]), row["expires_at"], len(row["payload"]))
+                self._insert(sid, sess)
+                self.sqlite_hits += 1
+                return sess
+        self.misses += 1
+        return None
+
+    # ─── 공유 테이블 기록 (워커별 flush 스레드) ───
+
+    def _ensure_flusher(self):
+        """fork 뒤 처음 put할 때 이 프로세스의 flush 스레드 시작"""
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._flush_lock:
+            if self._flusher_pid == pid:
+                return
+            self._pending.clear()  # fork 전 부모가 쌓은 것은 부모가 쓴다
+            self._conn = None
+            threading.Thread(target=self._run, name="session-flush", daemon=True).start()
+            atexit.register(self.flush)
+            self._flusher_pid = pid
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_s)
+            try:
+                self.flush()
+            except sqlite3.Error:
+                log.exception("event_sessions 기록 실패 (다음 주기에 다시 시도)")
+
+    def flush(self):
+        """쌓인 세션을 한 트랜잭션으로 공유 테이블에 기록 → 기록한 수"""
+        with self._flush_lock:
+            n = len(self._pending)
+            if not n:
+                return 0
+            t0 = time.perf_counter()
+            rows = [self._pending.popleft() for _ in range(n)]
+            if self._conn is None:
+                self._conn = db.connect()
+            conn = self._conn
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO event_sessions (id, payload, expires_at) VALUES (?,?,?)", rows
+                )
+                now = time.time()
+                if now - self._pruned_at >= PRUNE_EVERY_S:
+                    conn.execute("DELETE FROM event_sessions WHERE expires_at < ?", (now,))
+                    self._pruned_at = now
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                self._pending.extendleft(reversed(rows))
+                raise
+            self.persisted += n
+            self.last_flush_ms = (time.perf_counter() - t0) * 1000
+            return n
+
+    def stats(self):
+        return {
+            "items": len(self._items),
+            "json_bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "sqlite_hits": self.sqlite_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "shared": self.shared,
+            "pending": len(self._pending),
+            "persisted": self.persisted,
+            "persist_dropped": self.persist_dropped,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
+
+
+def _last_at(schedule, elapsed, field):
+    value = None
+    for item in schedule:
+        if item["at"] > elapsed:
+            break
+        value = item[field]
+    return value
+
+
+def derive_inputs(payload, data):
+    """화면 상태를 저장된 스케줄 + stopped_at으로 계산한다
+
+    클라이언트가 같은 필드를 보내도 서버 값으로 덮어쓴다. stopped_at이 없거나
+    유한한 숫자가 아니면 ValueError.
+    아이콘은 index.html과 같이 한 번 뜬 것은 모두 본 것으로 친다 (STATE.activeIcons는 쌓기만 함).
+    """
+    elapsed = data.get("stopped_at")
+    if isinstance(elapsed, bool) or not isinstance(elapsed, (int, float)) or not math.isfinite(elapsed):
+        raise ValueError("stopped_at은 유한한 숫자(초)여야 합니다")
+    data = dict(data)
+    bg = payload.get("bg_schedule", [])
+    data["active_bg_color"] = _last_at(bg, elapsed, "color")
+    data["active_highlight"] = _last_at(payload.get("clock_highlight_schedule", []), elapsed, "clock")
+    data["active_clock_color"] = _last_at(payload.get("clock_color_schedule", []), elapsed, "color")
+    data["active_icons"] = [item["icon"] for item in payload.get("icon_schedule", []) if item["at"] <= elapsed]
+    data["red_appeared"] = any(item["color"] == "#e74c3c" and item["at"] <= elapsed for item in bg)
+    return data
@@ -0,0 +1,405 @@
+"""워커 간 공유 캐시 (mmap 파일: 상위 N 리더보드 + 개인 최고기록 해시 테이블)
+
+gunicorn 워커마다 따로 캐시를 들면 한 워커의 save_record가 다른 워커에는
+보이지 않아 각자 SQLite를 다시 읽어야 한다. 이 모듈은 DB 옆의 파일 하나를
+모든 워커가 mmap으로 같이 보고, save_record가 커밋 후 바로 여기에 반영한다.
+
+동시성
+- 쓰기: 스레드 잠금 + 파일 flock(LOCK_EX) 으로 한 번에 한 쓰기만
+- 읽기: 잠금 없이 seqlock. 쓰기 동안 seq가 홀수이고 끝나면 짝수로 올라간다.
+  읽기 전후 seq가 같고 짝수일 때만 결과를 쓰고, 아니면 다시 읽는다.
+  (쓰기 도중 죽은 프로세스가 있으면 몇 번 재시도 후 SQLite로 넘어간다)
+- 파일 내용은 서버 실행마다 한 번 SQLite로 다시 만든다. 헤더의 run 칸이 "이번 실행에서
+  채웠음" 표시다.
+  1. start_run (gunicorn 마스터 on_starting, 그 밖에는 처음 붙는 프로세스): 아무 잠금도
+     없이 <파일>.lock에 LOCK_EX|LOCK_NB를 시도한다. 잡히면 붙어 있는 프로세스가 없으므로
+     파일을 비우고 새 run id, 아니면 살아 있는 실행의 run id(헤더)를 이어 쓴다.
+     SHARED_CACHE_RUN 환경 변수로 워커에 넘긴다.
+  2. 붙기: 모든 프로세스가 먼저 <파일>.lock에 LOCK_SH (끝날 때까지 유지) → 파일 LOCK_EX
+     (쓰기 잠금과 같음) → 그 안에서 헤더 run이 이번 run id와 다르면 SQLite로 다시 채우고
+     run을 맨 마지막에 쓴다. 잠금을 바꾸지(EX→SH) 않으므로 채우는 도중 다른 프로세스가
+     끼어들 틈이 없고, 채우다 죽으면 run이 그대로라 다음에 붙는 프로세스가 다시 채운다.
+
+개인 최고기록은 선형 탐사 해시 테이블이다 (삭제 없음, 해시는 crc32라 프로세스마다 같다).
+시작할 때 player_best 전체가 들어가면 complete 표시를 해 두고, 이때는 테이블에
+없는 플레이어를 기록 없음(0, 0)으로 본다. 다 안 들어가면 없는 플레이어는 SQLite에서 찾는다.
+
+fcntl이 없는 환경(Windows)에서는 꺼진다.
+"""
+import logging
+import mmap
+import os
+import secrets
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from contextlib import contextmanager
+
+import db
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SHARED_CACHE = os.environ.get("SHARED_CACHE", "1") == "1" and fcntl is not None
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH") or os.path.join(db.DB_PATH, "game.cache")
+SHARED_BEST_SLOTS = int(os.environ.get("SHARED_BEST_SLOTS", 65536))  # 2의 거듭제곱으로 올림
+
+MAGIC = b"10MINSHM"
+LAYOUT = 2
+MAX_LOAD = 0.75   # 해시 테이블 최대 사용률
+READ_RETRIES = 1000
+
+# magic, layout, 리더보드 칸 수, 최고기록 칸 수, flags, seq, 리더보드 세대, 리더보드 행 수, 최고기록 수,
+# run (이번 실행에서 채웠으면 그 run id, 0이면 아직)
+HEADER = struct.Struct("<8sIIIIQQIIQ")
+SEQ_AT = 24
+RUN_AT = 48
+FLAG_COMPLETE = 1
+
+NAME_BYTES = 96
+# record_id, max_stage, total_correct, 이름 길이, 이름(UTF-8), played_at
+LB_ROW = struct.Struct(f"<qiiB{NAME_BYTES}s20s")
+
+KEY_BYTES = 16
+# player_id, max_stage, total_correct (player_id가 비어 있으면 빈 칸)
+BEST = struct.Struct(f"<{KEY_BYTES}sii")
+
+_SEQ = struct.Struct("<Q")
+
+log = logging.getLogger(__name__)
+
+
+def _pow2(n):
+    return 1 << max(n - 1, 1).bit_length()
+
+
+def _key(pid):
+    """player_id → 고정 길이 키 (담을 수 없으면 None)"""
+    if not pid:
+        return None
+    key = pid.encode()
+    if len(key) > KEY_BYTES:
+        return None
+    return key.ljust(KEY_BYTES, b"\0")
+
+
+def _name(name):
+    """UTF-8 NAME_BYTES 안으로 (넘으면 글자 경계에서 자른다)"""
+    raw = name.encode()
+    if len(raw) > NAME_BYTES:
+        raw = raw[:NAME_BYTES].decode(errors="ignore").encode()
+    return raw
+
+
+def _better(a, b):
+    """(max_stage, total_correct) a가 b보다 좋은지 (player_best upsert와 같은 기준)"""
+    return a[0] > b[0] or (a[0] == b[0] and a[1] > b[1])
+
+
+class SharedCache:
+    """mmap 파일 하나에 대한 프로세스 쪽 핸들"""
+
+    def __init__(self, path=SHARED_CACHE_PATH, lb_size=db.LEADERBOARD_SIZE, best_slots=SHARED_BEST_SLOTS):
+        self.path = path
+        self.lb_size = lb_size
+        self.best_slots = _pow2(best_slots)
+        self._mask = self.best_slots - 1
+        self._lb_at = HEADER.size
+        self._best_at = self._lb_at + lb_size * LB_ROW.size
+        self.size = self._best_at + self.best_slots * BEST.size
+        self._tlock = threading.Lock()
+        self.read_retries = 0
+        self.read_fallbacks = 0
+        self.writes = 0
+
+        run = current_run(path)
+        self._live = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._live, fcntl.LOCK_SH)  # 붙어 있다는 표시 (start_run이 본다)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)    # 채우기/쓰기는 한 번에 하나
+        try:
+            size = os.fstat(self._fd).st_size
+            if size == 0:  # start_run이 비운 파일 (아직 아무도 mmap하지 않았다)
+                os.ftruncate(self._fd, self.size)
+            elif size != self.size:
+                raise ValueError(f"{path} 크기가 설정과 다릅니다 (SHARED_BEST_SLOTS / LEADERBOARD_SIZE 확인)")
+            self._mm = mmap.mmap(self._fd, self.size)
+            head = HEADER.unpack_from(self._mm, 0)
+            if head[9] != run:
+                self._rebuild(run)
+            elif head[:4] != (MAGIC, LAYOUT, lb_size, self.best_slots):
+                raise ValueError(f"{path} 형식이 설정과 다릅니다")
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # ─── 잠금 ───
+
+    @contextmanager
+    def _seq_write(self):
+        """seq 홀수 → 작업 → 짝수 (파일 LOCK_EX를 잡은 상태에서)"""
+        seq = _SEQ.unpack_from(self._mm, SEQ_AT)[0] | 1  # 죽은 쓰기가 남긴 홀수도 그대로 이어 간다
+        _SEQ.pack_into(self._mm, SEQ_AT, seq)
+        try:
+            yield
+        finally:
+            _SEQ.pack_into(self._mm, SEQ_AT, seq + 1)
+            self.writes += 1
+
+    @contextmanager
+    def _writing(self):
+        """쓰기 구간 (스레드 잠금 + 파일 LOCK_EX + seq)"""
+        with self._tlock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                with self._seq_write():
+                    yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _read(self, fn):
+        """seqlock 읽기 (일관된 결과를 못 얻으면 None)"""
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            seq = _SEQ.unpack_from(mm, SEQ_AT)[0]
+            if not seq & 1:
+                try:
+                    out = fn(mm)
+                except (ValueError, struct.error):  # 쓰는 중인 값을 읽었을 때
+                    out = None
+                if _SEQ.unpack_from(mm, SEQ_AT)[0] == seq:
+                    return out
+            self.read_retries += 1
+            os.sched_yield()
+        self.read_fallbacks += 1
+        return None
+
+    def _header(self, mm):
+        return HEADER.unpack_from(mm, 0)
+
+    # ─── 채우기 ───
+
+    def _rebuild(self, run):
+        """SQLite로 다시 채우고 헤더 run을 이번 실행으로 (파일 LOCK_EX를 잡은 __init__에서)
+
+        SQLite도 잠금 안에서 읽으므로, 그 사이 커밋된 기록의 offer/put_best는
+        이 채우기가 끝난 뒤에 반영된다.
+        """
+        pool = db.get_pool()
+        conn = pool.acquire()
+        try:
+            lb = conn.execute(db.LEADERBOARD_SQL, (self.lb_size,)).fetchall()
+            best = conn.execute("SELECT player_id, max_stage, total_correct FROM player_best").fetchall()
+        finally:
+            pool.release(conn)
+        with self._tlock, self._seq_write():
+            mm = self._mm
+            gen = 0
+            if mm[:8] == MAGIC:
+                gen = self._header(mm)[6]
+            mm[HEADER.size:] = bytes(self.size - HEADER.size)
+            for i, r in enumerate(lb):
+                self._pack_row(i, tuple(r))
+            count, complete = 0, True
+            for pid, max_stage, total_correct in best:
+                key = _key(pid)
+                if key is None or count >= self.best_slots * MAX_LOAD:
+                    complete = False
+                    continue
+                i = self._probe(mm, key)
+                BEST.pack_into(mm, self._best_at + i * BEST.size, key, max_stage, total_correct)
+                count += 1
+            seq = _SEQ.unpack_from(mm, SEQ_AT)[0]
+            HEADER.pack_into(mm, 0, MAGIC, LAYOUT, self.lb_size, self.best_slots,
+                             FLAG_COMPLETE if complete else 0, seq, gen + 1, len(lb), count, 0)
+            _SEQ.pack_into(mm, RUN_AT, run)  # 다 채운 뒤 마지막에
+        log.info("공유 캐시 채움: 리더보드 %d행, 최고기록 %d명%s", len(lb), count, "" if complete else " (일부)")
+
+    # ─── 리더보드 ───
+
+    def _pack_row(self, i, row):
+        record_id, name, max_stage, total_correct, played_at = row
+        raw = _name(name)
+        LB_ROW.pack_into(self._mm, self._lb_at + i * LB_ROW.size, record_id, max_stage, total_correct,
+                         len(raw), raw, (played_at or "").encode())
+
+    def _rows(self, mm):
+        n = self._header(mm)[7]
+        out = []
+        for i in range(min(n, self.lb_size)):
+            rid, ms, tc, nlen, name, played = LB_ROW.unpack_from(mm, self._lb_at + i * LB_ROW.size)
+            out.append((rid, name[:nlen].decode(), ms, tc, played.rstrip(b"\0").decode()))
+        return out
+
+    def leaderboard_gen(self):
+        """리더보드가 바뀔 때마다 올라가는 값"""
+        return self._header(self._mm)[6]
+
+    def leaderboard(self):
+        """(세대, [(record_id, name, max_stage, total_correct, played_at), ...]) 또는 None"""
+        return self._read(lambda mm: (self._header(mm)[6], self._rows(mm)))
+
+    def qualifies(self, max_stage, total_correct):
+        """N위 안에 들어가는 기록인지 (못 읽으면 True로 보고 offer에서 다시 판단)"""
+        def last(mm):
+            n = self._header(mm)[7]
+            if n < self.lb_size:
+                return None
+            return LB_ROW.unpack_from(mm, self._lb_at + (n - 1) * LB_ROW.size)[1:3]
+        tail = self._read(last)
+        return tail is None or _better((max_stage, total_correct), tail)
+
+    def offer(self, record_id, name, max_stage, total_correct, played_at):
+        """새 기록을 순위에 넣고 세대를 올린다 (N위 밖이면 False)"""
+        key = db._rank_key(max_stage, total_correct, record_id)
+        with self._writing():
+            rows = self._rows(self._mm)
+            if any(r[0] == record_id for r in rows):
+                return True  # 다른 실행이 SQLite로 다시 채우면서 이미 넣은 기록
+            keys = [db._rank_key(r[2], r[3], r[0]) for r in rows]
+            i = bisect_right(keys, key)
+            if i >= self.lb_size:
+                return False
+            rows.insert(i, (record_id, name, max_stage, total_correct, played_at))
+            del rows[self.lb_size:]
+            for j in range(i, len(rows)):
+                self._pack_row(j, rows[j])
+            head = list(self._header(self._mm))
+            head[6] += 1
+            head[7] = len(rows)
+            HEADER.pack_into(self._mm, 0, *head)
+        return True
+
+    # ─── 개인 최고기록 ───
+
+    def _probe(self, mm, key):
+        """key가 있는 칸, 없으면 처음 만나는 빈 칸"""
+        i = zlib.crc32(key) & self._mask
+        empty = bytes(KEY_BYTES)
+        while True:
+            at = self._best_at + i * BEST.size
+            k = mm[at:at + KEY_BYTES]
+            if k == key or k == empty:
+                return i
+            i = (i + 1) & self._mask
+
+    def best(self, pid):
+        """player_id → (max_stage, total_correct), 모르면 None (SQLite에서 찾아야 함)"""
+        key = _key(pid)
+        if key is None:
+            return None
+
+        def find(mm):
+            i = self._probe(mm, key)
+            k, ms, tc = BEST.unpack_from(mm, self._best_at + i * BEST.size)
+            if k == key:
+                return ms, tc
+            return (0, 0) if self._header(mm)[4] & FLAG_COMPLETE else None
+        return self._read(find)
+
+    def put_best(self, pid, max_stage, total_correct):
+        """커밋된 기록을 반영 (더 좋은 기록일 때만 덮어쓴다)
+
+        있던 값과 새 기록 중 좋은 쪽이 곧 player_best 값이다. 테이블에 없는
+        플레이어는 complete일 때만 (= DB에도 없었을 때만) 새로 넣는다.
+        """
+        key = _key(pid)
+        if key is None:
+            return
+        with self._writing():
+            mm = self._mm
+            head = list(self._header(mm))
+            i = self._probe(mm, key)
+            at = self._best_at + i * BEST.size
+            k, ms, tc = BEST.unpack_from(mm, at)
+            if k == key:
+                if _better((max_stage, total_correct), (ms, tc)):
+                    BEST.pack_into(mm, at, key, max_stage, total_correct)
+                return
+            if not head[4] & FLAG_COMPLETE:
+                return
+            if head[8] + 1 > self.best_slots * MAX_LOAD:
+                head[4] &= ~FLAG_COMPLETE  # 가득 참 → 이제부터 없는 플레이어는 SQLite에서
+            else:
+                BEST.pack_into(mm, at, key, max_stage, total_correct)
+                head[8] += 1
+            HEADER.pack_into(mm, 0, *head)
+
+    def stats(self):
+        head = self._read(self._header) or self._header(self._mm)
+        return {
+            "path": self.path,
+            "bytes": self.size,
+            "leaderboard_rows": head[7],
+            "leaderboard_gen": head[6],
+            "best_items": head[8],
+            "best_slots": self.best_slots,
+            "best_complete": bool(head[4] & FLAG_COMPLETE),
+            "run": head[9],
+            "writes": self.writes,
+            "read_retries": self.read_retries,
+            "read_fallbacks": self.read_fallbacks,
+        }
+
+
+# ─── 실행 id ─────────────────────────────────────────────────────
+
+def start_run(path=SHARED_CACHE_PATH):
+    """이번 서버 실행의 run id를 정해 SHARED_CACHE_RUN에 넣는다
+
+    <파일>.lock에 LOCK_SH를 잡은 프로세스가 없으면 파일을 비우고(크기 0) 새 id,
+    있으면 그 실행이 헤더에 남긴 id를 이어 쓴다 (아직 못 채웠으면 새 id → 붙을 때 채움).
+    이 프로세스는 아무 잠금도 잡지 않은 채 LOCK_EX|LOCK_NB로 확인만 하고 바로 놓는다.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    live = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    run = 0
+    try:
+        try:
+            fcntl.flock(live, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read(HEADER.size)
+                if len(raw) == HEADER.size:
+                    run = HEADER.unpack(raw)[9]
+            except FileNotFoundError:
+                pass
+        else:
+            os.close(os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644))
+    finally:
+        os.close(live)
+    run = run or secrets.randbits(63) | 1
+    os.environ["SHARED_CACHE_RUN"] = str(run)
+    return run
+
+
+def current_run(path=SHARED_CACHE_PATH):
+    """SHARED_CACHE_RUN (gunicorn이면 마스터가 정한 값, 없으면 여기서 start_run)"""
+    run = os.environ.get("SHARED_CACHE_RUN")
+    return int(run) if run else start_run(path)
+
+
+_cache = None
+_cache_pid = None
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """현재 프로세스의 공유 캐시 (꺼져 있거나 붙지 못하면 None → SQLite 사용)"""
+    global _cache, _cache_pid
+    if not SHARED_CACHE:
+        return None
+    pid = os.getpid()
+    if _cache_pid != pid:
+        with _cache_lock:
+            if _cache_pid != pid:
+                try:
+                    _cache = SharedCache()
+                except (OSError, ValueError):
+                    log.exception("공유 캐시를 열 수 없어 SQLite만 씁니다")
+                    _cache = None
+                _cache_pid = pid
+    return _cache
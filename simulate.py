@@ -0,0 +1,268 @@
+"""이벤트 생성기 난이도 몬테카를로 시뮬레이터
+
+실제 생성 함수(events.generate_event)를 스테이지 x 하루 86,400개 시작 초 전체에 대해
+돌려서 확률 조정(시각 기반 70%, 함정 30%, 안개/거울/가짜 시계 효과 등)이 실제로
+어떤 분포를 만드는지 센다. 작업은 (스테이지, 시작 초 구간) 단위로 프로세스 풀에 나눈다.
+
+seed는 (--seed, 스테이지, 시작 초, 반복 번호)로 정해지므로 같은 코드/옵션이면 결과가
+같고, JSON 출력(키 정렬)을 커밋끼리 diff 할 수 있다.
+
+    python simulate.py                                 # 스테이지 1~21 x 86,400초 x 1회
+    python simulate.py --stages 1-5 --t0-step 60       # 빠른 확인 (매분 0초만)
+    python simulate.py --repeat 3 --workers 8 --out sim.json
+    python simulate.py --compare sim.json              # 저장한 결과 대비 비율 변화
+
+세는 것 (스테이지별 + 전체)
+- branch       : 시각 기반 / 시각 무관 / 숫자 시계가 없어 시각 무관으로 강제된 수
+- fallback     : 시각 기반 조건 후보가 비어 시각 무관 조건으로 대신한 수
+- etype, trap  : 조건 종류별 수와 그중 함정(is_trap) 수, no_click(누르면 안 되는 불가능 조건) 수
+- solvable     : 검색 키가 있는 조건 중 2~10초 창 안에 실제 정답 시각이 있는 수
+                 (함정은 trap_solvable로 따로 센다, 0이어야 정상)
+- effects      : 효과 종류별 수, 시계 수 분포, 테마 분포
+- schedules    : 스케줄별 항목 수 분포와 가장 짧은 이웃 간격, 정답 항목 시각 분포(초 단위)
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import events
+from conditions import compile_event
+from timetable import DAY_SECONDS, NEXT_MATCH
+
+WINDOW = (2, 10)  # get_possible_times: 2~10초 뒤
+SCHEDULES = ("bg_schedule", "icon_schedule", "clock_highlight_schedule", "clock_color_schedule")
+# 정답 항목을 알아보는 detail 키 (스케줄, 항목 키, detail 키)
+TARGETS = {
+    "bg_color_change": ("bg_schedule", "color", "target_color_hex"),
+    "icon_appears": ("icon_schedule", "icon", "target_icon"),
+    "clock_type_match": ("clock_highlight_schedule", "clock", "target_clock"),
+    "clock_color_match": ("clock_color_schedule", "color", "target_color_hex"),
+}
+
+
+def seed_for(base, stage, t0, rep):
+    """(기본 seed, 스테이지, 시작 초, 반복) → 32비트 seed"""
+    return (base * 1_000_003 + (rep * 64 + stage) * DAY_SECONDS + t0) & 0xFFFFFFFF
+
+
+# ─── 집계 ────────────────────────────────────────────────────────
+
+class Stats:
+    """스테이지 하나의 카운터 (합치기 쉽게 Counter만 쓴다)"""
+
+    def __init__(self):
+        self.c = Counter()         # 이름 → 수
+        self.min_gap = {}          # 스케줄 → 가장 짧은 이웃 간격
+
+    def merge(self, other):
+        self.c.update(other.c)
+        for k, v in other.min_gap.items():
+            self.min_gap[k] = min(v, self.min_gap.get(k, v))
+
+    def to_dict(self):
+        return {"counts": dict(sorted(self.c.items())), "min_gap": dict(sorted(self.min_gap.items()))}
+
+    @classmethod
+    def from_dict(cls, d):
+        s = cls()
+        s.c.update(d["counts"])
+        s.min_gap.update(d["min_gap"])
+        return s
+
+
+def observe(st, payload, time_branch):
+    """이벤트 하나를 카운터에 더한다"""
+    c = st.c
+    c["events"] += 1
+    evt = payload["event"]
+    etype = evt["type"]
+    detail = evt["detail"]
+    c[f"etype.{etype}"] += 1
+    c["branch.time" if time_branch else "branch.non_time"] += 1
+    if detail.get("is_trap"):
+        c["trap"] += 1
+        c[f"trap.{etype}"] += 1
+    if etype == "no_click":
+        c["no_click_impossible"] += 1
+
+    key = compile_event(etype, detail).key
+    if key is not None:
+        t0 = payload["t0"]
+        found = NEXT_MATCH.find(key, t0 + WINDOW[0])
+        ok = found is not None and (found - t0 - WINDOW[0]) % DAY_SECONDS <= WINDOW[1] - WINDOW[0]
+        prefix = "trap_solvable" if detail.get("is_trap") else "solvable"
+        c[f"{prefix}.keyed"] += 1
+        c[f"{prefix}.in_window"] += ok
+
+    for e in payload["effects"]:
+        c[f"effect.{e['type']}"] += 1
+    c[f"clocks.{len(payload['clocks'])}"] += 1
+    c[f"theme.{payload['theme']['name']}"] += 1
+
+    for name in SCHEDULES:
+        items = payload[name]
+        c[f"{name}.len.{len(items)}"] += 1
+        for a, b in zip(items, items[1:]):
+            gap = round(b["at"] - a["at"], 2)
+            if gap < st.min_gap.get(name, float("inf")):
+                st.min_gap[name] = gap
+    target = TARGETS.get(etype)
+    if target:
+        sched, field, dkey = target
+        hits = [item["at"] for item in payload[sched] if item[field] == detail[dkey]]
+        c[f"target.{etype}.count.{len(hits)}"] += 1
+        if hits:
+            c[f"target.{etype}.first_at.{int(hits[0])}s"] += 1
+
+
+# ─── 작업자 ──────────────────────────────────────────────────────
+# 시각 기반 분기/fallback은 결과만으로는 알 수 없으므로 작업자 프로세스 안에서
+# events.create_time_based_event를 세는 래퍼로 감싼다 (생성 로직은 그대로).
+
+_calls = Counter()
+
+
+def _init_worker():
+    real = events.create_time_based_event
+
+    def counted(*args, **kwargs):
+        _calls["time"] += 1
+        evt = real(*args, **kwargs)
+        if not evt:
+            _calls["fallback"] += 1
+        return evt
+    events.create_time_based_event = counted
+
+
+def run_chunk(args):
+    """(스테이지, 시작 초 범위, 간격, 반복 수, 기본 seed) → Stats dict"""
+    stage, t_lo, t_hi, step, repeat, base = args
+    st = Stats()
+    for t0 in range(t_lo, t_hi, step):
+        for rep in range(repeat):
+            before = _calls["time"], _calls["fallback"]
+            payload = events.generate_event(stage, seed_for(base, stage, t0, rep), t0)
+            time_branch = _calls["time"] != before[0]
+            if _calls["fallback"] != before[1]:
+                st.c["fallback"] += 1
+            if not time_branch and all(c == "analog" for c in payload["clocks"]):
+                st.c["branch.forced_non_time"] += 1
+            observe(st, payload, time_branch)
+    return stage, st.to_dict()
+
+
+# ─── 실행 / 출력 ─────────────────────────────────────────────────
+
+def parse_stages(text):
+    out = []
+    for part in text.split(","):
+        lo, _, hi = part.partition("-")
+        out.extend(range(int(lo), int(hi or lo) + 1))
+    return out
+
+
+def sweep(stages, step, repeat, base, workers, chunk_seconds):
+    tasks = [(stage, lo, min(lo + chunk_seconds, DAY_SECONDS), step, repeat, base)
+             for stage in stages for lo in range(0, DAY_SECONDS, chunk_seconds)]
+    per_stage = {stage: Stats() for stage in stages}
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+        for stage, d in ex.map(run_chunk, tasks, chunksize=1):
+            per_stage[stage].merge(Stats.from_dict(d))
+            done += 1
+            print(f"\r{done}/{len(tasks)} chunks", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return per_stage
+
+
+def rate(c, num, den):
+    return round(c[num] / c[den], 6) if c[den] else None
+
+
+def summary(st):
+    """사람이 읽는 비율 (JSON에도 같이 넣는다)"""
+    c = st.c
+    return {
+        "events": c["events"],
+        "time_based": rate(c, "branch.time", "events"),
+        "forced_non_time": rate(c, "branch.forced_non_time", "events"),
+        "fallback": rate(c, "fallback", "branch.time"),
+        "trap": rate(c, "trap", "events"),
+        "no_click_impossible": rate(c, "no_click_impossible", "events"),
+        "solvable_in_window": rate(c, "solvable.in_window", "solvable.keyed"),
+        "trap_solvable": rate(c, "trap_solvable.in_window", "trap_solvable.keyed"),
+        "effects": {k[7:]: rate(c, k, "events") for k in sorted(c) if k.startswith("effect.")},
+    }
+
+
+def print_table(per_stage, total):
+    cols = ("time_based", "fallback", "trap", "no_click_impossible", "solvable_in_window")
+    print(f"{'stage':>6}{'events':>10}" + "".join(f"{c[:14]:>16}" for c in cols) + "  effects")
+    for stage, st in list(per_stage.items()) + [("all", total)]:
+        s = summary(st)
+        eff = " ".join(f"{k}={v:.3f}" for k, v in s["effects"].items())
+        print(f"{stage:>6}{s['events']:>10}" + "".join(
+            f"{s[c]:>16.4f}" if s[c] is not None else f"{'-':>16}" for c in cols) + f"  {eff}")
+    etypes = sorted((k[6:], n) for k, n in total.c.items() if k.startswith("etype."))
+    print("\netype" + " " * 20 + f"{'share':>8}{'trap':>8}")
+    for etype, n in sorted(etypes, key=lambda x: -x[1]):
+        print(f"{etype:<25}{n / total.c['events']:>8.4f}{total.c[f'trap.{etype}'] / n:>8.4f}")
+
+
+def compare(result, baseline):
+    """비율 지표 비교 (스테이지 all)"""
+    a, b = result["summary"]["all"], baseline["summary"]["all"]
+    print(f"\n{'metric':<28}{'before':>12}{'after':>12}")
+    for k in ("time_based", "forced_non_time", "fallback", "trap", "no_click_impossible", "solvable_in_window"):
+        print(f"{k:<28}{str(b.get(k)):>12}{str(a.get(k)):>12}")
+    for k in sorted(set(a["effects"]) | set(b["effects"])):
+        print(f"{'effect.' + k:<28}{str(b['effects'].get(k)):>12}{str(a['effects'].get(k)):>12}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--stages", default="1-21", help="예: 1-21, 1,5,10")
+    ap.add_argument("--t0-step", type=int, default=1, help="시작 초 간격 (1이면 86,400초 전부)")
+    ap.add_argument("--repeat", type=int, default=1, help="시작 초마다 seed 개수")
+    ap.add_argument("--seed", type=int, default=20240501)
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--chunk-seconds", type=int, default=3600, help="작업 하나가 맡을 시작 초 구간")
+    ap.add_argument("--out", help="결과 JSON 경로")
+    ap.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = ap.parse_args()
+
+    stages = parse_stages(args.stages)
+    t = time.perf_counter()
+    per_stage = sweep(stages, args.t0_step, args.repeat, args.seed, args.workers, args.chunk_seconds)
+    elapsed = time.perf_counter() - t
+    total = Stats()
+    for st in per_stage.values():
+        total.merge(st)
+
+    print_table(per_stage, total)
+    print(f"\n{total.c['events']} events, {elapsed:.1f}s, {args.workers} workers "
+          f"({total.c['events'] / elapsed:.0f} events/s)")
+
+    result = {
+        # 실행 환경/시간은 diff에 걸리지 않도록 meta에만 둔다
+        "meta": {"python": platform.python_version(), "workers": args.workers, "elapsed_s": round(elapsed, 1)},
+        "params": {"stages": args.stages, "t0_step": args.t0_step, "repeat": args.repeat, "seed": args.seed},
+        "summary": {"all": summary(total), **{str(s): summary(st) for s, st in per_stage.items()}},
+        "stages": {"all": total.to_dict(), **{str(s): st.to_dict() for s, st in per_stage.items()}},
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=1, sort_keys=True, ensure_ascii=False)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""정적 파일 (index.html, script.js, styles.css) 메모리 서빙
+
+시작할 때 한 번 읽어서 압축본(br 또는 deflate, gzip)과 강한 ETag를 미리 만든다.
+요청마다 디스크를 보지 않고, If-None-Match가 맞으면 304를 바로 돌려준다.
+script.js / styles.css 는 내용 해시가 붙은 주소(/static/script.<hash>.js)로도
+제공하며, 이 주소는 내용이 바뀌면 주소도 바뀌므로 1년 immutable로 캐시한다.
+index.html 안의 script.js / styles.css 참조는 해시 주소로 바꿔서 내보낸다.
+brotli 패키지가 있으면 br, 없으면 deflate를 쓴다 (선택 의존성).
+"""
+import gzip
+import hashlib
+import os
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ASSET_FILES = {
+    "index.html": "text/html; charset=utf-8",
+    "script.js": "text/javascript; charset=utf-8",
+    "styles.css": "text/css; charset=utf-8",
+}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# 선호 순서 (작은 것부터)
+ENCODINGS = ("br", "gzip", "deflate") if brotli else ("gzip", "deflate")
+
+
+def _compress(body):
+    out = {"gzip": gzip.compress(body, 9, mtime=0)}
+    if brotli:
+        out["br"] = brotli.compress(body, quality=11)
+    else:
+        out["deflate"] = zlib.compress(body, 9)
+    # 원본보다 작을 때만 쓴다
+    return {enc: data for enc, data in out.items() if len(data) < len(body)}
+
+
+def accepted_encodings(header):
+    """Accept-Encoding → q>0 인 인코딩 집합 (* 포함)"""
+    out = set()
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            out.add(token)
+    return out
+
+
+class Asset:
+    """파일 하나의 원본/압축본/ETag"""
+
+    __slots__ = ("name", "content_type", "body", "variants", "digest", "etags", "url")
+
+    def __init__(self, name, content_type, body):
+        self.name = name
+        self.content_type = content_type
+        self.body = body
+        self.variants = _compress(body)
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        # 표현(인코딩)마다 다른 강한 ETag
+        self.etags = {None: f'"{self.digest}"'}
+        for enc in self.variants:
+            self.etags[enc] = f'"{self.digest}-{enc}"'
+        stem, ext = os.path.splitext(name)
+        self.url = f"/static/{stem}.{self.digest[:10]}{ext}"
+
+    def select(self, accept_encoding):
+        """(인코딩 또는 None, 본문)"""
+        accepted = accepted_encodings(accept_encoding)
+        for enc in ENCODINGS:
+            if enc in self.variants and (enc in accepted or "*" in accepted):
+                return enc, self.variants[enc]
+        return None, self.body
+
+    def matches(self, if_none_match):
+        """If-None-Match가 이 내용의 어떤 표현과라도 맞는지 (GET은 약한 비교)"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return any(tag in tags for tag in self.etags.values())
+
+
+class AssetStore:
+    """시작 시 읽어 둔 정적 파일들"""
+
+    def __init__(self, root=ROOT, files=ASSET_FILES):
+        self.assets = {}
+        for name, ctype in files.items():
+            path = os.path.join(root, name)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self.assets[name] = Asset(name, ctype, f.read())
+        self.by_url = {a.url: a for n, a in self.assets.items() if n != "index.html"}
+        # index.html의 script.js / styles.css 참조를 해시 주소로
+        index = self.assets.get("index.html")
+        if index is not None:
+            body = index.body
+            for name, asset in self.assets.items():
+                if name == "index.html":
+                    continue
+                pattern = rb'((?:src|href)=["\'])(?:\./|/)?' + re.escape(name.encode()) + rb'(["\'])'
+                body = re.sub(pattern, rb"\g<1>" + asset.url.encode() + rb"\g<2>", body)
+            if body != index.body:
+                self.assets["index.html"] = Asset("index.html", index.content_type, body)
+
+    def get(self, name):
+        return self.assets.get(name)
+
+    def by_fingerprint(self, url):
+        return self.by_url.get(url)
+
+
+def respond(app, asset, req, cache_control):
+    """asset → Flask 응답 (If-None-Match면 304, Accept-Encoding에 맞는 압축본)"""
+    enc, body = asset.select(req.headers.get("Accept-Encoding"))
+    headers = {
+        "ETag": asset.etags[enc],
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if asset.matches(req.headers.get("If-None-Match")):
+        return app.response_class(status=304, headers=headers)
+    if enc:
+        headers["Content-Encoding"] = enc
+    resp = app.response_class(body, headers=headers, content_type=asset.content_type)
+    resp.direct_passthrough = True
+    return resp
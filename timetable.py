@@ -0,0 +1,313 @@
+"""하루 86,400초 각각의 숫자 특징 테이블
+
+시각 기반 조건(회문, 연속 숫자, 합, 증가/감소, 소수 등)을 매 요청마다
+문자열로 다시 계산하지 않도록, 서버 시작 시 한 번만 만들어 두고
+초 단위 인덱스(h*3600 + m*60 + s)로 O(1) 조회한다.
+"""
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import compress, repeat
+from operator import and_, or_, rshift
+
+DAY_SECONDS = 86400
+
+# FLAGS 비트
+F_PALINDROME = 1 << 0
+F_ASCENDING = 1 << 1
+F_DESCENDING = 1 << 2
+F_PRIME_SECOND = 1 << 3
+
+
+def is_prime(n):
+    """소수 판별"""
+    if n < 2:
+        return False
+    if n == 2:
+        return True
+    if n % 2 == 0:
+        return False
+    for i in range(3, int(n**0.5) + 1, 2):
+        if n % i == 0:
+            return False
+    return True
+
+
+def is_sequence_asc(digits):
+    """연속 증가 체크 (최소 3개)"""
+    count = 1
+    for i in range(1, len(digits)):
+        if digits[i] == digits[i-1] + 1:
+            count += 1
+            if count >= 3:
+                return True
+        else:
+            count = 1
+    return False
+
+
+def is_sequence_desc(digits):
+    """연속 감소 체크 (최소 3개)"""
+    count = 1
+    for i in range(1, len(digits)):
+        if digits[i] == digits[i-1] - 1:
+            count += 1
+            if count >= 3:
+                return True
+        else:
+            count = 1
+    return False
+
+
+def time_index(h, m, s):
+    """(시, 분, 초) → 하루 중 몇 번째 초인지"""
+    return (h % 24) * 3600 + (m % 60) * 60 + (s % 60)
+
+
+def split_index(t):
+    """초 인덱스 → (시, 분, 초)"""
+    t %= DAY_SECONDS
+    return t // 3600, (t // 60) % 60, t % 60
+
+
+def format_index(t):
+    h, m, s = split_index(t)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+def _digit_features(digits):
+    """6자리 숫자열 하나의 특징 (테이블 생성용)"""
+    # 숫자별 최장 연속 길이 (3비트씩 10자리 = 30비트)
+    runs = 0
+    max_run, run_digit = 1, digits[0]
+    i = 0
+    while i < 6:
+        j = i + 1
+        while j < 6 and digits[j] == digits[i]:
+            j += 1
+        run = j - i
+        shift = 3 * digits[i]
+        if run > (runs >> shift) & 7:
+            runs = (runs & ~(7 << shift)) | (run << shift)
+        if run > max_run:
+            max_run, run_digit = run, digits[i]
+        i = j
+
+    flags = 0
+    if digits == digits[::-1]:
+        flags |= F_PALINDROME
+    if is_sequence_asc(digits):
+        flags |= F_ASCENDING
+    if is_sequence_desc(digits):
+        flags |= F_DESCENDING
+
+    mask = 0
+    for d in digits:
+        mask |= 1 << d
+    return sum(digits), mask, max_run, run_digit, runs, flags
+
+
+class DigitTable:
+    """초 인덱스별 특징 컬럼 (array 기반, 행 = 하루의 각 초)
+
+    - digit_sum  : 6자리 숫자 합 (0~54)
+    - digit_mask : 등장한 숫자 비트마스크 (bit d = 숫자 d 포함)
+    - max_run / run_digit : 가장 긴 연속 숫자 길이와 그 숫자 (동률이면 앞쪽)
+    - runs       : 숫자 d의 최장 연속 길이 = (runs >> 3*d) & 7
+    - flags      : F_PALINDROME / F_ASCENDING / F_DESCENDING / F_PRIME_SECOND
+    """
+
+    def __init__(self):
+        self.digit_sum = array("B", bytes(DAY_SECONDS))
+        self.digit_mask = array("H", bytes(2 * DAY_SECONDS))
+        self.max_run = array("B", bytes(DAY_SECONDS))
+        self.run_digit = array("B", bytes(DAY_SECONDS))
+        self.runs = array("L", [0]) * DAY_SECONDS
+        self.flags = array("B", bytes(DAY_SECONDS))
+        self._build()
+
+    def _build(self):
+        pairs = [(n // 10, n % 10) for n in range(60)]
+        prime_flag = [F_PRIME_SECOND if is_prime(s) else 0 for s in range(60)]
+        t = 0
+        for h in range(24):
+            for m in range(60):
+                for s in range(60):
+                    digits = [*pairs[h], *pairs[m], *pairs[s]]
+                    total, mask, max_run, run_digit, runs, flags = _digit_features(digits)
+                    self.digit_sum[t] = total
+                    self.digit_mask[t] = mask
+                    self.max_run[t] = max_run
+                    self.run_digit[t] = run_digit
+                    self.runs[t] = runs
+                    self.flags[t] = flags | prime_flag[s]
+                    t += 1
+
+    def has_digit(self, t, d):
+        return bool(self.digit_mask[t] >> d & 1)
+
+    def digit_run(self, t, d):
+        """숫자 d가 연속으로 나타나는 최대 길이"""
+        return (self.runs[t] >> (3 * d)) & 7
+
+    def is_palindrome(self, t):
+        return bool(self.flags[t] & F_PALINDROME)
+
+    def is_ascending(self, t):
+        return bool(self.flags[t] & F_ASCENDING)
+
+    def is_descending(self, t):
+        return bool(self.flags[t] & F_DESCENDING)
+
+    def is_prime_second(self, t):
+        return bool(self.flags[t] & F_PRIME_SECOND)
+
+
+TABLE = DigitTable()
+
+
+# ─── 슬라이딩 윈도우 인덱스 ──────────────────────────────────────
+# "start초부터 span초 동안 나올 수 있는 값"을 비트셋으로 돌려준다.
+# 숫자 마스크/합은 원형(자정 넘김) sparse table로 OR 집계하므로
+# 윈도우 길이와 무관하게 조회는 O(1)이다 (겹치는 2^k 블록 두 개의 OR).
+
+Window = namedtuple("Window", "digit_mask sum_bits second_bits minute_bits hour_bits")
+
+
+def _rotated_run(start, count, width):
+    """width비트 원형 비트셋에서 start부터 count개 연속 비트"""
+    if count >= width:
+        return (1 << width) - 1
+    run = (1 << count) - 1
+    full = (run << start) | (run >> (width - start))
+    return full & ((1 << width) - 1)
+
+
+def missing_values(bits, width):
+    """비트셋에 없는 값 목록 (함정용 여집합)"""
+    return [v for v in range(width) if not bits >> v & 1]
+
+
+class WindowIndex:
+    """원형 sparse table 기반 윈도우 집계 (max_span초까지)"""
+
+    def __init__(self, table, max_span=64):
+        self.max_span = max_span
+        levels = max(1, max_span.bit_length())
+        mask_lv = [table.digit_mask]
+        sum_lv = [array("Q", [1 << v for v in table.digit_sum])]
+        for k in range(1, levels):
+            half = 1 << (k - 1)
+            if half >= DAY_SECONDS:
+                break
+            pm, ps = mask_lv[-1], sum_lv[-1]
+            mask_lv.append(array("H", map(or_, pm, pm[half:] + pm[:half])))
+            sum_lv.append(array("Q", map(or_, ps, ps[half:] + ps[:half])))
+        self._mask_lv = mask_lv
+        self._sum_lv = sum_lv
+
+    def query(self, start, span):
+        """start초부터 span초 동안의 Window (start는 time_index 값)"""
+        if not 1 <= span <= self.max_span:
+            raise ValueError(f"span은 1~{self.max_span} 사이여야 합니다: {span}")
+        start %= DAY_SECONDS
+        k = span.bit_length() - 1
+        other = (start + span - (1 << k)) % DAY_SECONDS
+        mask_k, sum_k = self._mask_lv[k], self._sum_lv[k]
+        digit_mask = mask_k[start] | mask_k[other]
+        sum_bits = sum_k[start] | sum_k[other]
+
+        end = start + span - 1  # 자정을 넘으면 86400 이상 (분/시 계산용으로 그대로 둠)
+        second_bits = _rotated_run(start % 60, span, 60)
+        minute_bits = _rotated_run((start // 60) % 60, end // 60 - start // 60 + 1, 60)
+        hour_bits = _rotated_run(start // 3600, end // 3600 - start // 3600 + 1, 24)
+        return Window(digit_mask, sum_bits, second_bits, minute_bits, hour_bits)
+
+
+WINDOWS = WindowIndex(TABLE)
+
+
+# ─── 다음 정답 시각 검색 ─────────────────────────────────────────
+# 검색 키(조건 레지스트리 conditions.py의 key 훅이 만든다)의 가짓수는 유한하므로
+# 시작 시 키마다 "만족하는 초 인덱스"의 정렬 배열을 전부 만들어 두고,
+# 다음 정답 시각은 bisect로 O(log n)에 찾는다. 목록에 없는 키는 None이다
+# (요청에서 온 키로 새 배열을 만들거나 캐시하지 않는다).
+# 컬럼 → 0/1 바이트열(translate) → compress 순으로 C 루프만 돌아서 만든다.
+
+_SECONDS = list(range(DAY_SECONDS))  # compress가 int를 새로 만들지 않도록
+
+
+def _select(flags):
+    """0/1 바이트열에서 1인 초 인덱스 배열"""
+    return array("I", compress(_SECONDS, flags))
+
+
+def _match_table(pred):
+    """바이트 값 v → pred(v)이면 1 (bytes.translate용)"""
+    return bytes(1 if pred(v) else 0 for v in range(256))
+
+
+class NextMatch:
+    """조건 키별 정답 초 목록 (시작 시 전부 생성) + bisect 검색"""
+
+    def __init__(self, table):
+        self.table = table
+        self._positions = self._build(table)
+
+    @staticmethod
+    def _build(tbl):
+        pos = {}
+        day_hours = range(0, DAY_SECONDS, 3600)
+        for x in range(60):
+            pos["second", x] = range(x, DAY_SECONDS, 60)
+            pos["minute", x] = array("I", (h + x * 60 + s for h in day_hours for s in range(60)))
+        for x in range(24):
+            pos["hour", x] = range(x * 3600, (x + 1) * 3600)
+
+        for d in range(10):
+            # 숫자 d의 최장 연속 길이 / 포함 여부 컬럼 (0~6)
+            run_d = bytes(map(and_, map(rshift, tbl.runs, repeat(3 * d)), repeat(7)))
+            for count in range(1, 7):
+                pos["run", d, count] = _select(run_d.translate(_match_table(lambda v: v >= count)))
+            pos["has", d] = pos["run", d, 1]
+            pos["not", d] = _select(run_d.translate(_match_table(lambda v: v == 0)))
+
+        flags = tbl.flags.tobytes()
+        for bit in (F_PALINDROME, F_ASCENDING, F_DESCENDING, F_PRIME_SECOND):
+            pos["flag", bit] = _select(flags.translate(_match_table(lambda v: v & bit)))
+
+        # 합은 값마다 겹치지 않으므로 한 번 정렬해서 잘라 쓴다 (sorted는 안정 정렬)
+        sums = tbl.digit_sum.tobytes()
+        by_sum = sorted(_SECONDS, key=sums.__getitem__)
+        lo = 0
+        for total in range(55):
+            hi = lo + sums.count(total)
+            pos["sum", total] = array("I", by_sum[lo:hi])
+            lo = hi
+        for parity in (0, 1):
+            pos["parity", parity] = _select(sums.translate(_match_table(lambda v: v % 2 == parity)))
+
+        pos["multiple_7",] = array("I", (m + s for m in range(0, DAY_SECONDS, 60) for s in range(7, 60, 7)))
+        pos["sandwich",] = array("I", (h + x * 61 for h in day_hours for x in range(60)))
+        return pos
+
+    def positions(self, key):
+        """키의 정답 초 배열 (지원하지 않는 키면 None)"""
+        try:
+            return self._positions.get(key)
+        except TypeError:  # 해시할 수 없는 값이 섞인 키
+            return None
+
+    def find(self, key, start):
+        """start초(포함)부터 앞으로 가장 가까운 정답 초 (자정 넘김, 없으면 None)"""
+        pos = self.positions(key)
+        if not pos:
+            return None
+        i = bisect_left(pos, start % DAY_SECONDS)
+        return pos[i] if i < len(pos) else pos[0]
+
+    def keys(self):
+        return self._positions.keys()
+
+
+NEXT_MATCH = NextMatch(TABLE)